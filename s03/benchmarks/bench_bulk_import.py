@@ -0,0 +1,58 @@
+"""Rows per second for the NDJSON bulk import, with and without deferred indexes.
+
+Writes a synthetic dump and imports it into a fresh, migrated sqlite file in a
+temporary directory. Run from the `s03` directory:
+
+    python -m benchmarks.bench_bulk_import [posts] [comments_per_post]
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ["ENV_STATE"] = "test"
+
+import sqlalchemy  # noqa: E402
+
+from socials_api.api.models.migrations import migrate  # noqa: E402
+from socials_api.core.bulk_import import import_ndjson  # noqa: E402
+
+
+def write_dump(path: Path, posts: int, comments_per_post: int) -> None:
+    with open(path, "w") as file:
+        for i in range(1, posts + 1):
+            record = {
+                "post": {"id": i, "body": f"Post body number {i}"},
+                "comments": [
+                    {"comment": f"Comment {j} on {i}"} for j in range(comments_per_post)
+                ],
+            }
+            file.write(json.dumps(record) + "\n")
+
+
+def main(posts: int, comments_per_post: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = Path(tmp) / "dump.ndjson"
+        write_dump(dump, posts, comments_per_post)
+
+        for defer_indexes in (True, False):
+            engine = sqlalchemy.create_engine(
+                f"sqlite:///{tmp}/bench_{defer_indexes}.db"
+            )
+            migrate(engine)
+            stats = import_ndjson(str(dump), engine, defer_indexes=defer_indexes)
+            engine.dispose()
+
+            rows = stats["posts"] + stats["comments"]
+            print(
+                f"defer_indexes={defer_indexes!s:<6} {rows} rows in "
+                f"{stats['seconds']:.2f}s: {rows / stats['seconds']:>10,.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    comments_per_post = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    main(posts, comments_per_post)
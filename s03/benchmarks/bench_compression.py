@@ -0,0 +1,75 @@
+"""CPU cost versus bandwidth saved for each available response compression setting.
+
+Uses a `/post/all/comments`-shaped payload built in memory. Run from the `s03`
+directory:
+
+    python -m benchmarks.bench_compression [posts] [comments_per_post]
+"""
+
+import sys
+import time
+
+from socials_api.core.compression import CompressedBodyCache, _compressors
+from socials_api.core.serialization import dumps
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 11), "zstd": (1, 3, 19)}
+
+
+def payload(posts: int, comments_per_post: int) -> bytes:
+    return dumps(
+        [
+            {
+                "post": {"body": f"Post body number {i}", "id": i},
+                "comments": [
+                    {"id": i * comments_per_post + j, "comment": f"Comment {j} on {i}"}
+                    for j in range(comments_per_post)
+                ],
+            }
+            for i in range(posts)
+        ]
+    )
+
+
+def best_time(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(posts: int, comments_per_post: int) -> None:
+    body = payload(posts, comments_per_post)
+    print(f"body: {len(body) / 1e6:.2f} MB")
+    print(
+        f"{'encoding':<10}{'level':>6}{'ms':>10}{'MB/s':>10}{'size (MB)':>11}{'saved':>8}"
+    )
+
+    for encoding, levels in LEVELS.items():
+        for level in levels:
+            compressors = _compressors({encoding: level})
+            if encoding not in compressors:
+                print(f"{encoding:<10}{'-':>6}  (not installed)")
+                break
+            compress = compressors[encoding]
+            seconds = best_time(lambda: compress(body))
+            size = len(compress(body))
+            print(
+                f"{encoding:<10}{level:>6}{seconds * 1000:>10.1f}"
+                f"{len(body) / seconds / 1e6:>10.0f}{size / 1e6:>11.2f}"
+                f"{1 - size / len(body):>8.0%}"
+            )
+
+    # a cache hit costs one hash of the body instead of a compression
+    cache = CompressedBodyCache()
+    compress = _compressors({})["gzip"]
+    cache.get_or_compress("gzip", body, compress)
+    seconds = best_time(lambda: cache.get_or_compress("gzip", body, compress))
+    print(f"{'cache hit':<10}{'':>6}{seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    comments_per_post = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    main(posts, comments_per_post)
@@ -0,0 +1,50 @@
+"""Measure cold-start import time of `socials_api.main`.
+
+Each run is a fresh interpreter started with `python -X importtime`, so nothing is
+cached in `sys.modules`. Run from the `s03` directory:
+
+    python -m benchmarks.bench_import [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+MODULE = "socials_api.main"
+
+
+def import_once() -> dict[str, tuple[int, int]]:
+    """Import MODULE in a new interpreter; return {module: (self_us, cumulative_us)}."""
+    env = {**os.environ, "ENV_STATE": os.environ.get("ENV_STATE", "test")}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main(runs: int) -> None:
+    samples = [import_once() for _ in range(runs)]
+    total = statistics.median(sample[MODULE][1] for sample in samples)
+    print(f"{MODULE}: median cumulative import {total / 1000:.1f} ms over {runs} runs")
+
+    # self time of our own modules is what this repo controls
+    ours = sorted(name for name in samples[0] if name.startswith("socials_api"))
+    print(f"{'module':<45}{'self (ms)':>10}")
+    for name in ours:
+        self_ms = statistics.median(sample[name][0] for sample in samples) / 1000
+        print(f"{name:<45}{self_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
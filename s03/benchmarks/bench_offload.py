@@ -0,0 +1,100 @@
+"""Latency of small requests while a big /post/all/comments is being built, with the
+assembly inline vs offloaded to a thread or process pool.
+
+Run from the `s03` directory:
+
+    python -m benchmarks.bench_offload [posts] [comments_per_post]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ["ENV_STATE"] = "test"
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from socials_api.api.models.database import comment_db, db, post_db  # noqa: E402
+from socials_api.api.models.migrations import migrate  # noqa: E402
+from socials_api.api.routes import user_posts  # noqa: E402
+from socials_api.core.offload import Offloader  # noqa: E402
+from socials_api.main import app  # noqa: E402
+
+
+async def seed(posts: int, comments_per_post: int) -> None:
+    await db.execute_many(
+        post_db.insert(), [{"body": f"Post body {i}"} for i in range(posts)]
+    )
+    await db.execute_many(
+        comment_db.insert(),
+        [
+            {"comment": f"Comment {i}", "post_id": i % posts + 1}
+            for i in range(posts * comments_per_post)
+        ],
+    )
+
+
+async def small_requests(client: AsyncClient, done: asyncio.Event) -> list[float]:
+    """GET / every millisecond until done; return each latency in seconds.
+
+    Latency counts from when the request was due, so time spent waiting for the
+    event loop to get back to this task is included.
+    """
+    latencies = []
+    while not done.is_set():
+        due = time.perf_counter()
+        await asyncio.sleep(0.001)
+        await client.get("/")
+        latencies.append(time.perf_counter() - due - 0.001)
+    return latencies
+
+
+async def measure(client: AsyncClient) -> tuple[float, list[float]]:
+    done = asyncio.Event()
+    small = asyncio.create_task(small_requests(client, done))
+    start = time.perf_counter()
+    # uncompressed, so only the assembly and encoding are measured
+    response = await client.get(
+        "/post/all/comments", headers={"Accept-Encoding": "identity"}
+    )
+    big = time.perf_counter() - start
+    done.set()
+    assert response.status_code == 200
+    return big, await small
+
+
+async def main(posts: int, comments_per_post: int) -> None:
+    migrate()
+    # force_rollback in the test config discards the seeded rows on disconnect
+    await db.connect()
+    try:
+        await seed(posts, comments_per_post)
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            rows = posts * (1 + comments_per_post)
+            print(f"{rows} rows; latency of GET / during one GET /post/all/comments")
+            print(f"{'mode':<9}{'big (ms)':>10}{'small p50':>11}{'p99':>8}{'max':>8}")
+            for mode in ("off", "thread", "process"):
+                offloader = Offloader(mode, workers=2, min_rows=0)
+                user_posts.offloader = offloader
+                await offloader.start()
+                await measure(client)  # warm up
+                big, latencies = await measure(client)
+                offloader.stop()
+                latencies.sort()
+                p99 = latencies[int(len(latencies) * 0.99)]
+                print(
+                    f"{mode:<9}{big * 1000:>10.0f}"
+                    f"{statistics.median(latencies) * 1000:>11.1f}"
+                    f"{p99 * 1000:>8.1f}{latencies[-1] * 1000:>8.1f}"
+                )
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    comments_per_post = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    asyncio.run(main(posts, comments_per_post))
@@ -0,0 +1,56 @@
+"""Cost of a single-row lookup as a Core expression (compiled by `databases` on every
+call) vs a prepared statement (compiled once, executed with bind parameters).
+
+Run from the `s03` directory:
+
+    python -m benchmarks.bench_prepared [iterations]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+os.environ["ENV_STATE"] = "test"
+
+from sqlalchemy import bindparam  # noqa: E402
+
+from socials_api.api.models.database import db, post_db, select_posts  # noqa: E402
+from socials_api.api.models.migrations import migrate  # noqa: E402
+from socials_api.core.prepared import Prepared  # noqa: E402
+
+POST_BY_ID = Prepared(select_posts().where(post_db.c.id == bindparam("id")))
+
+
+async def expression(id: int):
+    return await db.fetch_one(select_posts().where(post_db.c.id == id))
+
+
+async def prepared(id: int):
+    return await POST_BY_ID.fetch_one(db, id=id)
+
+
+async def main(iterations: int) -> None:
+    migrate()
+    # force_rollback in the test config discards the seeded rows on disconnect
+    await db.connect()
+    try:
+        await db.execute_many(
+            post_db.insert(), [{"body": f"Post body {i}"} for i in range(1000)]
+        )
+        print(f"{'query':<12}{'us/call':>10}")
+        for name, fetch in (("expression", expression), ("prepared", prepared)):
+            for id in range(1, 101):  # warm up
+                await fetch(id)
+            start = time.perf_counter()
+            for i in range(iterations):
+                await fetch(i % 1000 + 1)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<12}{elapsed / iterations * 1e6:>10.0f}")
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    asyncio.run(main(iterations))
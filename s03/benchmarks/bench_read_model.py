@@ -0,0 +1,65 @@
+"""Latency of GET /post/{id}/full assembled from the rows vs served from the read
+model's pre-rendered document.
+
+Run from the `s03` directory:
+
+    python -m benchmarks.bench_read_model [comments_per_post] [requests]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+os.environ["ENV_STATE"] = "test"
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from socials_api.api.models.database import comment_db, db, post_db  # noqa: E402
+from socials_api.api.models.migrations import migrate  # noqa: E402
+from socials_api.config import config  # noqa: E402
+from socials_api.main import app  # noqa: E402
+
+POSTS = 100
+
+
+async def main(comments_per_post: int, requests: int) -> None:
+    migrate()
+    # force_rollback in the test config discards the seeded rows on disconnect
+    await db.connect()
+    try:
+        await db.execute_many(
+            post_db.insert(), [{"body": f"Post body {i}"} for i in range(POSTS)]
+        )
+        await db.execute_many(
+            comment_db.insert(),
+            [
+                {"comment": f"Comment {i}", "post_id": i % POSTS + 1}
+                for i in range(POSTS * comments_per_post)
+            ],
+        )
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{comments_per_post} comments per post")
+            print(f"{'read model':<12}{'ms/request':>12}")
+            for read_model in (False, True):
+                config.READ_MODEL = read_model
+                for id in range(1, POSTS + 1):  # warm up (and build the documents)
+                    await client.get(f"/post/{id}/full")
+                start = time.perf_counter()
+                for i in range(requests):
+                    response = await client.get(
+                        f"/post/{i % POSTS + 1}/full",
+                        headers={"Accept-Encoding": "identity"},
+                    )
+                    assert response.status_code == 200
+                elapsed = time.perf_counter() - start
+                print(f"{str(read_model):<12}{elapsed / requests * 1000:>12.2f}")
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    comments_per_post = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    asyncio.run(main(comments_per_post, requests))
@@ -0,0 +1,77 @@
+"""Compare the default (validated) and fast serialization paths on list endpoints.
+
+Run from the `s03` directory:
+
+    python -m benchmarks.bench_serialization [rows] [repeat]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+os.environ["ENV_STATE"] = "test"
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from socials_api.api.models.database import (  # noqa: E402
+    comment_db,
+    db,
+    post_db,
+)
+from socials_api.api.models.migrations import migrate  # noqa: E402
+from socials_api.config import config  # noqa: E402
+from socials_api.main import app  # noqa: E402
+
+URLS = ("/post/all", "/comment/all", "/post/all/comments")
+
+
+async def seed(rows: int) -> None:
+    """Insert `rows` posts and `rows` comments spread over the first 100 posts."""
+    await db.execute_many(
+        post_db.insert(), [{"body": f"Post body {i}"} for i in range(rows)]
+    )
+    await db.execute_many(
+        comment_db.insert(),
+        [{"comment": f"Comment {i}", "post_id": i % 100 + 1} for i in range(rows)],
+    )
+
+
+async def time_url(client: AsyncClient, url: str, repeat: int) -> float:
+    """Return the best wall time (seconds) of `repeat` GETs on url."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(url)
+        best = min(best, time.perf_counter() - start)
+        assert response.status_code == 200
+    return best
+
+
+async def main(rows: int, repeat: int) -> None:
+    migrate()
+    # force_rollback in the test config discards the seeded rows on disconnect
+    await db.connect()
+    try:
+        await seed(rows)
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{rows} rows, best of {repeat}")
+            print(f"{'url':<22}{'default (ms)':>14}{'fast (ms)':>12}{'speedup':>10}")
+            for url in URLS:
+                config.FAST_SERIALIZATION = False
+                default = await time_url(client, url, repeat)
+                config.FAST_SERIALIZATION = True
+                fast = await time_url(client, url, repeat)
+                print(
+                    f"{url:<22}{default * 1000:>14.1f}{fast * 1000:>12.1f}"
+                    f"{default / fast:>9.1f}x"
+                )
+    finally:
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    asyncio.run(main(rows, repeat))
@@ -0,0 +1,115 @@
+"""Requests per second through `socials_api.serve` with one worker vs several.
+
+Starts the launcher as a subprocess on a seeded sqlite file in a temporary directory
+and drives it with concurrent keep-alive clients over real sockets. Run from the
+`s03` directory:
+
+    python -m benchmarks.bench_workers [workers] [seconds] [concurrency]
+
+Multiple workers only help with as many free CPUs as workers (plus some for the
+load generator, which runs in this process).
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import sqlalchemy
+
+from socials_api.api.models.database import comment_db, post_db
+from socials_api.api.models.migrations import migrate
+
+PORT = 8765
+URLS = ("/post/all", "/comment/all")
+
+
+def seed(url: str, rows: int = 200) -> None:
+    engine = sqlalchemy.create_engine(url)
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(post_db.insert(), [{"body": f"Post {i}"} for i in range(rows)])
+        conn.execute(
+            comment_db.insert(),
+            [{"comment": f"Comment {i}", "post_id": i % 20 + 1} for i in range(rows)],
+        )
+    engine.dispose()
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+        await asyncio.sleep(0.1)
+
+
+async def load(seconds: float, concurrency: int) -> int:
+    """Send requests from `concurrency` clients for `seconds`; return how many."""
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{PORT}", limits=limits
+    ) as client:
+        await wait_ready(client)
+        deadline = time.monotonic() + seconds
+        done = 0
+
+        async def worker(n: int) -> None:
+            nonlocal done
+            while time.monotonic() < deadline:
+                response = await client.get(URLS[(done + n) % len(URLS)])
+                assert response.status_code == 200
+                done += 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        return done
+
+
+def run(url: str, workers: int, seconds: float, concurrency: int) -> float:
+    env = {
+        **os.environ,
+        "ENV_STATE": "test",
+        "TEST_DATABASE_URL": url,
+        "TEST_DB_FORCE_ROLLBACK": "false",
+        "TEST_PURGE_ENABLED": "false",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "socials_api.serve", "--workers", str(workers)]
+        + ["--port", str(PORT)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        requests = asyncio.run(load(seconds, concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+    return requests / seconds
+
+
+def main(workers: int, seconds: float, concurrency: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        seed(url)
+        print(f"{os.cpu_count()} CPUs, {concurrency} clients, {seconds:.0f}s each")
+        single = run(url, 1, seconds, concurrency)
+        print(f"{'1 worker':<12}{single:>10,.0f} req/s")
+        multi = run(url, workers, seconds, concurrency)
+        print(
+            f"{f'{workers} workers':<12}{multi:>10,.0f} req/s ({multi / single:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+    main(workers, seconds, concurrency)
@@ -1,20 +1,37 @@
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Optional
+
 import databases
 import sqlalchemy
-from sqlalchemy import Column, ForeignKey, Integer, String, Table
+from sqlalchemy import (
+    Column,
+    Float,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    Select,
+    String,
+    Table,
+)
 
 from socials_api.config import config
-
-# connectivity engine/factory to connect to target db ('sqlite' in this case)
-engine = sqlalchemy.create_engine(
-    config.DATABASE_URL, connect_args={"check_same_thread": False}
-)
+from socials_api.core.lazy import Lazy
+from socials_api.core.tracing import db_span
 
 # store information about our db tables
+# the tables themselves are created and evolved by `migrations.py`; keep these in sync
 metadata = sqlalchemy.MetaData()
 
 # create post_db
 post_db = Table(
-    "posts", metadata, Column("id", Integer, primary_key=True), Column("body", String)
+    "posts",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("body", String),
+    Column("deleted_at", Float, nullable=True),
+    # last write to the post or any of its comments (the `Last-Modified` of both)
+    Column("modified_at", Float, nullable=True),
 )
 
 # create comment_db
@@ -23,12 +40,164 @@ comment_db = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("comment", String),
-    Column("post_id", ForeignKey("posts.id"), nullable=False),
+    Column("post_id", ForeignKey("posts.id"), nullable=False, index=True),
+    Column("deleted_at", Float, nullable=True),
+    # replies (see `core/threads.py`): `path` is the ids from the thread's root down
+    # to this comment, so a subtree is a range of paths
+    Column("parent_id", ForeignKey("comments.id"), nullable=True),
+    Column("depth", Integer, nullable=False, server_default="0"),
+    Column("path", String, nullable=True),
+    sqlalchemy.Index("ix_comments_thread", "post_id", "path"),
+)
+
+# create change_db: append-only log of every write to posts and comments
+# `seq` is AUTOINCREMENT so it never goes backwards, even after compaction
+change_db = Table(
+    "changes",
+    metadata,
+    Column("seq", Integer, primary_key=True),
+    Column("table_name", String, nullable=False),
+    Column("row_id", Integer, nullable=False),
+    Column("op", String, nullable=False),
+    Column("changed_at", Float, nullable=False),
+    sqlalchemy.Index("ix_changes_row", "table_name", "row_id", "seq"),
+    sqlite_autoincrement=True,
+)
+
+# create document_db: each post with its comments, pre-rendered as JSON (the read
+# model, see `core/read_model.py`); `comments` holds the `GET /comment/{post_id}` body
+document_db = Table(
+    "post_documents",
+    metadata,
+    Column("post_id", Integer, primary_key=True),
+    Column("document", LargeBinary, nullable=False),
+    Column("comments", LargeBinary, nullable=False),
+    Column("updated_at", Float, nullable=False),
+)
+
+
+# create reservation_db: the comment each write-behind reservation id became (see
+# `core/write_behind.py`); kept for COMMENT_RESERVATION_TTL seconds
+reservation_db = Table(
+    "comment_reservations",
+    metadata,
+    Column("reservation_id", String, primary_key=True),
+    Column("comment_id", Integer, nullable=False),
+    Column("created_at", Float, nullable=False),
+    sqlalchemy.Index("ix_comment_reservations_created_at", "created_at"),
 )
 
-# emit DDL to target db
-metadata.create_all(engine)
+
+# deletes only set `deleted_at`; the rows stay until the purge task (core/purge.py)
+# removes them, so every read goes through these
+def select_posts() -> Select:
+    """Select posts that haven't been deleted."""
+    return post_db.select().where(post_db.c.deleted_at.is_(None))
+
+
+def select_comments() -> Select:
+    """Select comments that haven't been deleted, on posts that haven't been deleted."""
+    return (
+        sqlalchemy.select(comment_db)
+        .join_from(comment_db, post_db)
+        .where(comment_db.c.deleted_at.is_(None), post_db.c.deleted_at.is_(None))
+        .order_by(comment_db.c.id)
+    )
+
+
+# connectivity engine/factory to connect to target db ('sqlite' in this case)
+# only needed for migrations (see `migrations.py`), so it's built on first use
+@lru_cache(maxsize=None)
+def get_engine() -> sqlalchemy.Engine:
+    return sqlalchemy.create_engine(
+        config.DATABASE_URL, connect_args={"check_same_thread": False}
+    )
+
+
+class QueryCounter:
+    """Statements run so far by one request (see `query_counter`)."""
+
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+
+# set per request by the access log; tasks the request starts inherit the counter
+query_counter: ContextVar[Optional[QueryCounter]] = ContextVar(
+    "query_counter", default=None
+)
+
+
+# set per request by the timeout middleware (see `core/timeouts.py`): every
+# connection the request, or any task it starts, runs statements on
+request_connections: ContextVar[Optional[set[databases.core.Connection]]] = ContextVar(
+    "request_connections", default=None
+)
+
+
+def _count_query() -> None:
+    counter = query_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+class InstrumentedDatabase(databases.Database):
+    """`databases.Database` that counts every statement it runs on the current
+    request's `query_counter`, and traces it when the request is traced.
+
+    The connections it hands out are recorded in `request_connections`, so a timed
+    out request can interrupt them, including those of tasks it gathered.
+    """
+
+    def connection(self) -> databases.core.Connection:
+        connection = super().connection()
+        connections = request_connections.get()
+        if connections is not None:
+            connections.add(connection)
+        return connection
+
+    async def fetch_all(self, query: Any, values: Optional[dict] = None) -> list:
+        _count_query()
+        with db_span("fetch_all", query):
+            return await super().fetch_all(query, values)
+
+    async def fetch_one(self, query: Any, values: Optional[dict] = None) -> Any:
+        _count_query()
+        with db_span("fetch_one", query):
+            return await super().fetch_one(query, values)
+
+    async def fetch_val(
+        self, query: Any, values: Optional[dict] = None, column: Any = 0
+    ) -> Any:
+        _count_query()
+        with db_span("fetch_val", query):
+            return await super().fetch_val(query, values, column)
+
+    async def execute(self, query: Any, values: Optional[dict] = None) -> Any:
+        _count_query()
+        with db_span("execute", query):
+            return await super().execute(query, values)
+
+    async def execute_many(self, query: Any, values: list) -> None:
+        _count_query()
+        with db_span("execute_many", query):
+            return await super().execute_many(query, values)
+
+    async def iterate(
+        self, query: Any, values: Optional[dict] = None
+    ) -> AsyncGenerator[Any, None]:
+        _count_query()
+        with db_span("iterate", query, current=False):
+            async for record in super().iterate(query, values):
+                yield record
+
 
 # connect to database using client-side `databases` package
 # I choose to use this instead of SQLAlchemy ORM to learn from using close-to-sql query expressions
-db = databases.Database(config.DATABASE_URL, force_rollback=config.DB_FORCE_ROLLBACK)
+# built on first use (in the app lifespan), not at import
+db: databases.Database = Lazy(
+    lambda: InstrumentedDatabase(
+        config.DATABASE_URL, force_rollback=config.DB_FORCE_ROLLBACK
+    )
+)
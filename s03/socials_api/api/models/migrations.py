@@ -0,0 +1,246 @@
+"""Numbered schema migrations tracked in a `schema_version` table.
+
+Apply pending migrations from the command line (run from the `s03` directory):
+
+    python -m socials_api.api.models.migrations            # migrate to latest
+    python -m socials_api.api.models.migrations --target 1 # migrate up to version 1
+    python -m socials_api.api.models.migrations --status   # show current version
+
+The app also applies them at startup (see `DB_MIGRATE_ON_STARTUP`).
+"""
+
+import argparse
+import time
+from typing import Callable, Optional
+
+import sqlalchemy
+from sqlalchemy import Connection, text
+
+from socials_api.api.models.database import get_engine
+
+MIGRATIONS: dict[int, Callable[[Connection], None]] = {}
+
+
+def migration(version: int):
+    """Register a migration function under its version number."""
+
+    def decorator(func: Callable[[Connection], None]):
+        if version in MIGRATIONS:
+            raise ValueError(f"Duplicate migration version: {version}")
+        MIGRATIONS[version] = func
+        return func
+
+    return decorator
+
+
+# Helpers
+# -------------------------------->8-----------------------------------
+# SQLite runs DDL outside the migration's transaction, so every helper is
+# idempotent: a migration interrupted halfway can simply be applied again.
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    rows = conn.execute(text(f"PRAGMA table_info({table})")).fetchall()
+    return any(row.name == column for row in rows)
+
+
+def add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    """Add a column if missing. In SQLite this only rewrites the table definition,
+    not the rows, so it's instant on tables of any size (keep `ddl` nullable or
+    with a constant default)."""
+    if not has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def create_index(
+    conn: Connection, name: str, table: str, columns: str, where: str = ""
+) -> None:
+    """Build an index if missing. SQLite builds it in one sorted pass over the table.
+    Pass `where` for a partial index that only covers matching rows."""
+    where = f" WHERE {where}" if where else ""
+    conn.execute(
+        text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns}){where}")
+    )
+
+
+# Migrations
+# -------------------------------->8-----------------------------------
+# Never edit a migration once released; add a new one instead.
+
+
+@migration(1)
+def create_posts_and_comments(conn: Connection) -> None:
+    # frozen copy of the original `metadata.create_all` schema
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS posts ("
+            "id INTEGER NOT NULL, body VARCHAR, PRIMARY KEY (id))"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS comments ("
+            "id INTEGER NOT NULL, comment VARCHAR, post_id INTEGER NOT NULL, "
+            "PRIMARY KEY (id), FOREIGN KEY(post_id) REFERENCES posts (id))"
+        )
+    )
+
+
+@migration(2)
+def index_comments_post_id(conn: Connection) -> None:
+    # every per-post comment read and delete filters on post_id
+    create_index(conn, "ix_comments_post_id", "comments", "post_id")
+
+
+@migration(3)
+def soft_delete_posts_and_comments(conn: Connection) -> None:
+    add_column(conn, "posts", "deleted_at", "FLOAT")
+    add_column(conn, "comments", "deleted_at", "FLOAT")
+    # partial indexes: only tombstoned rows are indexed, so the purge task finds
+    # them without a table scan and live writes pay nothing
+    create_index(
+        conn, "ix_posts_deleted", "posts", "deleted_at", "deleted_at IS NOT NULL"
+    )
+    create_index(
+        conn,
+        "ix_comments_deleted",
+        "comments",
+        "deleted_at",
+        "deleted_at IS NOT NULL",
+    )
+
+
+@migration(4)
+def create_change_log(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "seq INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "
+            "table_name VARCHAR NOT NULL, row_id INTEGER NOT NULL, "
+            "op VARCHAR NOT NULL, changed_at FLOAT NOT NULL)"
+        )
+    )
+    # lets compaction find older entries for the same row
+    create_index(conn, "ix_changes_row", "changes", "table_name, row_id, seq")
+
+
+@migration(5)
+def create_post_documents(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS post_documents ("
+            "post_id INTEGER NOT NULL PRIMARY KEY, document BLOB NOT NULL, "
+            "comments BLOB NOT NULL, updated_at FLOAT NOT NULL)"
+        )
+    )
+
+
+@migration(6)
+def track_post_modified_at(conn: Connection) -> None:
+    # left NULL on existing posts (no Last-Modified until their next write), which
+    # keeps this instant
+    add_column(conn, "posts", "modified_at", "FLOAT")
+
+
+@migration(7)
+def add_comment_threads(conn: Connection) -> None:
+    add_column(conn, "comments", "parent_id", "INTEGER REFERENCES comments (id)")
+    add_column(conn, "comments", "depth", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "comments", "path", "VARCHAR")
+    # every existing comment is top-level: its path is its own id (the format of
+    # `core/threads.py`); one pass over the table, so not instant like the others
+    conn.execute(
+        text("UPDATE comments SET path = printf('%016x.', id) WHERE path IS NULL")
+    )
+    # a post's threads in path order, and any subtree as a range of it
+    create_index(conn, "ix_comments_thread", "comments", "post_id, path")
+
+
+@migration(8)
+def create_comment_reservations(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS comment_reservations ("
+            "reservation_id VARCHAR NOT NULL PRIMARY KEY, "
+            "comment_id INTEGER NOT NULL, created_at FLOAT NOT NULL)"
+        )
+    )
+    # lets expired reservations be dropped without a scan
+    create_index(
+        conn,
+        "ix_comment_reservations_created_at",
+        "comment_reservations",
+        "created_at",
+    )
+
+
+# Runner
+# -------------------------------->8-----------------------------------
+
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER NOT NULL PRIMARY KEY, applied_at FLOAT NOT NULL)"
+        )
+    )
+
+
+def current_version(conn: Connection) -> int:
+    _ensure_version_table(conn)
+    version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+def migrate(
+    engine: Optional[sqlalchemy.Engine] = None, target: Optional[int] = None
+) -> list[int]:
+    """Apply pending migrations up to `target` (latest by default), each in its own
+    transaction. Returns the versions applied."""
+    engine = engine or get_engine()
+    target = max(MIGRATIONS) if target is None else target
+
+    with engine.begin() as conn:
+        version = current_version(conn)
+
+    applied = []
+    for number in sorted(MIGRATIONS):
+        if number <= version or number > target:
+            continue
+        with engine.begin() as conn:
+            MIGRATIONS[number](conn)
+            conn.execute(
+                text(
+                    "INSERT INTO schema_version (version, applied_at) VALUES (:v, :t)"
+                ),
+                {"v": number, "t": time.time()},
+            )
+        applied.append(number)
+    return applied
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Apply socials_api schema migrations.")
+    parser.add_argument("--target", type=int, help="migrate up to this version")
+    parser.add_argument(
+        "--status", action="store_true", help="print the current version and exit"
+    )
+    args = parser.parse_args(argv)
+
+    if args.status:
+        with get_engine().begin() as conn:
+            print(f"schema version {current_version(conn)} (latest {max(MIGRATIONS)})")
+        return
+
+    start = time.perf_counter()
+    applied = migrate(target=args.target)
+    elapsed = time.perf_counter() - start
+    if applied:
+        print(f"applied migrations {applied} in {elapsed:.2f}s")
+    else:
+        print("schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
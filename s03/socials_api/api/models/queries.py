@@ -0,0 +1,92 @@
+"""The statements behind the single-row routes, compiled once (see `Prepared`).
+
+Per-request values are `bindparam`s, passed by name when executing, e.g.
+`await POST_BY_ID.fetch_one(db, id=id)`. List queries, whose filters vary, stay
+plain Core expressions in the routes.
+"""
+
+import sqlalchemy
+from sqlalchemy import bindparam
+
+from socials_api.api.models.database import (
+    change_db,
+    comment_db,
+    post_db,
+    reservation_db,
+    select_comments,
+    select_posts,
+)
+from socials_api.core.prepared import Prepared
+
+# Posts
+POST_BY_ID = Prepared(select_posts().where(post_db.c.id == bindparam("id")))
+
+UPDATE_POST_BODY = Prepared(
+    post_db.update()
+    .where(post_db.c.id == bindparam("id"))
+    .values(body=bindparam("body"), modified_at=bindparam("modified_at"))
+)
+
+# comment writes bump their post's `modified_at` too
+TOUCH_POST = Prepared(
+    post_db.update()
+    .where(post_db.c.id == bindparam("id"))
+    .values(modified_at=bindparam("modified_at"))
+)
+
+POST_MODIFIED_AT = Prepared(
+    select_posts()
+    .with_only_columns(post_db.c.modified_at)
+    .where(post_db.c.id == bindparam("id"))
+)
+
+SOFT_DELETE_POST = Prepared(
+    post_db.update()
+    .where(post_db.c.id == bindparam("id"))
+    .values(deleted_at=bindparam("deleted_at"))
+)
+
+# Change log
+LATEST_CHANGE = Prepared(
+    sqlalchemy.select(change_db.c.changed_at).order_by(change_db.c.seq.desc()).limit(1)
+)
+
+# Comments
+COMMENT_BY_ID = Prepared(select_comments().where(comment_db.c.id == bindparam("id")))
+
+COMMENTS_BY_POST = Prepared(
+    select_comments().where(comment_db.c.post_id == bindparam("post_id"))
+)
+
+# one row is enough to know
+HAS_COMMENTS = Prepared(
+    select_comments()
+    .with_only_columns(comment_db.c.id)
+    .where(comment_db.c.post_id == bindparam("post_id"))
+    .limit(1)
+)
+
+UPDATE_COMMENT_BODY = Prepared(
+    comment_db.update()
+    .where(comment_db.c.id == bindparam("id"))
+    .values(comment=bindparam("comment"))
+)
+
+# Write-behind reservations
+RESERVATION_BY_ID = Prepared(
+    reservation_db.select().where(
+        reservation_db.c.reservation_id == bindparam("reservation_id")
+    )
+)
+
+INSERT_RESERVATION = Prepared(
+    reservation_db.insert().values(
+        reservation_id=bindparam("reservation_id"),
+        comment_id=bindparam("comment_id"),
+        created_at=bindparam("created_at"),
+    )
+)
+
+EXPIRE_RESERVATIONS = Prepared(
+    reservation_db.delete().where(reservation_db.c.created_at < bindparam("before"))
+)
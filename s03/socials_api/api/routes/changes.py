@@ -0,0 +1,40 @@
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query
+
+from socials_api.api.models.database import change_db
+from socials_api.api.schema.changes import ChangesPage
+from socials_api.core.sharding import shards
+from socials_api.core.tracing import TracedRoute
+
+router = APIRouter(prefix="/changes", tags=["changes"], route_class=TracedRoute)
+
+
+# Get Changes since a Sequence Number
+@router.get("", response_model=ChangesPage)
+async def get_changes(
+    since: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    shard: Annotated[int, Query(ge=0)] = 0,
+):
+    """Get writes to posts and comments after sequence number `since`, oldest first.
+
+    Consumers keep the returned `next_since` and pass it back to pull only new changes.
+    A deleted post implies all of its comments are deleted too. When sharded, every
+    shard has its own feed and sequence numbers; consumers follow each `shard`.
+    """
+    if shard >= shards.count:
+        raise HTTPException(status_code=404, detail="Shard not found.")
+    db = shards.databases[shard]
+    q = (
+        change_db.select()
+        .where(change_db.c.seq > since)
+        .order_by(change_db.c.seq)
+        .limit(limit)
+    )
+    changes = await db.fetch_all(q)
+
+    return {
+        "changes": changes,
+        "next_since": changes[-1].seq if changes else since,
+    }
@@ -0,0 +1,80 @@
+import asyncio
+import secrets
+import threading
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from socials_api.api.schema.diagnostics import LoopStats
+from socials_api.config import config
+from socials_api.core.loop_monitor import loop_monitor
+from socials_api.core.profiling import collapsed, sample_stacks
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+# one profile at a time per worker: concurrent samplers would only skew each other
+profiling = threading.Lock()
+
+
+def require_admin(x_admin_token: Annotated[Optional[str], Header()] = None) -> None:
+    """Allow only requests carrying the configured `ADMIN_TOKEN`."""
+    if not (
+        config.ADMIN_TOKEN
+        and x_admin_token
+        and secrets.compare_digest(x_admin_token, config.ADMIN_TOKEN)
+    ):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+
+def require_profiler(
+    x_admin_token: Annotated[Optional[str], Header()] = None,
+) -> None:
+    """`require_admin`, with the profiler hidden unless `PROFILER_ENABLED` is on."""
+    if not config.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    require_admin(x_admin_token)
+
+
+# Get Event-Loop Lag
+# stacks show source paths: admin only
+@router.get("/loop", response_model=LoopStats, dependencies=[Depends(require_admin)])
+async def get_loop_stats():
+    """Get this worker's event-loop lag distribution and the stacks it was stuck on.
+
+    Stacks are sampled only when the loop is blocked for longer than
+    `LOOP_MONITOR_THRESHOLD`, most frequent first.
+    """
+    return loop_monitor.snapshot()
+
+
+# Profile the Worker
+@router.get(
+    "/profile",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_profiler)],
+)
+async def profile_worker(seconds: Annotated[float, Query(gt=0)] = 5.0):
+    """Sample every thread of this worker for `seconds` and return collapsed stacks.
+
+    Feed the result to flamegraph.pl or speedscope. Requests keep being served while
+    the profile runs, and show up in it.
+    """
+    if seconds > config.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be at most {config.PROFILER_MAX_SECONDS}.",
+        )
+    if not profiling.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running.")
+    try:
+        stacks = await asyncio.to_thread(
+            sample_stacks, seconds, config.PROFILER_INTERVAL
+        )
+    finally:
+        profiling.release()
+
+    return PlainTextResponse(
+        collapsed(stacks),
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'},
+    )
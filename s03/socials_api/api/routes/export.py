@@ -0,0 +1,44 @@
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from socials_api.config import config
+from socials_api.core.export import ExportFormat, export_stream
+from socials_api.core.sharding import shards
+from socials_api.core.tracing import TracedRoute
+
+router = APIRouter(prefix="/export", tags=["export"], route_class=TracedRoute)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+# Export All Posts with Comments
+@router.get("", response_class=StreamingResponse)
+async def export_posts_with_comments(
+    format: ExportFormat = "ndjson",
+    compress: Annotated[bool, Query(alias="gzip")] = False,
+    after_id: Annotated[int, Query(ge=0)] = 0,
+    shard: Annotated[int, Query(ge=0)] = 0,
+):
+    """Stream every post with its comments in post id order, chunk by chunk.
+
+    Pass the last post id you received as `after_id` to resume a cut-off download.
+    When sharded, each `shard` is exported on its own.
+    """
+    if shard >= shards.count:
+        raise HTTPException(status_code=404, detail="Shard not found.")
+    db = shards.databases[shard]
+
+    async def content():
+        async for data, _ in export_stream(
+            db, format, after_id, config.EXPORT_CHUNK_SIZE, compress
+        ):
+            yield data
+
+    filename = f"posts.{format}.gz" if compress else f"posts.{format}"
+    return StreamingResponse(
+        content(),
+        media_type="application/gzip" if compress else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from socials_api.api.schema.health import Liveness, Readiness
+from socials_api.core.health import health_checker
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+# Liveness
+@router.get("/live", response_model=Liveness)
+async def live():
+    """The worker is up and its event loop is answering; doesn't touch the database."""
+    return {"status": "ok"}
+
+
+# Readiness
+@router.get("/ready", response_model=Readiness, responses={503: {"model": Readiness}})
+async def ready():
+    """Ping every database now and report each one's latency; `503` while any of
+    them is down, so a load balancer stops sending traffic here."""
+    await health_checker.check()
+    ready = health_checker.healthy
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "unavailable",
+            "databases": health_checker.report(),
+        },
+    )
@@ -1,76 +1,256 @@
-from fastapi import APIRouter, HTTPException
+import time
+from typing import Annotated, Optional
 
-from socials_api.api.models.database import comment_db, db, post_db
-from socials_api.api.schema.user_comments import UserCommentIn, UserCommentOut
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
-router = APIRouter(prefix="/comment", tags=["user comments"])
+from socials_api.api.models.database import comment_db, select_comments
+from socials_api.api.models.queries import (
+    COMMENT_BY_ID,
+    COMMENTS_BY_POST,
+    HAS_COMMENTS,
+    POST_BY_ID,
+    RESERVATION_BY_ID,
+    TOUCH_POST,
+    UPDATE_COMMENT_BODY,
+)
+from socials_api.api.schema.user_comments import (
+    UserCommentAccepted,
+    UserCommentIn,
+    UserCommentNode,
+    UserCommentOut,
+    UserCommentReservation,
+)
+from socials_api.config import config
+from socials_api.core.changes import record_change, record_changes
+from socials_api.core.http_cache import cache_policy, latest_change, thread_modified
+from socials_api.core.pubsub import comment_events, comment_hub
+from socials_api.core.read_model import append_comment, get_document, refresh_document
+from socials_api.core.serialization import fast_json_response, rows_to_dicts
+from socials_api.core.sharding import shards
+from socials_api.core.threads import (
+    SOFT_DELETE_SUBTREE,
+    comment_values,
+    fetch_threads,
+    insert_comment,
+    subtree,
+    subtree_end,
+)
+from socials_api.core.tracing import TracedRoute
+from socials_api.core.write_behind import CommentQueueFull, comment_queue
+
+router = APIRouter(prefix="/comment", tags=["user comments"], route_class=TracedRoute)
 
 
 # Post Comments
-@router.post("", response_model=UserCommentOut, status_code=201)
+@router.post(
+    "",
+    response_model=UserCommentOut,
+    status_code=201,
+    responses={202: {"model": UserCommentAccepted}},
+)
 async def post_comments(input: UserCommentIn):
-    """Post comments on a post."""
+    """Post comments on a post. In write-behind mode the comment is queued and
+    inserted in a later batch, and a reservation id is returned instead."""
+    # comments live in their post's shard
+    db = shards.for_id(input.post_id)
     # check if comment post_id exists
-    q = post_db.select().where(post_db.c.id == input.post_id)
-    post = await db.fetch_one(q)
+    post = await POST_BY_ID.fetch_one(db, id=input.post_id)
     if not post:
         raise HTTPException(
             status_code=400, detail="Cannot comment on post_id that does not exist."
         )
 
+    parent = None
+    if input.parent_id is not None:
+        # a reply: the parent must be a live comment on the same post
+        parent = await COMMENT_BY_ID.fetch_one(db, id=input.parent_id)
+        if not parent or parent.post_id != post.id:
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot reply to a comment that is not on this post.",
+            )
+
+    if config.COMMENT_WRITE_BEHIND:
+        try:
+            reservation_id = comment_queue.submit(input.comment, post.id, parent)
+        except CommentQueueFull:
+            # backpressure: tell the client to back off instead of growing the queue
+            raise HTTPException(
+                status_code=503,
+                detail="Comment queue is full, try again later.",
+                headers={"Retry-After": "1"},
+            )
+        accepted = UserCommentAccepted(
+            reservation_id=reservation_id,
+            comment=input.comment,
+            post_id=post.id,
+            parent_id=input.parent_id,
+        )
+        comment_hub.publish(post.id, "accepted", accepted.model_dump())
+        return JSONResponse(status_code=202, content=accepted.model_dump())
+
     # set post comment
-    q = comment_db.insert().values({"comment": input.comment, "post_id": post.id})
-    comment_id = await db.execute(q)
+    async with db.transaction():
+        comment_id = await insert_comment(
+            shards,
+            shards.index_for(post.id),
+            comment_values(input.comment, post.id, parent),
+        )
+        comment = {
+            "id": comment_id,
+            "comment": input.comment,
+            "post_id": post.id,
+            "parent_id": input.parent_id,
+        }
+        await record_change(db, comment_db, comment_id, "insert")
+        await TOUCH_POST.execute(db, id=post.id, modified_at=time.time())
+        if config.READ_MODEL:
+            await append_comment(db, comment)
 
-    return {"id": comment_id, "comment": input.comment, "post_id": post.id}
+    comment_hub.publish(post.id, "created", comment)
+    return comment
 
 
 # Get All Comments
-@router.get("/all", response_model=list[UserCommentOut])
-async def get_all_comments():
-    """Get all post comments."""
-    q = comment_db.select()
-    all_comments = await db.fetch_all(q)
+@router.get(
+    "/all",
+    response_model=list[UserCommentOut],
+    dependencies=[cache_policy(latest_change)],
+)
+async def get_all_comments(
+    after_id: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[Optional[int], Query(ge=1)] = None,
+):
+    """Get all post comments in id order; pass the last id you got as `after_id` for
+    the next page."""
+    # select_comments is ordered already; fetch_merged orders every shard by id
+    q = select_comments().order_by(None).where(comment_db.c.id > after_id)
+    all_comments = await shards.fetch_merged(q, comment_db.c.id, limit)
+
+    if config.FAST_SERIALIZATION:
+        return fast_json_response(rows_to_dicts(all_comments, UserCommentOut))
 
     return all_comments
 
 
+# Resolve a Write-Behind Reservation
+@router.get("/reservation/{reservation_id}", response_model=UserCommentReservation)
+async def get_comment_reservation(reservation_id: str):
+    """Get the id of the comment a write-behind `reservation_id` became."""
+    # write-behind is unsharded: everything is in shard 0
+    reservation = await RESERVATION_BY_ID.fetch_one(
+        shards.databases[0], reservation_id=reservation_id
+    )
+    if not reservation:
+        raise HTTPException(
+            status_code=404,
+            detail="Reservation not found: still queued, or expired.",
+        )
+    return reservation
+
+
 # Get Comments by Post ID
-@router.get("/{post_id}", response_model=list[UserCommentOut])
+@router.get(
+    "/{post_id}",
+    response_model=list[UserCommentOut],
+    dependencies=[cache_policy(thread_modified)],
+)
 async def get_comments_by_post_id(post_id: int):
     """Get comments by post."""
+    db = shards.for_id(post_id)
+    if config.READ_MODEL:
+        # stored pre-rendered with the post (see `GET /post/{id}/full`)
+        document = await get_document(db, post_id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Post id not found.")
+        return Response(content=document.comments, media_type="application/json")
+
     # check if post exist
-    q = post_db.select().where(post_db.c.id == post_id)
-    post = await db.fetch_one(q)
+    post = await POST_BY_ID.fetch_one(db, id=post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post id not found.")
 
-    q = comment_db.select().where(comment_db.c.post_id == post.id)
-    comments = await db.fetch_all(q)
+    comments = await COMMENTS_BY_POST.fetch_all(db, post_id=post.id)
 
     return comments
 
 
+# Get Comment Threads by Post ID
+@router.get(
+    "/{post_id}/threads",
+    response_model=list[UserCommentNode],
+    dependencies=[cache_policy(thread_modified)],
+)
+async def get_comment_threads(
+    post_id: int,
+    after_id: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[Optional[int], Query(ge=1)] = None,
+    max_depth: Annotated[Optional[int], Query(ge=0)] = None,
+):
+    """Get a post's comments as reply trees, a page of top-level comments at a time
+    (pass the last top-level id you got as `after_id` for the next page), with
+    replies down to `max_depth` levels."""
+    db = shards.for_id(post_id)
+    # check if post exist
+    post = await POST_BY_ID.fetch_one(db, id=post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post id not found.")
+
+    if max_depth is None:
+        max_depth = config.COMMENT_THREAD_MAX_DEPTH
+    # the whole page in one range query, nested in one pass
+    threads = await fetch_threads(db, post.id, after_id, limit, max_depth)
+
+    if config.FAST_SERIALIZATION:
+        return fast_json_response(threads)
+
+    return threads
+
+
+# Stream Comments by Post ID
+@router.get("/{post_id}/stream", response_class=StreamingResponse)
+async def stream_comments_by_post_id(post_id: int):
+    """Stream comment events on a post (created, updated, deleted) as server-sent
+    events, instead of polling `GET /comment/{post_id}`."""
+    db = shards.for_id(post_id)
+    # check if post exist
+    post = await POST_BY_ID.fetch_one(db, id=post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post id not found.")
+
+    return StreamingResponse(
+        comment_events(comment_hub, post.id, config.STREAM_KEEPALIVE),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # Modify/Update Comment by Comment ID
 @router.put("/{comment_id}", response_model=UserCommentOut)
 async def modify_comment(comment_id: int, comment_body: str):
     """Modify comment by comment id and post id."""
+    db = shards.for_id(comment_id)
     # check if comment_id exists
-    q = comment_db.select().where(comment_db.c.id == comment_id)
-    comment = await db.fetch_one(q)
+    comment = await COMMENT_BY_ID.fetch_one(db, id=comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment id not found.")
 
     # update comment
-    q_update_comment = (
-        comment_db.update()
-        .where(comment_db.c.id == comment_id)
-        .values(comment=comment_body)
-    )
-    await db.execute(q_update_comment)
+    async with db.transaction():
+        await UPDATE_COMMENT_BODY.execute(db, id=comment_id, comment=comment_body)
+        await record_change(db, comment_db, comment_id, "update")
+        await TOUCH_POST.execute(db, id=comment.post_id, modified_at=time.time())
+        if config.READ_MODEL:
+            await refresh_document(db, comment.post_id)
 
     # grab new comment data
-    comment = await db.fetch_one(q)
+    comment = await COMMENT_BY_ID.fetch_one(db, id=comment_id)
+    comment_hub.publish(
+        comment.post_id,
+        "updated",
+        {"id": comment.id, "comment": comment.comment, "post_id": comment.post_id},
+    )
     return comment
 
 
@@ -78,21 +258,30 @@ async def modify_comment(comment_id: int, comment_body: str):
 @router.delete("/post/{post_id}")
 async def delete_comments_by_post_id(post_id: int):
     """Delete all comments with a post id. Also deletes all post comments from the comment database."""
+    db = shards.for_id(post_id)
     # check if post exist
-    q = post_db.select().where(post_db.c.id == post_id)
-    post = await db.fetch_one(q)
+    post = await POST_BY_ID.fetch_one(db, id=post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post id not found.")
 
-    # check if post has comments
-    q = comment_db.select().where(comment_db.c.post_id == post_id)
-    comments = await db.fetch_all(q)
-    if not comments:
+    # check if post has comments (one row is enough to know)
+    comment = await HAS_COMMENTS.fetch_one(db, post_id=post_id)
+    if not comment:
         raise HTTPException(status_code=404, detail="Post does not have comments.")
 
-    # delete comments associated to post
-    q = comment_db.delete().where(comment_db.c.post_id == post_id)
-    await db.execute(q)
+    # soft delete comments associated to post; the purge task removes them later
+    live_comments = (
+        comment_db.c.post_id == post_id,
+        comment_db.c.deleted_at.is_(None),
+    )
+    q = comment_db.update().where(*live_comments).values(deleted_at=time.time())
+    async with db.transaction():
+        await db.execute(record_changes(comment_db, *live_comments, op="delete"))
+        await db.execute(q)
+        await TOUCH_POST.execute(db, id=post_id, modified_at=time.time())
+        if config.READ_MODEL:
+            await refresh_document(db, post_id)
+    comment_hub.publish(post_id, "deleted_all", {"post_id": post_id})
 
     return {
         "message": f"All comments on post_id ({post_id}) have been deleted successfully."
@@ -103,14 +292,32 @@ async def delete_comments_by_post_id(post_id: int):
 @router.delete("/{comment_id}")
 async def delete_comment_by_comment_id(comment_id: int):
     """Delete comment by comment id."""
+    db = shards.for_id(comment_id)
     # check if comment exists
-    q = comment_db.select().where(comment_db.c.id == comment_id)
-    comment = await db.fetch_one(q)
+    comment = await COMMENT_BY_ID.fetch_one(db, id=comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found.")
 
-    # delete comment
-    q = comment_db.delete().where(comment_db.c.id == comment_id)
-    await db.execute(q)
+    # soft delete the comment and its replies; the purge task removes them later
+    replies = subtree(comment.post_id, comment.path)
+    async with db.transaction():
+        await db.execute(
+            record_changes(
+                comment_db, *replies, comment_db.c.deleted_at.is_(None), op="delete"
+            )
+        )
+        await SOFT_DELETE_SUBTREE.execute(
+            db,
+            post_id=comment.post_id,
+            path=comment.path,
+            end=subtree_end(comment.path),
+            deleted_at=time.time(),
+        )
+        await TOUCH_POST.execute(db, id=comment.post_id, modified_at=time.time())
+        if config.READ_MODEL:
+            await refresh_document(db, comment.post_id)
+    comment_hub.publish(
+        comment.post_id, "deleted", {"id": comment.id, "post_id": comment.post_id}
+    )
 
     return {"message": "Comment deleted successfully!"}
@@ -1,14 +1,49 @@
-from fastapi import APIRouter, HTTPException
-
-from socials_api.api.models.database import comment_db, db, post_db
-from socials_api.api.routes.user_comments import delete_comments_by_post_id
+import heapq
+import time
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
+
+from socials_api.api.models.database import (
+    comment_db,
+    post_db,
+    select_comments,
+    select_posts,
+)
+from socials_api.api.models.queries import (
+    COMMENTS_BY_POST,
+    HAS_COMMENTS,
+    POST_BY_ID,
+    SOFT_DELETE_POST,
+    UPDATE_POST_BODY,
+)
 from socials_api.api.schema.user_posts import (
     UserPostIn,
     UserPostOut,
     UserPostWithComments,
 )
+from socials_api.config import config
+from socials_api.core.changes import record_change
+from socials_api.core.http_cache import cache_policy, latest_change, post_modified
+from socials_api.core.offload import (
+    offloader,
+    posts_with_comments,
+    posts_with_comments_json,
+)
+from socials_api.core.pubsub import comment_hub
+from socials_api.core.read_model import (
+    drop_document,
+    get_document,
+    refresh_document,
+    render,
+    store_document,
+)
+from socials_api.core.serialization import fast_json_response, rows_to_dicts
+from socials_api.core.sharding import shards
+from socials_api.core.tracing import TracedRoute
 
-router = APIRouter(prefix="/post", tags=["user posts"])
+router = APIRouter(prefix="/post", tags=["user posts"], route_class=TracedRoute)
 
 
 # Create Posts
@@ -20,17 +55,39 @@ async def create_post(post: UserPostIn):
     # q = post_db.insert().values(post.model_dump())
     # last_post_id = await db.execute(q)
     # Method 2...
-    q = post_db.insert()
-    post_id = await db.execute(q, post.model_dump())
+    index = shards.next_index()
+    db = shards.databases[index]
+    # log the write in the same transaction so the change feed never misses it
+    async with db.transaction():
+        post_id = await shards.insert(
+            index, post_db, {**post.model_dump(), "modified_at": time.time()}
+        )
+        await record_change(db, post_db, post_id, "insert")
+        if config.READ_MODEL:
+            await store_document(
+                db, post_id, render({**post.model_dump(), "id": post_id}, [])
+            )
 
     return {**(post.model_dump()), "id": post_id}
 
 
 # Get All Posts
-@router.get("/all", response_model=list[UserPostOut])
-async def get_all_posts() -> list[UserPostOut]:
-    q = post_db.select()
-    posts = await db.fetch_all(q)
+@router.get(
+    "/all",
+    response_model=list[UserPostOut],
+    dependencies=[cache_policy(latest_change)],
+)
+async def get_all_posts(
+    after_id: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[Optional[int], Query(ge=1)] = None,
+) -> list[UserPostOut]:
+    """Get posts in id order; pass the last id you got as `after_id` for the next page."""
+    # every shard is queried at once, and their pages merged
+    q = select_posts().where(post_db.c.id > after_id)
+    posts = await shards.fetch_merged(q, post_db.c.id, limit)
+
+    if config.FAST_SERIALIZATION:
+        return fast_json_response(rows_to_dicts(posts, UserPostOut))
 
     if not posts:
         return []
@@ -39,61 +96,105 @@ async def get_all_posts() -> list[UserPostOut]:
 
 
 # Get All Posts with Comments
-@router.get("/all/comments", response_model=list[UserPostWithComments])
+@router.get(
+    "/all/comments",
+    response_model=list[UserPostWithComments],
+    dependencies=[cache_policy(latest_change)],
+)
 async def get_all_posts_with_comments():
     """Get all posts with comments."""
-    # fetch posts
-    q = post_db.select()
-    all_posts = await db.fetch_all(q)
-    # if not all_posts:
-    #     return []
-
-    # fetch comments
-    q = comment_db.select()
-    all_comments = await db.fetch_all(q)
-
-    result = [
-        {
-            "post": {"body": post.body, "id": post.id},
-            "comments": [
-                {"id": comment.id, "comment": comment.comment}
-                for comment in all_comments
-                if comment.post_id == post.id
-            ],
-        }
-        for post in all_posts
-    ]
+    # fetch posts, then comments, as compact (id, body) and (post_id, id, comment)
+    # tuples: `_mapping` skips the per-column lookups of record attribute access
+    posts_q = (
+        select_posts()
+        .with_only_columns(post_db.c.id, post_db.c.body)
+        .order_by(post_db.c.id)
+    )
+    comments_q = select_comments().with_only_columns(
+        comment_db.c.post_id, comment_db.c.id, comment_db.c.comment
+    )
+
+    async def fetch(db) -> tuple[list, list]:
+        posts = [tuple(row._mapping) for row in await db.fetch_all(posts_q)]
+        comments = [tuple(row._mapping) for row in await db.fetch_all(comments_q)]
+        return posts, comments
+
+    # a post's comments live in its shard, so only the posts need merging
+    results = await shards.gather(fetch)
+    posts = list(heapq.merge(*(posts for posts, _ in results)))
+    comments = [comment for _, comments in results for comment in comments]
+
+    # big results are assembled and encoded off the event loop, so other requests
+    # aren't stalled behind them; like the fast path, this skips response validation
+    if offloader.should_offload(len(posts) + len(comments)):
+        content = await offloader.run(posts_with_comments_json, posts, comments)
+        return Response(content=content, media_type="application/json")
+
+    result = posts_with_comments(posts, comments)
+
+    if config.FAST_SERIALIZATION:
+        return fast_json_response(result)
+
     return result
 
 
 # Get Post by ID
-@router.get("/{id}", response_model=UserPostOut)
+@router.get(
+    "/{id}", response_model=UserPostOut, dependencies=[cache_policy(post_modified)]
+)
 async def get_post_by_id(id: int) -> UserPostOut:
-    q = post_db.select().where(post_db.c.id == id)
-    post = await db.fetch_one(q)
+    db = shards.for_id(id)
+    post = await POST_BY_ID.fetch_one(db, id=id)
     if not post:
         raise HTTPException(status_code=404, detail="Post id not in database.")
 
     return post
 
 
+# Get Post by ID with Comments
+@router.get(
+    "/{id}/full",
+    response_model=UserPostWithComments,
+    dependencies=[cache_policy(post_modified)],
+)
+async def get_post_with_comments(id: int):
+    """Get a post with its comments."""
+    db = shards.for_id(id)
+    if config.READ_MODEL:
+        # stored pre-rendered: one primary-key lookup, nothing to serialize
+        document = await get_document(db, id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Post id not in database.")
+        return Response(content=document.document, media_type="application/json")
+
+    post = await POST_BY_ID.fetch_one(db, id=id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post id not in database.")
+
+    comments = await COMMENTS_BY_POST.fetch_all(db, post_id=id)
+    return {"post": post, "comments": comments}
+
+
 # Update Post by ID
 @router.put("/{id}", response_model=UserPostOut)
 async def update_post_by_id(id: int, new_post: UserPostIn) -> UserPostOut:
+    db = shards.for_id(id)
     # check if post exists
-    q = post_db.select().where(post_db.c.id == id)
-    post = await db.fetch_one(q)
+    post = await POST_BY_ID.fetch_one(db, id=id)
     if not post:
         raise HTTPException(status_code=404, detail="Post id not in database.")
 
     # update post in db
-    q_update_post = (
-        post_db.update().where(post_db.c.id == id).values(body=new_post.body)
-    )
-    await db.execute(q_update_post)
+    async with db.transaction():
+        await UPDATE_POST_BODY.execute(
+            db, id=id, body=new_post.body, modified_at=time.time()
+        )
+        await record_change(db, post_db, id, "update")
+        if config.READ_MODEL:
+            await refresh_document(db, id)
 
     # get updated post
-    post = await db.fetch_one(q)
+    post = await POST_BY_ID.fetch_one(db, id=id)
 
     return post
 
@@ -102,24 +203,35 @@ async def update_post_by_id(id: int, new_post: UserPostIn) -> UserPostOut:
 @router.delete("/{id}")
 async def delete_post_by_id(id: int):
     """Delete post by id. Also delete post_id from comment database."""
-    q = post_db.select().where(post_db.c.id == id)
-    post = await db.fetch_one(q)
+    db = shards.for_id(id)
+    post = await POST_BY_ID.fetch_one(db, id=id)
     if not post:
         raise HTTPException(status_code=404, detail="Post id not in database.")
 
-    try:
-        # delete comments associated with post
-        comments_update = await delete_comments_by_post_id(id)
-    except HTTPException:
+    # check if post has comments (one row is enough to know)
+    has_comments = await HAS_COMMENTS.fetch_one(db, post_id=id) is not None
+
+    # soft delete only the post: reads hide comments of deleted posts and the purge
+    # task removes them in batches, so this costs the same however big the thread is
+    # (the change feed gets one entry for the post, which implies its comments)
+    async with db.transaction():
+        await SOFT_DELETE_POST.execute(db, id=id, deleted_at=time.time())
+        await record_change(db, post_db, id, "delete")
+        if config.READ_MODEL:
+            await drop_document(db, id)
+    # ends every comment stream on this post
+    comment_hub.publish(id, "post_deleted", {"post_id": id})
+
+    if not has_comments:
         return {
             "message": f"Post with id ({id}) deleted successfully!",
             "post_comments": {"has_comments": False},
         }
-    finally:
-        q = post_db.delete().where(post_db.c.id == id)
-        await db.execute(q)
 
     return {
         "message": f"Post with id ({id}) deleted successfully!",
-        "post_comments": {"has_comments": True, **comments_update},
+        "post_comments": {
+            "has_comments": True,
+            "message": f"All comments on post_id ({id}) have been deleted successfully.",
+        },
     }
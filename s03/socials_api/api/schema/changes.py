@@ -0,0 +1,17 @@
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ChangeOut(BaseModel):
+    seq: int
+    table_name: Literal["posts", "comments"]
+    row_id: int
+    op: Literal["insert", "update", "delete"]
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ChangesPage(BaseModel):
+    changes: list[ChangeOut]
+    # pass back as `since` to get the next page
+    next_since: int
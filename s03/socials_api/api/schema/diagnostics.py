@@ -0,0 +1,27 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class LagBucket(BaseModel):
+    # upper bound of the bucket; None for the last, unbounded one
+    le_ms: Optional[float]
+    count: int
+
+
+class LoopStall(BaseModel):
+    count: int
+    max_stuck_ms: float
+    # innermost frame last, as "file:line in function"
+    stack: list[str]
+
+
+class LoopStats(BaseModel):
+    running: bool
+    interval_ms: float
+    threshold_ms: float
+    samples: int
+    mean_ms: float
+    max_ms: float
+    histogram: list[LagBucket]
+    stalls: list[LoopStall]
@@ -0,0 +1,23 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+
+class Liveness(BaseModel):
+    status: Literal["ok"]
+
+
+class DatabaseStatus(BaseModel):
+    shard: int
+    healthy: bool
+    # of the last successful ping
+    latency_ms: Optional[float]
+    # consecutive failed pings
+    failures: int
+    reconnects: int
+    last_error: Optional[str]
+
+
+class Readiness(BaseModel):
+    status: Literal["ready", "unavailable"]
+    databases: list[DatabaseStatus]
@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -6,6 +6,8 @@ from pydantic import BaseModel, ConfigDict
 class UserCommentIn(BaseModel):
     post_id: Annotated[int, "post_id"]
     comment: Annotated[str, "comment_body"]
+    # reply to this comment (on the same post) instead of the post itself
+    parent_id: Annotated[Optional[int], "parent comment_id"] = None
 
 
 class UserComment(BaseModel):
@@ -15,4 +17,19 @@ class UserComment(BaseModel):
 
 class UserCommentOut(UserComment):
     post_id: Annotated[int, "post_id"]
+    parent_id: Annotated[Optional[int], "parent comment_id"] = None
     model_config = ConfigDict(from_attributes=True)
+
+
+class UserCommentNode(UserCommentOut):
+    depth: Annotated[int, "0 for a top-level comment"]
+    replies: list["UserCommentNode"]
+
+
+class UserCommentAccepted(UserCommentIn):
+    reservation_id: Annotated[str, "write-behind reservation id"]
+
+
+class UserCommentReservation(BaseModel):
+    reservation_id: Annotated[str, "write-behind reservation id"]
+    comment_id: Annotated[int, "id of the stored comment"]
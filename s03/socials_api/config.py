@@ -1,8 +1,10 @@
 import os
-from typing import Annotated, Optional
+from typing import Annotated, Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from socials_api.core.lazy import Lazy
+
 
 class BaseConfig(BaseSettings):
     ENV_STATE: Optional[str] = None
@@ -16,9 +18,148 @@ class BaseConfig(BaseSettings):
 class GlobalConfig(BaseConfig):
     DATABASE_URL: Optional[str] = None
     DB_FORCE_ROLLBACK: bool = False
+    # apply pending schema migrations in the app lifespan
+    DB_MIGRATE_ON_STARTUP: bool = True
+    # partition posts (and their comments) by id across these databases instead of
+    # DATABASE_URL; ids map to shards by position, so never reorder or resize the list
+    SHARD_URLS: list[str] = []
+    # "snowflake": time-ordered 64-bit post and comment ids made in the process, so
+    # workers and shards insert without a central allocator; "sequential": ids from
+    # the database (max + 1 within the shard's id class when sharded)
+    ID_GENERATOR: Literal["sequential", "snowflake"] = "sequential"
+    # unique per process, 0-1023; unset derives it from the process id
+    WORKER_ID: Optional[int] = None
+    # serve list endpoints straight from db rows, skipping per-row response validation
+    FAST_SERIALIZATION: bool = False
+    # keep each post with its comments as one pre-rendered JSON document, updated by
+    # the writes, and serve `GET /post/{id}/full` and `GET /comment/{post_id}` from it
+    READ_MODEL: bool = False
+    # replies returned below each top-level comment by `GET /comment/{post_id}/threads`
+    # unless the request passes `max_depth`
+    COMMENT_THREAD_MAX_DEPTH: int = 5
+    # accept comments into an in-process queue and insert them in batches (202 Accepted)
+    COMMENT_WRITE_BEHIND: bool = False
+    COMMENT_QUEUE_MAXSIZE: int = 1000
+    COMMENT_QUEUE_BATCH_SIZE: int = 100
+    COMMENT_QUEUE_FLUSH_INTERVAL: float = 0.05  # seconds
+    # a failing batch is retried MAX_RETRIES times with exponential backoff from
+    # RETRY_BACKOFF seconds, then its comments are written one by one; those that still
+    # fail are appended to the DEAD_LETTER_FILE (NDJSON) instead of being lost
+    COMMENT_QUEUE_MAX_RETRIES: int = 3
+    COMMENT_QUEUE_RETRY_BACKOFF: float = 0.1
+    COMMENT_QUEUE_DEAD_LETTER_FILE: str = "comment_dead_letters.ndjson"
+    # seconds a reservation id can be resolved to its comment (GET /comment/reservation)
+    COMMENT_RESERVATION_TTL: float = 86400.0
+    # background removal of soft-deleted posts and comments
+    PURGE_ENABLED: bool = True
+    PURGE_BATCH_SIZE: int = 500
+    PURGE_INTERVAL: float = 5.0  # seconds
+    # Cache-Control on the cacheable GETs, plus Last-Modified and 304 answers to
+    # If-Modified-Since; STALE_WHILE_REVALIDATE lets a proxy serve a stale copy for
+    # that many seconds while it revalidates
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_MAX_AGE: int = 5  # seconds
+    HTTP_CACHE_STALE_WHILE_REVALIDATE: int = 30  # seconds
+    # response compression, in order of preference (br/zstd need brotli/zstandard)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes
+    COMPRESSION_ENCODINGS: list[str] = ["zstd", "br", "gzip"]
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    # number of compressed bodies kept so hot responses are compressed once
+    COMPRESSION_CACHE_SIZE: int = 128
+    # per-client, per-route token buckets: RATE tokens/second, up to BURST saved up
+    RATE_LIMIT_ENABLED: bool = False
+    RATE_LIMIT_RATE: float = 10.0
+    RATE_LIMIT_BURST: float = 20.0
+    RATE_LIMIT_MAX_KEYS: int = 10_000
+    # tokens charged per request for expensive routes, e.g. {"GET /post/all/comments": 5}
+    RATE_LIMIT_COSTS: dict[str, float] = {}
+    # only enable behind a proxy that sets X-Forwarded-For
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+    # requests in flight before new ones are shed with 503 (0 = no cap)
+    MAX_CONCURRENT_REQUESTS: int = 0
+    # seconds a request may take to start its response before it's answered with 504
+    # and its running query interrupted (0 = no limit); REQUEST_TIMEOUTS overrides it
+    # per route, e.g. {"GET /post/all/comments": 30}
+    REQUEST_TIMEOUT: float = 10.0
+    REQUEST_TIMEOUTS: dict[str, float] = {"GET /diagnostics/profile": 0.0}
+    # comment event streams: events buffered per watcher before it's evicted as too
+    # slow, and seconds between keepalives on an idle stream
+    STREAM_BUFFER_SIZE: int = 100
+    STREAM_KEEPALIVE: float = 15.0
+    # rows (a comment, or a post without any) per chunk, one query each, when
+    # exporting the whole dataset
+    EXPORT_CHUNK_SIZE: int = 1000
+    # build and encode big /post/all/comments responses in a "thread" or "process"
+    # pool instead of on the event loop; results under MIN_ROWS rows stay inline
+    OFFLOAD_MODE: Literal["off", "thread", "process"] = "off"
+    OFFLOAD_MIN_ROWS: int = 5000
+    OFFLOAD_WORKERS: int = 2
+    # measure event-loop lag every INTERVAL seconds and sample the loop's stack when
+    # it's blocked for more than THRESHOLD seconds (GET /diagnostics/loop, which needs
+    # the ADMIN_TOKEN like the profiler)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL: float = 0.1
+    LOOP_MONITOR_THRESHOLD: float = 0.1
+    LOOP_MONITOR_MAX_STACKS: int = 20
+    # GET /diagnostics/profile samples every thread of the worker for up to MAX_SECONDS;
+    # requests must send the ADMIN_TOKEN in an X-Admin-Token header
+    PROFILER_ENABLED: bool = False
+    PROFILER_INTERVAL: float = 0.005  # seconds between samples
+    PROFILER_MAX_SECONDS: float = 60.0
+    ADMIN_TOKEN: Optional[str] = None
+    # `?profile=1` on any request returns a profile of it instead of the response;
+    # never enable in production
+    REQUEST_PROFILING: bool = False
+    # ping every database every INTERVAL seconds; after FAILURES failed (or slower
+    # than TIMEOUT) pings in a row, requests get an immediate 503 while the
+    # connection is reopened with jittered exponential backoff (GET /health/ready)
+    HEALTH_CHECK_ENABLED: bool = True
+    HEALTH_CHECK_INTERVAL: float = 2.0
+    HEALTH_CHECK_TIMEOUT: float = 1.0
+    HEALTH_CHECK_FAILURES: int = 2
+    HEALTH_RECONNECT_BACKOFF: float = 0.5  # seconds, doubled per attempt
+    HEALTH_RECONNECT_MAX_BACKOFF: float = 30.0
+    # JSON access log lines (route, status, latency, db queries, bytes) written by a
+    # background thread to ACCESS_LOG_FILE, or stdout; SAMPLE_RATE of the successful
+    # requests are logged, and every error and request slower than SLOW_THRESHOLD
+    # seconds; lines are dropped rather than wait when QUEUE_SIZE are pending
+    ACCESS_LOG_ENABLED: bool = True
+    ACCESS_LOG_FILE: Optional[str] = None
+    ACCESS_LOG_SAMPLE_RATE: float = 0.1
+    ACCESS_LOG_SLOW_THRESHOLD: float = 1.0
+    ACCESS_LOG_QUEUE_SIZE: int = 10_000
+    # OpenTelemetry spans for requests, route phases, db statements and serialization
+    # (needs the opentelemetry extras); SAMPLE_RATE of new traces are kept, and
+    # exported by a background thread over OTLP/HTTP to OTLP_ENDPOINT, or as OTLP
+    # JSON lines appended to TRACING_FILE with the "file" exporter
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATE: float = 0.01
+    TRACING_EXPORTER: Literal["otlp", "file"] = "otlp"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_SERVICE_NAME: str = "socials_api"
+    # run a few cheap reads in the lifespan, so each worker has its db connection open
+    # and the hot pages cached before it accepts traffic
+    WARM_UP_ON_STARTUP: bool = True
+    # `python -m socials_api.serve` (0 workers = one per CPU); "auto" picks uvloop and
+    # httptools when they're installed
+    SERVER_HOST: str = "127.0.0.1"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 1
+    SERVER_LOOP: Literal["auto", "asyncio", "uvloop"] = "auto"
+    SERVER_HTTP: Literal["auto", "h11", "httptools"] = "auto"
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE: int = 5  # seconds an idle connection is kept open
+    # connections per worker before new ones get 503 (0 = no cap)
+    SERVER_LIMIT_CONCURRENCY: int = 0
 
 
 class DevConfig(GlobalConfig):
+    REQUEST_PROFILING: bool = True
+
     model_config = SettingsConfigDict(env_prefix="DEV_")
 
 
@@ -29,6 +170,7 @@ class ProdConfig(GlobalConfig):
 class TestConfig(GlobalConfig):
     DATABASE_URL: str = "sqlite:///test.db"
     DB_FORCE_ROLLBACK: bool = True
+    REQUEST_PROFILING: bool = True
 
     model_config = SettingsConfigDict(env_prefix="TEST_")
 
@@ -66,6 +208,8 @@ def get_config(env_state: str):
     return env_configs[env_state]()
 
 
-config: Annotated[GlobalConfig, "imported .env vars"] = get_config(
-    BaseConfig().ENV_STATE
+# resolved on first attribute access rather than at import, so importing the app
+# (or collecting tests) doesn't read the .env file
+config: Annotated[GlobalConfig, "imported .env vars"] = Lazy(
+    lambda: get_config(BaseConfig().ENV_STATE)
 )
@@ -0,0 +1,183 @@
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from socials_api.api.models.database import QueryCounter, query_counter
+from socials_api.config import config
+from socials_api.core.lazy import Lazy
+from socials_api.core.serialization import dumps
+
+LOGGER = "socials_api.access"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: the record's time plus its `access` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            **record.access,
+        }
+        return dumps(entry).decode()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue records for the writer thread as they are, dropping them when the
+    queue is full.
+
+    The stock `QueueHandler` formats each record before queueing it, which would put
+    the JSON encoding back on the event loop; and it reports a full queue as a
+    logging error on every record.
+    """
+
+    def __init__(self, queue: queue.Queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AccessLog:
+    """JSON access log written by a background thread.
+
+    Requests only put a record on a bounded queue; a `QueueListener` thread formats
+    and writes it with `handler`, so slow disks or pipes never block the event loop
+    (records are dropped and counted instead when the queue is full). Successful
+    requests are sampled at `sample_rate`; errors (status >= 400) and requests
+    slower than `slow_threshold` seconds are always logged.
+    """
+
+    def __init__(
+        self,
+        handler: logging.Handler,
+        sample_rate: float = 1.0,
+        slow_threshold: float = 1.0,
+        queue_size: int = 10_000,
+        random: Callable[[], float] = random.random,
+    ):
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.random = random
+        handler.setFormatter(JsonFormatter())
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(self.queue, handler)
+        # not registered with `logging`: nothing else attaches handlers to it, and its
+        # records never propagate up to the root logger
+        self.logger = logging.Logger(LOGGER, logging.INFO)  # noqa: LOG001
+        self.logger.addHandler(self.handler)
+        self._running = False
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self.listener.start()
+        self._running = True
+
+    def stop(self) -> None:
+        """Stop the writer thread once it has written every queued record."""
+        if not self._running:
+            return
+        self.listener.stop()
+        self._running = False
+
+    def wanted(self, status: int, duration: float) -> bool:
+        return (
+            status >= 400
+            or duration >= self.slow_threshold
+            or self.random() < self.sample_rate
+        )
+
+    def log(self, entry: dict) -> None:
+        self.logger.info("access", extra={"access": entry})
+
+
+class AccessLogMiddleware:
+    """Time each request and hand its `AccessLog` entry over once the response is
+    sent, with the route template, status, latency, bytes and db query count."""
+
+    def __init__(self, app: ASGIApp, access_log: AccessLog):
+        self.app = app
+        self.access_log = access_log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500  # if the app fails before responding
+        sent = 0
+        counter = QueryCounter()
+        token = query_counter.set(counter)
+
+        async def send_counted(message: Message) -> None:
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            query_counter.reset(token)
+            duration = time.perf_counter() - start
+            if self.access_log.wanted(status, duration):
+                route = scope.get("route")
+                self.access_log.log(
+                    {
+                        "method": scope["method"],
+                        # the template, so /post/1 and /post/2 aggregate together
+                        "route": getattr(route, "path", None),
+                        "path": scope["path"],
+                        "status": status,
+                        "duration_ms": round(duration * 1000, 3),
+                        "queries": counter.count,
+                        "bytes": sent,
+                    }
+                )
+
+
+def access_log_middleware(app: ASGIApp) -> ASGIApp:
+    """Wrap app in `AccessLogMiddleware` unless `ACCESS_LOG_ENABLED` is off."""
+    if not config.ACCESS_LOG_ENABLED:
+        return app
+    return AccessLogMiddleware(app, access_log)
+
+
+def _build_access_log() -> AccessLog:
+    handler: logging.Handler
+    if config.ACCESS_LOG_FILE:
+        handler = logging.FileHandler(config.ACCESS_LOG_FILE)
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+    return AccessLog(
+        handler,
+        sample_rate=config.ACCESS_LOG_SAMPLE_RATE,
+        slow_threshold=config.ACCESS_LOG_SLOW_THRESHOLD,
+        queue_size=config.ACCESS_LOG_QUEUE_SIZE,
+    )
+
+
+# built on first use; the lifespan starts and stops its writer thread
+access_log: AccessLog = Lazy(_build_access_log)
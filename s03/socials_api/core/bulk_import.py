@@ -0,0 +1,269 @@
+"""Load NDJSON dumps straight into SQLite, bypassing the API.
+
+Each line is one post with its comments, the format `GET /export` produces:
+
+    {"post": {"id": 1, "body": "..."}, "comments": [{"comment": "..."}, ...]}
+
+Post ids are kept when present (pass --new-ids to renumber them after the current
+max id); comment ids are always assigned by SQLite. From the `s03` directory:
+
+    python -m socials_api.core.bulk_import posts.ndjson.gz [--batch-size 20000]
+
+Meant for seeding and offline migrations. With --defer-indexes the comments
+indexes are dropped for the duration of the import and rebuilt at the end: faster,
+but an app running on the same file serves comment reads by table scan meanwhile.
+
+Rows go to DATABASE_URL with ids numbered like SQLite's autoincrement, so the
+import refuses to run with SHARD_URLS or the snowflake ID_GENERATOR: the app
+would look for the rows in other shards.
+"""
+
+import argparse
+import gzip
+import json
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+import sqlalchemy
+from pydantic import TypeAdapter, ValidationError
+
+from socials_api.api.models.database import comment_db, get_engine, post_db
+from socials_api.api.schema.user_comments import UserCommentIn
+from socials_api.api.schema.user_posts import UserPostIn
+from socials_api.config import config
+from socials_api.core.changes import record_changes
+from socials_api.core.threads import SEGMENT
+
+# orjson is an optional speed-up for parsing
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - depends on installed extras
+    _loads = json.loads
+
+posts_adapter = TypeAdapter(list[UserPostIn])
+comments_adapter = TypeAdapter(list[UserCommentIn])
+ids_adapter = TypeAdapter(list[Optional[int]])
+
+
+class BulkImportError(ValueError):
+    """Raised when a batch of the input fails to parse or validate."""
+
+
+@contextmanager
+def open_lines(path: str) -> Iterator[Iterator[bytes]]:
+    """Open a plain or gzipped NDJSON file, yielding its non-blank lines."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as file:
+        yield (line for line in file if line.strip())
+
+
+def _batches(lines: Iterator[bytes], size: int) -> Iterator[list[bytes]]:
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@contextmanager
+def deferred_indexes(conn: sqlalchemy.Connection, tables: list[sqlalchemy.Table]):
+    """Drop the tables' indexes for the duration, then rebuild each in one pass.
+
+    Maintaining a B-tree row by row costs far more than sorting once at the end.
+    """
+    indexes = [index for table in tables for index in table.indexes]
+    for index in indexes:
+        index.drop(conn, checkfirst=True)
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.rollback()
+        for index in indexes:
+            index.create(conn, checkfirst=True)
+        conn.commit()
+
+
+def _insert_rows(
+    conn: sqlalchemy.Connection, table: sqlalchemy.Table, columns: str, rows: list
+) -> None:
+    """executemany a plain INSERT on the DBAPI cursor.
+
+    Skips SQLAlchemy's per-row parameter processing, which costs more than SQLite's
+    own insert at this volume.
+    """
+    placeholders = ", ".join("?" * len(columns.split(",")))
+    conn.exec_driver_sql(
+        f"INSERT INTO {table.name} ({columns}) VALUES ({placeholders})", rows
+    )
+
+
+def _max_id(conn: sqlalchemy.Connection, table: sqlalchemy.Table) -> int:
+    return conn.execute(sqlalchemy.func.max(table.c.id).select()).scalar() or 0
+
+
+def _insert_batch(
+    conn: sqlalchemy.Connection, records: list[dict[str, Any]], next_id: Optional[int]
+) -> tuple[int, int, Optional[int]]:
+    """Validate and insert one batch in the current transaction.
+
+    Returns (posts, comments, next free post id when renumbering).
+    """
+    posts = posts_adapter.validate_python([record["post"] for record in records])
+    if next_id is None:
+        ids = ids_adapter.validate_python(
+            [record["post"].get("id") for record in records]
+        )
+    else:
+        ids = list(range(next_id, next_id + len(records)))
+        next_id += len(records)
+
+    if None in ids:
+        # posts without an id go after the current max, like an autoincrement
+        free = max(_max_id(conn, post_db), *(id or 0 for id in ids)) + 1
+        for i, id in enumerate(ids):
+            if id is None:
+                ids[i], free = free, free + 1
+
+    now = time.time()
+    _insert_rows(
+        conn,
+        post_db,
+        "id, body, modified_at",
+        [(id, post.body, now) for id, post in zip(ids, posts)],
+    )
+
+    comments = comments_adapter.validate_python(
+        [
+            {"post_id": id, "comment": comment.get("comment")}
+            for id, record in zip(ids, records)
+            for comment in record.get("comments", ())
+        ]
+    )
+    first_comment_id = _max_id(conn, comment_db)
+    if comments:
+        _insert_rows(
+            conn,
+            comment_db,
+            "comment, post_id",
+            [(c.comment, c.post_id) for c in comments],
+        )
+        # imported comments are top-level: the path is the comment's own id
+        conn.execute(
+            comment_db.update()
+            .where(comment_db.c.id > first_comment_id)
+            .values(path=sqlalchemy.func.printf(SEGMENT, comment_db.c.id))
+        )
+
+    # keep the change feed complete: one INSERT ... SELECT per table
+    conn.execute(record_changes(post_db, post_db.c.id.in_(ids), op="insert"))
+    conn.execute(
+        record_changes(comment_db, comment_db.c.id > first_comment_id, op="insert")
+    )
+    return len(records), len(comments), next_id
+
+
+def import_ndjson(
+    path: str,
+    engine: Optional[sqlalchemy.Engine] = None,
+    batch_size: int = 20_000,
+    new_ids: bool = False,
+    defer_indexes: bool = False,
+) -> dict[str, float]:
+    """Import an NDJSON dump, one transaction per `batch_size` posts.
+
+    Returns counts of posts and comments imported and the seconds taken. A failing
+    batch, or one whose post ids are taken already, is rolled back and raises
+    `BulkImportError`; earlier batches stay committed.
+    """
+    # rows aren't routed to shards, and their ids aren't snowflakes
+    if config.SHARD_URLS:
+        raise ValueError("bulk_import can't be used with SHARD_URLS")
+    if config.ID_GENERATOR == "snowflake":
+        raise ValueError("bulk_import can't be used with ID_GENERATOR=snowflake")
+    engine = engine or get_engine()
+    start = time.perf_counter()
+    posts = comments = 0
+
+    with engine.connect() as conn:
+        next_id = None
+        if new_ids:
+            next_id = _max_id(conn, post_db) + 1
+
+        with (
+            open_lines(path) as lines,
+            deferred_indexes(conn, [comment_db] if defer_indexes else []),
+        ):
+            for number, batch in enumerate(_batches(lines, batch_size)):
+                try:
+                    # one parse call per batch rather than per line
+                    records = _loads(b"[" + b",".join(batch) + b"]")
+                    added_posts, added_comments, next_id = _insert_batch(
+                        conn, records, next_id
+                    )
+                except (
+                    ValueError,
+                    KeyError,
+                    TypeError,
+                    ValidationError,
+                    sqlalchemy.exc.IntegrityError,
+                ) as e:
+                    conn.rollback()
+                    first_line = number * batch_size + 1
+                    raise BulkImportError(
+                        f"Invalid record in lines {first_line}-"
+                        f"{first_line + len(batch) - 1}: {e}"
+                    ) from e
+                conn.commit()
+                posts += added_posts
+                comments += added_comments
+
+    return {
+        "posts": posts,
+        "comments": comments,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Bulk import an NDJSON dump into DATABASE_URL (not sharded, not"
+        " with snowflake ids)."
+    )
+    parser.add_argument("path", help="NDJSON file, optionally .gz")
+    parser.add_argument(
+        "--batch-size", type=int, default=20_000, help="posts per commit"
+    )
+    parser.add_argument(
+        "--new-ids", action="store_true", help="renumber posts after the current max id"
+    )
+    parser.add_argument(
+        "--defer-indexes",
+        action="store_true",
+        help="drop the comments indexes while importing and rebuild them at the end;"
+        " faster, but only for offline imports: a running app serves comment reads"
+        " by table scan meanwhile",
+    )
+    args = parser.parse_args(argv)
+
+    stats = import_ndjson(
+        args.path,
+        batch_size=args.batch_size,
+        new_ids=args.new_ids,
+        defer_indexes=args.defer_indexes,
+    )
+    rows = stats["posts"] + stats["comments"]
+    print(
+        f"imported {stats['posts']} posts and {stats['comments']} comments "
+        f"in {stats['seconds']:.2f}s ({rows / stats['seconds']:,.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
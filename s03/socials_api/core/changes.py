@@ -0,0 +1,62 @@
+import time
+from typing import Literal
+
+import databases
+import sqlalchemy
+from sqlalchemy import ColumnElement, Insert, Table, bindparam
+
+from socials_api.api.models.database import change_db
+from socials_api.core.prepared import Prepared
+
+Op = Literal["insert", "update", "delete"]
+
+
+RECORD_CHANGE = Prepared(
+    change_db.insert().values(
+        table_name=bindparam("table_name"),
+        row_id=bindparam("row_id"),
+        op=bindparam("op"),
+        changed_at=bindparam("changed_at"),
+    )
+)
+
+
+async def record_change(
+    database: databases.Database, table: Table, row_id: int, op: Op
+) -> None:
+    """Write the change-log entry for one row. Call it in the write's transaction."""
+    await RECORD_CHANGE.execute(
+        database, table_name=table.name, row_id=row_id, op=op, changed_at=time.time()
+    )
+
+
+def record_changes(table: Table, *where: ColumnElement[bool], op: Op) -> Insert:
+    """Change-log entries for every row of table matching `where`, in one statement."""
+    entries = sqlalchemy.select(
+        sqlalchemy.literal(table.name),
+        table.c.id,
+        sqlalchemy.literal(op),
+        sqlalchemy.literal(time.time()),
+    ).where(*where)
+    return change_db.insert().from_select(
+        ["table_name", "row_id", "op", "changed_at"], entries
+    )
+
+
+async def compact_changes(database: databases.Database, batch_size: int) -> int:
+    """Delete one batch of entries superseded by a later entry for the same row.
+
+    A consumer reading from an old `since` still sees each changed row, just only its
+    latest op. Returns how many entries were deleted.
+    """
+    later = change_db.alias("later")
+    superseded = sqlalchemy.exists().where(
+        later.c.table_name == change_db.c.table_name,
+        later.c.row_id == change_db.c.row_id,
+        later.c.seq > change_db.c.seq,
+    )
+    q = sqlalchemy.select(change_db.c.seq).where(superseded).limit(batch_size)
+    seqs = [row.seq for row in await database.fetch_all(q)]
+    if seqs:
+        await database.execute(change_db.delete().where(change_db.c.seq.in_(seqs)))
+    return len(seqs)
@@ -0,0 +1,179 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from socials_api.config import config
+
+# brotli and zstd are optional extras; without them only gzip is offered
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on installed extras
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on installed extras
+    zstandard = None
+
+
+def _compressors(levels: dict[str, int]) -> dict[str, Callable[[bytes], bytes]]:
+    """Map each available content-coding to a `bytes -> bytes` compressor."""
+    compressors = {
+        "gzip": lambda body: gzip.compress(
+            body, compresslevel=levels.get("gzip", 6), mtime=0
+        )
+    }
+    if brotli is not None:
+        compressors["br"] = lambda body: brotli.compress(
+            body, quality=levels.get("br", 4)
+        )
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=levels.get("zstd", 3))
+        compressors["zstd"] = compressor.compress
+    return compressors
+
+
+def negotiate(accept_encoding: str, preferred: list[str]) -> Optional[str]:
+    """Pick the first of our `preferred` encodings the client accepts (q > 0)."""
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+
+    for coding in preferred:
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (encoding, digest of the raw body).
+
+    Hashing a body is an order of magnitude cheaper than compressing it, so a hot
+    response that keeps producing the same bytes is compressed once.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compress(
+        self, encoding: str, body: bytes, compress: Callable[[bytes], bytes]
+    ) -> bytes:
+        if self.maxsize <= 0:
+            return compress(body)
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self._entries.get(key)
+        if compressed is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return compressed
+        self.misses += 1
+        compressed = compress(body)
+        self._entries[key] = compressed
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return compressed
+
+
+class CompressionMiddleware:
+    """Compress response bodies of at least `minimum_size` bytes with gzip, br or zstd.
+
+    Only complete (non-streaming) bodies are compressed; streaming responses and
+    responses that already carry a Content-Encoding pass through untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        encodings: tuple[str, ...] = ("zstd", "br", "gzip"),
+        levels: Optional[dict[str, int]] = None,
+        cache_size: int = 128,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressors = _compressors(levels or {})
+        self.encodings = [coding for coding in encodings if coding in self.compressors]
+        self.cache = CompressedBodyCache(cache_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                if "content-encoding" in Headers(raw=message["headers"]):
+                    passthrough = True
+                    await send(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                # streaming or too small to be worth it: send as is
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self.cache.get_or_compress(
+                encoding, body, self.compressors[encoding]
+            )
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            if "accept-encoding" not in headers.get("vary", "").lower():
+                headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def compression_middleware(app: ASGIApp) -> ASGIApp:
+    """Wrap app in `CompressionMiddleware` configured from `GlobalConfig`.
+
+    Starlette builds the middleware stack on the first request, so config is read
+    then rather than at import.
+    """
+    if not config.COMPRESSION_ENABLED:
+        return app
+    return CompressionMiddleware(
+        app,
+        minimum_size=config.COMPRESSION_MIN_SIZE,
+        encodings=tuple(config.COMPRESSION_ENCODINGS),
+        levels={
+            "gzip": config.COMPRESSION_GZIP_LEVEL,
+            "br": config.COMPRESSION_BROTLI_QUALITY,
+            "zstd": config.COMPRESSION_ZSTD_LEVEL,
+        },
+        cache_size=config.COMPRESSION_CACHE_SIZE,
+    )
@@ -0,0 +1,264 @@
+"""Stream every post with its comments as NDJSON or CSV, in post id order.
+
+The export endpoint (`GET /export`) and this module's command line share the same
+generator. The command line exports every shard into one file, shard by shard.
+From the `s03` directory:
+
+    python -m socials_api.core.export --output dump.ndjson
+    python -m socials_api.core.export --format csv --gzip --output dump.csv.gz
+    python -m socials_api.core.export --output dump.ndjson --resume  # after a crash
+"""
+
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import os
+from typing import Any, AsyncIterator, BinaryIO, Literal, Optional
+
+import databases
+import sqlalchemy
+
+from socials_api.api.models.database import comment_db, post_db
+from socials_api.config import config
+from socials_api.core.serialization import dumps
+from socials_api.core.sharding import shards
+
+ExportFormat = Literal["ndjson", "csv"]
+CSV_HEADER = ("post_id", "post_body", "comment_id", "comment")
+
+
+async def iter_row_chunks(
+    database: databases.Database, after_id: int = 0, chunk_size: int = 1000
+) -> AsyncIterator[list[Any]]:
+    """Yield the rows of live posts with id > after_id joined to their comments,
+    `chunk_size` rows at a time, in (post id, comment id) order.
+
+    A post without comments is one row with a null `comment_id`. Each chunk is one
+    keyset query streamed with `database.iterate`, so memory stays bounded by the
+    chunk even for a post with a huge thread, and the SQLite read lock is only held
+    while a chunk is read, not for the whole export.
+    """
+    after_comment: Optional[int] = None
+    live_comments = sqlalchemy.and_(
+        comment_db.c.post_id == post_db.c.id, comment_db.c.deleted_at.is_(None)
+    )
+    while True:
+        # past the last row read: later posts, or later comments of its post
+        after = post_db.c.id > after_id
+        if after_comment is not None:
+            after = sqlalchemy.or_(after, comment_db.c.id > after_comment)
+        q = (
+            sqlalchemy.select(
+                post_db.c.id,
+                post_db.c.body,
+                comment_db.c.id.label("comment_id"),
+                comment_db.c.comment,
+            )
+            .select_from(post_db.outerjoin(comment_db, live_comments))
+            .where(post_db.c.deleted_at.is_(None), post_db.c.id >= after_id, after)
+            .order_by(post_db.c.id, comment_db.c.id)
+            .limit(chunk_size)
+        )
+
+        chunk = [row async for row in database.iterate(q)]
+        if not chunk:
+            return
+        yield chunk
+        after_id, after_comment = chunk[-1].id, chunk[-1].comment_id
+
+
+class ChunkEncoder:
+    """Encode row chunks, keeping the last post of each open: its comments may go
+    on in the next chunk.
+
+    An NDJSON line is written as its post's rows arrive (`{"post": ...,
+    "comments": [` first, then the comments), so a post never has to be held whole.
+    """
+
+    def __init__(self, format: ExportFormat):
+        self.format = format
+        self.open_id: Optional[int] = None
+        self._open_comments = 0
+
+    def encode(self, rows: list[Any]) -> bytes:
+        if self.format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                comment_id = "" if row.comment_id is None else row.comment_id
+                writer.writerow((row.id, row.body, comment_id, row.comment or ""))
+            if rows:
+                self.open_id = rows[-1].id
+            return buffer.getvalue().encode()
+
+        parts = []
+        for row in rows:
+            if row.id != self.open_id:
+                parts.append(self.close())
+                parts.append(
+                    b'{"post":'
+                    + dumps({"body": row.body, "id": row.id})
+                    + b',"comments":['
+                )
+                self.open_id = row.id
+            if row.comment_id is not None:
+                if self._open_comments:
+                    parts.append(b",")
+                parts.append(dumps({"id": row.comment_id, "comment": row.comment}))
+                self._open_comments += 1
+        return b"".join(parts)
+
+    def close(self) -> bytes:
+        """End the open post, if any."""
+        if self.open_id is None:
+            return b""
+        self.open_id = None
+        self._open_comments = 0
+        return b"]}\n" if self.format == "ndjson" else b""
+
+
+async def export_stream(
+    database: databases.Database,
+    format: ExportFormat = "ndjson",
+    after_id: int = 0,
+    chunk_size: int = 1000,
+    compress: bool = False,
+    header: bool = True,
+) -> AsyncIterator[tuple[bytes, Optional[int]]]:
+    """Yield (encoded bytes, last post id) pieces, up to two per chunk.
+
+    The first piece of a chunk ends with the last post completed so far; the
+    second holds the start of the chunk's last post, which may go on in the next
+    chunk, and has `None` for its post id: an export cut off there resumes from
+    the end of the first. With compress, every piece is a complete gzip member;
+    concatenated members are one valid gzip file, so an export cut off between
+    pieces can simply be appended to. A resumed export (after_id > 0) skips the
+    CSV header, as does header=False.
+    """
+
+    def encoded(data: bytes) -> bytes:
+        return gzip.compress(data, compresslevel=6, mtime=0) if compress else data
+
+    if format == "csv" and header and after_id == 0:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(CSV_HEADER)
+        yield encoded(buffer.getvalue().encode()), after_id
+
+    encoder = ChunkEncoder(format)
+    async for chunk in iter_row_chunks(database, after_id, chunk_size):
+        last_id = chunk[-1].id
+        tail = next(i for i, row in enumerate(chunk) if row.id == last_id)
+        data = encoder.encode(chunk[:tail])
+        if encoder.open_id not in (None, last_id):
+            completed = encoder.open_id
+            yield encoded(data + encoder.close()), completed
+        data = encoder.encode(chunk[tail:])
+        if data:
+            yield encoded(data), None
+    if encoder.open_id is not None:
+        last_id = encoder.open_id
+        yield encoded(encoder.close()), last_id
+
+
+def _read_progress(progress_path: str) -> tuple[int, int, int]:
+    if not os.path.exists(progress_path):
+        return 0, 0, 0
+    # "<shard> <last post id> <bytes written>"
+    with open(progress_path) as progress:
+        shard, last_id, size = (int(value) for value in progress.read().split())
+    return shard, last_id, size
+
+
+def _write_piece(
+    output: BinaryIO, progress_path: str, data: bytes, progress: Optional[str]
+) -> None:
+    output.write(data)
+    output.flush()
+    if progress is not None:
+        with open(progress_path, "w") as file:
+            file.write(f"{progress} {output.tell()}")
+
+
+async def export_to_file(
+    path: str,
+    format: ExportFormat = "ndjson",
+    compress: bool = False,
+    resume: bool = False,
+    chunk_size: int = 1000,
+) -> int:
+    """Export every shard to path, one after the other, recording progress in
+    `<path>.progress` whenever a post is complete.
+
+    With resume, cuts path back to the end of the last recorded post and appends
+    from the post after it. The file is only touched from a worker thread, so a slow
+    disk never blocks the event loop. Returns the last exported post id.
+    """
+    progress_path = f"{path}.progress"
+    start_shard, after_id, size = 0, 0, 0
+    if resume:
+        start_shard, after_id, size = await asyncio.to_thread(
+            _read_progress, progress_path
+        )
+
+    mode = "r+b" if size else "wb"
+    output = await asyncio.to_thread(open, path, mode)
+    try:
+        await asyncio.to_thread(output.truncate, size)
+        await asyncio.to_thread(output.seek, size)
+        last_id = after_id
+        for index in range(start_shard, shards.count):
+            shard_after = after_id if index == start_shard else 0
+            async for data, piece_id in export_stream(
+                shards.databases[index],
+                format,
+                shard_after,
+                chunk_size,
+                compress,
+                # the header only opens a fresh file
+                header=index == 0 and not size,
+            ):
+                progress = None
+                if piece_id is not None:
+                    last_id = piece_id
+                    progress = f"{index} {piece_id}"
+                await asyncio.to_thread(
+                    _write_piece, output, progress_path, data, progress
+                )
+    finally:
+        await asyncio.to_thread(output.close)
+    return last_id
+
+
+async def _main(args: argparse.Namespace) -> None:
+    await shards.connect()
+    try:
+        last_id = await export_to_file(
+            args.output,
+            format=args.format,
+            compress=args.gzip,
+            resume=args.resume,
+            chunk_size=args.chunk_size or config.EXPORT_CHUNK_SIZE,
+        )
+    finally:
+        await shards.disconnect()
+    print(f"exported posts up to id {last_id} to {args.output}")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export posts with comments.")
+    parser.add_argument("--output", required=True, help="file to write")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output")
+    parser.add_argument(
+        "--resume", action="store_true", help="continue an interrupted export"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, help="rows (comments or bare posts) per chunk"
+    )
+    asyncio.run(_main(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
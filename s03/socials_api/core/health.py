@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from typing import Any, Optional
+
+import databases
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from socials_api.config import config
+from socials_api.core.lazy import Lazy
+from socials_api.core.sharding import shards
+
+logger = logging.getLogger(__name__)
+
+# served while the circuit is open: they report on the database, or don't need it
+EXEMPT_PREFIXES = ("/health", "/diagnostics")
+
+
+class DatabaseHealth:
+    """What the `HealthChecker` knows about one database."""
+
+    def __init__(self, database: databases.Database):
+        self.database = database
+        self.healthy = True
+        # consecutive failed pings
+        self.failures = 0
+        self.latency: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.reconnects = 0
+
+
+class HealthChecker:
+    """Pings every database in the background and trips a circuit breaker when one
+    stops answering.
+
+    A ping is `SELECT 1` with a `timeout`, so a stalled connection fails like a
+    dropped one. After `failure_threshold` failures in a row the database is marked
+    down (the circuit opens: see `CircuitBreakerMiddleware`) and a task reconnects
+    it, with exponential backoff from `backoff` up to `max_backoff` seconds. Each
+    delay is jittered, so workers that lost the database together don't reconnect
+    in lockstep. The first successful ping closes the circuit again.
+    """
+
+    def __init__(
+        self,
+        databases: list[databases.Database],
+        interval: float = 5.0,
+        timeout: float = 1.0,
+        failure_threshold: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ):
+        self.databases = [DatabaseHealth(database) for database in databases]
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._task: Optional[asyncio.Task] = None
+        self._reconnecting: dict[int, asyncio.Task] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def healthy(self) -> bool:
+        return all(health.healthy for health in self.databases)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = [self._task, *self._reconnecting.values()]
+        for task in tasks:
+            if task is not None:
+                task.cancel()
+        for task in tasks:
+            if task is not None:
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._reconnecting.clear()
+
+    async def ping(self, health: DatabaseHealth) -> bool:
+        """Ping one database and update its health; True if it answered in time."""
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                health.database.fetch_val("SELECT 1"), timeout=self.timeout
+            )
+        except Exception as exc:
+            health.failures += 1
+            health.last_error = repr(exc)
+            if health.healthy and health.failures >= self.failure_threshold:
+                health.healthy = False
+                logger.error("Database %d is down: %s", self.index(health), repr(exc))
+            return False
+        health.latency = time.perf_counter() - start
+        if not health.healthy:
+            logger.warning("Database %d is back up.", self.index(health))
+        health.healthy = True
+        health.failures = 0
+        return True
+
+    async def check(self) -> None:
+        """Ping every database not being reconnected, concurrently."""
+        await asyncio.gather(
+            *(
+                self.ping(health)
+                for index, health in enumerate(self.databases)
+                if index not in self._reconnecting
+            )
+        )
+
+    def index(self, health: DatabaseHealth) -> int:
+        return self.databases.index(health)
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before reconnect `attempt` (0-based): exponential backoff
+        with "equal jitter", so never less than half the backoff."""
+        backoff = min(self.max_backoff, self.backoff * 2**attempt)
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+    async def reconnect(self, health: DatabaseHealth) -> None:
+        """Reopen the database's connection until a ping succeeds."""
+        attempt = 0
+        while not health.healthy:
+            await asyncio.sleep(self.delay(attempt))
+            attempt += 1
+            try:
+                await asyncio.wait_for(health.database.disconnect(), self.timeout)
+            except Exception:
+                pass  # the old connection is gone either way
+            try:
+                await asyncio.wait_for(health.database.connect(), self.timeout)
+            except Exception as exc:
+                health.last_error = repr(exc)
+                continue
+            if await self.ping(health):
+                health.reconnects += 1
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            for index, health in enumerate(self.databases):
+                if not health.healthy and index not in self._reconnecting:
+                    task = asyncio.create_task(self.reconnect(health))
+                    self._reconnecting[index] = task
+                    task.add_done_callback(
+                        lambda _, index=index: self._reconnecting.pop(index, None)
+                    )
+            await asyncio.sleep(self.interval)
+
+    def report(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "shard": index,
+                "healthy": health.healthy,
+                "latency_ms": health.latency * 1000
+                if health.latency is not None
+                else None,
+                "failures": health.failures,
+                "reconnects": health.reconnects,
+                "last_error": health.last_error,
+            }
+            for index, health in enumerate(self.databases)
+        ]
+
+
+class CircuitBreakerMiddleware:
+    """Answer `503` at once while a database is down, instead of letting requests
+    pile up on a dead connection and time out one by one."""
+
+    def __init__(self, app: ASGIApp, checker: HealthChecker):
+        self.app = app
+        self.checker = checker
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or self.checker.healthy
+            or scope["path"].startswith(EXEMPT_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        response = JSONResponse(
+            {"detail": "Database unavailable, try again later."},
+            status_code=503,
+            headers={"Retry-After": str(math.ceil(self.checker.interval))},
+        )
+        await response(scope, receive, send)
+
+
+def circuit_breaker_middleware(app: ASGIApp) -> ASGIApp:
+    """Wrap app in `CircuitBreakerMiddleware` unless `HEALTH_CHECK_ENABLED` is off."""
+    if not config.HEALTH_CHECK_ENABLED:
+        return app
+    return CircuitBreakerMiddleware(app, health_checker)
+
+
+# built on first use, over the databases of `shards`
+health_checker: HealthChecker = Lazy(
+    lambda: HealthChecker(
+        shards.databases,
+        interval=config.HEALTH_CHECK_INTERVAL,
+        timeout=config.HEALTH_CHECK_TIMEOUT,
+        failure_threshold=config.HEALTH_CHECK_FAILURES,
+        backoff=config.HEALTH_RECONNECT_BACKOFF,
+        max_backoff=config.HEALTH_RECONNECT_MAX_BACKOFF,
+    )
+)
@@ -0,0 +1,124 @@
+import functools
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Annotated, Any, Awaitable, Callable, Optional
+
+from fastapi import Depends, HTTPException, Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from socials_api.api.models.queries import LATEST_CHANGE, POST_MODIFIED_AT
+from socials_api.config import config
+from socials_api.core.sharding import shards
+
+
+def not_modified(modified: float, if_modified_since: str) -> bool:
+    """Whether a resource last modified at `modified` is unchanged since the
+    `If-Modified-Since` date; unparseable dates count as changed."""
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(modified) <= since
+
+
+def cache_policy(last_modified: Callable[..., Awaitable[Optional[float]]]) -> Any:
+    """Route dependency declaring a cacheable GET.
+
+    `last_modified` is a dependency itself (it can take the route's path and query
+    parameters) returning when the resource last changed, or None if unknown. Its
+    answer becomes the `Last-Modified` header, and a request whose
+    `If-Modified-Since` is no older gets a 304 before the route runs; so keep it to
+    a cheap timestamp query. `Cache-Control` comes from `GlobalConfig`.
+
+        @router.get("/{id}", dependencies=[cache_policy(post_modified)])
+    """
+
+    @functools.wraps(last_modified)
+    async def modified(*args, **kwargs) -> Optional[float]:
+        if not config.HTTP_CACHE_ENABLED:
+            return None
+        return await last_modified(*args, **kwargs)
+
+    async def policy(
+        request: Request, modified: Annotated[Optional[float], Depends(modified)]
+    ) -> None:
+        if not config.HTTP_CACHE_ENABLED:
+            return
+        headers = {
+            "Cache-Control": f"public, max-age={config.HTTP_CACHE_MAX_AGE}, "
+            f"stale-while-revalidate={config.HTTP_CACHE_STALE_WHILE_REVALIDATE}",
+            # compressed and identity bodies must be cached apart
+            "Vary": "Accept-Encoding",
+        }
+        # HTTP dates have whole seconds: a write later in this same second would keep
+        # the date, so only send it once the second is over
+        if modified is not None and int(modified) < int(time.time()):
+            headers["Last-Modified"] = formatdate(int(modified), usegmt=True)
+            if_modified_since = request.headers.get("if-modified-since")
+            if if_modified_since and not_modified(modified, if_modified_since):
+                raise HTTPException(status_code=304, headers=headers)
+        # applied to the response by `CacheHeadersMiddleware`, whatever its type
+        request.state.cache_headers = headers
+
+    return Depends(policy)
+
+
+# Last-Modified queries
+# -------------------------------->8-----------------------------------
+
+
+async def post_modified(id: int) -> Optional[float]:
+    """Last write to the post or its comments (None if there's no such post)."""
+    row = await POST_MODIFIED_AT.fetch_one(shards.for_id(id), id=id)
+    return row.modified_at if row is not None else None
+
+
+async def thread_modified(post_id: int) -> Optional[float]:
+    """`post_modified` for routes that name the post `post_id`."""
+    return await post_modified(post_id)
+
+
+async def latest_change() -> Optional[float]:
+    """Last write anywhere, from the head of every shard's change log."""
+    rows = await shards.gather(lambda database: LATEST_CHANGE.fetch_one(database))
+    return max((row.changed_at for row in rows if row is not None), default=None)
+
+
+class CacheHeadersMiddleware:
+    """Add the headers a route's `cache_policy` chose to its 200 response.
+
+    FastAPI only copies headers set on an injected `Response` onto responses it
+    builds itself, and several GETs return a `Response` directly (the fast JSON and
+    read-model paths), so the headers are applied here instead.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                cache_headers = scope.get("state", {}).get("cache_headers")
+                if cache_headers:
+                    headers = MutableHeaders(raw=message["headers"])
+                    for name, value in cache_headers.items():
+                        headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def cache_headers_middleware(app: ASGIApp) -> ASGIApp:
+    """Wrap app in `CacheHeadersMiddleware` unless `HTTP_CACHE_ENABLED` is off.
+
+    Like the other middleware factories, config is read when Starlette builds the
+    middleware stack on the first request.
+    """
+    if not config.HTTP_CACHE_ENABLED:
+        return app
+    return CacheHeadersMiddleware(app)
@@ -0,0 +1,72 @@
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+# 2025-01-01T00:00:00Z in milliseconds; 41 bits of milliseconds from here last ~69 years
+EPOCH_MS = 1_735_689_600_000
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+class IdGenerator:
+    """Snowflake-style 64-bit ids: milliseconds since `EPOCH_MS`, worker id, sequence.
+
+    Ids from one generator strictly increase, and ids from different workers never
+    collide, so any number of processes (or shards) can insert without a central
+    allocator, and ordering by id is ordering by creation time (to the millisecond
+    across workers).
+
+    `next_id(residue, modulus)` returns the next id with `(id - 1) % modulus ==
+    residue`, the id class of a shard (see `Shards`); the sequence skips ahead to
+    reach it.
+    """
+
+    def __init__(self, worker_id: int, clock: Callable[[], float] = time.time) -> None:
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self.clock = clock
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _now_ms(self) -> int:
+        return int(self.clock() * 1000) - EPOCH_MS
+
+    def next_id(self, residue: int = 0, modulus: int = 1) -> int:
+        with self._lock:
+            while True:
+                # never go back in time, even if the wall clock does
+                now = max(self._now_ms(), self._last_ms)
+                sequence = self._sequence + 1 if now == self._last_ms else 0
+                base = (now << (WORKER_BITS + SEQUENCE_BITS)) | (
+                    self.worker_id << SEQUENCE_BITS
+                )
+                sequence += (residue - (base + sequence - 1)) % modulus
+                if sequence <= MAX_SEQUENCE:
+                    break
+                # this millisecond is used up: wait for the next one
+                while self._now_ms() <= now:
+                    time.sleep(0.0001)
+            self._last_ms, self._sequence = now, sequence
+            return base + sequence
+
+
+def timestamp_of(id: int) -> float:
+    """Creation time (unix seconds) encoded in an id."""
+    return ((id >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS) / 1000
+
+
+def default_worker_id(worker_id: Optional[int]) -> int:
+    """The configured worker id, or one derived from the process id.
+
+    Live processes on a host have distinct pids, and workers started together
+    usually get nearby ones, but two pids can still agree modulo 1024: set
+    `WORKER_ID` per process (or per host with one process each) to rule that out.
+    """
+    if worker_id is not None:
+        return worker_id
+    return os.getpid() & MAX_WORKER_ID
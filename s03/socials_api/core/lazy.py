@@ -0,0 +1,41 @@
+from typing import Any, Callable
+
+
+class Lazy:
+    """Stand-in for a module-level object that is built on first use instead of at import.
+
+    Attribute reads and writes are forwarded to the real object, so callers keep
+    doing `from ... import db` and `db.fetch_all(...)` as before.
+    """
+
+    __slots__ = ("_factory", "_obj")
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_obj", None)
+
+    def _resolve(self) -> Any:
+        obj = object.__getattribute__(self, "_obj")
+        if obj is None:
+            obj = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_obj", obj)
+        return obj
+
+    @property
+    def resolved(self) -> bool:
+        """Whether the real object has been built yet."""
+        return object.__getattribute__(self, "_obj") is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._resolve(), name)
+
+    def __repr__(self) -> str:
+        if not self.resolved:
+            return f"<Lazy {object.__getattribute__(self, '_factory')!r}>"
+        return repr(self._resolve())
@@ -0,0 +1,155 @@
+import asyncio
+import bisect
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Optional
+
+from socials_api.config import config
+from socials_api.core.lazy import Lazy
+
+# upper bounds of the lag histogram buckets in milliseconds; one more bucket past
+# the last bound catches everything slower
+LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+# innermost frames kept per stack sample
+STACK_DEPTH = 30
+
+
+class LoopMonitor:
+    """Measures event-loop lag and samples the stack the loop is stuck on.
+
+    A task sleeps `interval` at a time, and lag is how late it wakes up. By then the
+    blocking call has returned, so a watchdog thread watches the task's heartbeat
+    instead: once the loop has been stuck for more than `threshold` it grabs the loop
+    thread's current stack, while the culprit is still on it. Each distinct stack is
+    kept once with a count, up to `max_stacks` (least recently seen dropped first).
+
+    The cost is one wake-up per `interval` on the loop and one in the thread.
+    """
+
+    def __init__(
+        self, interval: float = 0.1, threshold: float = 0.1, max_stacks: int = 20
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_stacks = max_stacks
+        self.counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        # stack -> {"count": ..., "max_stuck": ...}; written by the watchdog thread
+        self._stalls: OrderedDict[tuple[str, ...], dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._heartbeat = 0.0
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-monitor", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def record(self, lag: float) -> None:
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        self.counts[bisect.bisect_left(LAG_BUCKETS_MS, lag * 1000)] += 1
+
+    async def _run(self) -> None:
+        while True:
+            start = time.monotonic()
+            self._heartbeat = start
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.monotonic() - start - self.interval))
+
+    def _watch(self) -> None:
+        # check a few times per threshold, so a stall is caught while it's happening
+        period = min(self.interval, self.threshold) / 2
+        sampled = None  # heartbeat of the stall already sampled
+        while not self._stopping.wait(period):
+            heartbeat = self._heartbeat
+            stuck = time.monotonic() - heartbeat - self.interval
+            if stuck <= self.threshold or heartbeat == sampled:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                stack = traceback.extract_stack(frame)[-STACK_DEPTH:]
+                self._add_stall(
+                    tuple(f"{f.filename}:{f.lineno} in {f.name}" for f in stack),
+                    stuck,
+                )
+            sampled = heartbeat
+
+    def _add_stall(self, stack: tuple[str, ...], stuck: float) -> None:
+        with self._lock:
+            stall = self._stalls.pop(stack, None) or {"count": 0, "max_stuck": 0.0}
+            stall["count"] += 1
+            stall["max_stuck"] = max(stall["max_stuck"], stuck)
+            self._stalls[stack] = stall
+            if len(self._stalls) > self.max_stacks:
+                self._stalls.popitem(last=False)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Lag distribution and stack samples, in the `LoopStats` shape."""
+        with self._lock:
+            stalls = sorted(
+                self._stalls.items(), key=lambda item: item[1]["count"], reverse=True
+            )
+        bounds = (*LAG_BUCKETS_MS, None)
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "samples": self.samples,
+            "mean_ms": self.total_lag / self.samples * 1000 if self.samples else 0.0,
+            "max_ms": self.max_lag * 1000,
+            "histogram": [
+                {"le_ms": bound, "count": count}
+                for bound, count in zip(bounds, self.counts)
+            ],
+            "stalls": [
+                {
+                    "count": stall["count"],
+                    "max_stuck_ms": stall["max_stuck"] * 1000,
+                    "stack": list(stack),
+                }
+                for stack, stall in stalls
+            ],
+        }
+
+
+loop_monitor: LoopMonitor = Lazy(
+    lambda: LoopMonitor(
+        interval=config.LOOP_MONITOR_INTERVAL,
+        threshold=config.LOOP_MONITOR_THRESHOLD,
+        max_stacks=config.LOOP_MONITOR_MAX_STACKS,
+    )
+)
@@ -0,0 +1,94 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Literal, Optional
+
+from socials_api.config import config
+from socials_api.core.lazy import Lazy
+from socials_api.core.serialization import dumps
+
+OffloadMode = Literal["off", "thread", "process"]
+
+
+# Runs in the pool, so it takes and returns plain picklable data: posts as
+# (id, body) and comments as (post_id, id, comment) tuples, which pickle far
+# smaller than records or dicts
+def posts_with_comments(
+    posts: list[tuple[int, str]], comments: list[tuple[int, int, str]]
+) -> list[dict[str, Any]]:
+    """Nest comments under their posts, in the `UserPostWithComments` shape."""
+    # group comments by post in one pass instead of rescanning them for every post
+    comments_by_post: dict[int, list[dict]] = {}
+    for post_id, id, comment in comments:
+        comments_by_post.setdefault(post_id, []).append({"id": id, "comment": comment})
+
+    return [
+        {"post": {"body": body, "id": id}, "comments": comments_by_post.get(id, [])}
+        for id, body in posts
+    ]
+
+
+def posts_with_comments_json(
+    posts: list[tuple[int, str]], comments: list[tuple[int, int, str]]
+) -> bytes:
+    """`posts_with_comments`, encoded to JSON bytes in the same call."""
+    return dumps(posts_with_comments(posts, comments))
+
+
+class Offloader:
+    """Runs CPU-heavy functions in a thread or process pool instead of on the event loop.
+
+    Only results of at least `min_rows` rows are worth the hand-off: below that,
+    pickling the arguments (process) or contending for the GIL (thread) costs more
+    than it saves. With "process" the function must be importable at module level.
+    """
+
+    def __init__(self, mode: OffloadMode = "off", workers: int = 2, min_rows: int = 0):
+        self.mode = mode
+        self.workers = workers
+        self.min_rows = min_rows
+        self._executor: Optional[Executor] = None
+
+    def should_offload(self, rows: int) -> bool:
+        return self.mode != "off" and rows >= self.min_rows
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                # spawn, not fork: the event loop and the db driver have threads
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="offload"
+                )
+        return self._executor
+
+    async def start(self) -> None:
+        """Start the pool now, so no request waits on worker processes booting."""
+        if self.mode == "off":
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(
+            *(loop.run_in_executor(executor, int) for _ in range(self.workers))
+        )
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+offloader: Offloader = Lazy(
+    lambda: Offloader(
+        config.OFFLOAD_MODE,
+        workers=config.OFFLOAD_WORKERS,
+        min_rows=config.OFFLOAD_MIN_ROWS,
+    )
+)
@@ -0,0 +1,71 @@
+from typing import Any, Callable, Hashable, Optional
+
+import databases
+from sqlalchemy import Executable
+from sqlalchemy.dialects import sqlite
+
+# every configured database is SQLite; named parameters are what `databases` binds
+# plain SQL strings with
+DIALECT = sqlite.dialect(paramstyle="named")
+
+
+class Prepared:
+    """A Core statement compiled to SQL once, then executed with bind parameters.
+
+    `databases` compiles every SQLAlchemy expression it's handed, on every call. A
+    SQL string only has its parameters bound, which is several times cheaper, so hot
+    single-row statements are built once with `bindparam`s for their per-request
+    values and go through here.
+
+    Compilation happens on first use, not at import. Statements with expanding
+    parameters (`in_` over a list) can't be prepared: their SQL depends on the list.
+    """
+
+    __slots__ = ("statement", "_sql", "_defaults")
+
+    def __init__(self, statement: Executable):
+        self.statement = statement
+        self._sql: Optional[str] = None
+        self._defaults: dict[str, Any] = {}
+
+    @property
+    def sql(self) -> str:
+        if self._sql is None:
+            compiled = self.statement.compile(dialect=DIALECT)
+            # values fixed when the statement was built, e.g. a LIMIT
+            self._defaults = {
+                key: value
+                for key, value in compiled.params.items()
+                if value is not None
+            }
+            self._sql = str(compiled)
+        return self._sql
+
+    def bind(self, values: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+        """The SQL and the full set of values to execute it with."""
+        sql = self.sql
+        return sql, {**self._defaults, **values} if self._defaults else values
+
+    async def fetch_one(self, database: databases.Database, **values: Any):
+        return await database.fetch_one(*self.bind(values))
+
+    async def fetch_all(self, database: databases.Database, **values: Any) -> list:
+        return await database.fetch_all(*self.bind(values))
+
+    async def execute(self, database: databases.Database, **values: Any) -> Any:
+        return await database.execute(*self.bind(values))
+
+
+_cache: dict[Hashable, Prepared] = {}
+
+
+def prepared(key: Hashable, build: Callable[[], Executable]) -> Prepared:
+    """The statement cached under key, built and compiled on the first call.
+
+    For statements whose shape depends on arguments (e.g. the columns of an
+    insert): key by those arguments.
+    """
+    statement = _cache.get(key)
+    if statement is None:
+        statement = _cache[key] = Prepared(build())
+    return statement
@@ -0,0 +1,132 @@
+import cProfile
+import inspect
+import io
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from socials_api.config import config
+
+# pyinstrument is optional; its async mode attributes time to awaiting coroutines
+# rather than to the event loop, so per-request reports read better with it
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pragma: no cover - depends on installed extras
+    Profiler = None
+
+
+# Sampling profiler
+# -------------------------------->8-----------------------------------
+
+
+def collapse_stack(frame: Optional[FrameType], thread_name: str) -> str:
+    """One stack as a collapsed-stack line body: root first, frames joined by ';'.
+
+    Frames are named by function and definition line, not the current line, so
+    samples anywhere in a function merge into one frame of the flamegraph.
+    """
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join([thread_name, *reversed(frames)])
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter[str]:
+    """Sample the stack of every other thread every `interval` for `seconds`.
+
+    Blocks the calling thread, so call it from a worker thread (the event loop
+    thread is then sampled like any other).
+    """
+    me = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks: Counter[str] = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident != me:
+                stacks[collapse_stack(frame, names.get(ident, str(ident)))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def collapsed(stacks: Counter[str]) -> str:
+    """`<stack> <count>` lines, the input format of flamegraph.pl and speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# Per-request profiling
+# -------------------------------->8-----------------------------------
+
+
+class RequestProfilerMiddleware:
+    """Profile a single request when its query string has `profile=1`.
+
+    The response is replaced by a plain-text report: pyinstrument's when it's
+    installed, cProfile's otherwise: the top functions by cumulative time, then
+    every function of the matched route's module, which deep middleware stacks
+    can push out of the top. cProfile sees everything running on the loop thread
+    meanwhile, so profile on a quiet worker.
+    """
+
+    def __init__(self, app: ASGIApp, limit: int = 40):
+        self.app = app
+        self.limit = limit
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        query = parse_qs(scope.get("query_string", b"").decode())
+        if scope["type"] != "http" or query.get("profile") != ["1"]:
+            await self.app(scope, receive, send)
+            return
+
+        async def discard(message: Message) -> None:
+            pass
+
+        if Profiler is not None:
+            profiler = Profiler(async_mode="enabled")
+            with profiler:
+                await self.app(scope, receive, discard)
+            report = profiler.output_text()
+        else:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profile.disable()
+            output = io.StringIO()
+            stats = pstats.Stats(profile, stream=output)
+            stats.sort_stats("cumulative").print_stats(self.limit)
+            route_file = _route_file(scope)
+            if route_file is not None:
+                stats.print_stats(re.escape(route_file))
+            report = output.getvalue()
+
+        await PlainTextResponse(report)(scope, receive, send)
+
+
+def _route_file(scope: Scope) -> Optional[str]:
+    """The source file of the matched route's endpoint, if a route matched."""
+    endpoint = getattr(scope.get("route"), "endpoint", None)
+    if endpoint is None:
+        return None
+    # `TracedRoute` wraps endpoints; the route's own module is the wrapped one's
+    code = getattr(inspect.unwrap(endpoint), "__code__", None)
+    return code.co_filename if code is not None else None
+
+
+def request_profiler_middleware(app: ASGIApp) -> ASGIApp:
+    """Wrap app in `RequestProfilerMiddleware` when `REQUEST_PROFILING` is on."""
+    if not config.REQUEST_PROFILING:
+        return app
+    return RequestProfilerMiddleware(app)
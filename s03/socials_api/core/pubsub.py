@@ -0,0 +1,108 @@
+import asyncio
+from typing import Any, AsyncIterator, Optional
+
+from socials_api.config import config
+from socials_api.core.lazy import Lazy
+from socials_api.core.serialization import dumps
+
+
+class Subscription:
+    """One watcher of a post: a bounded buffer of events waiting to be sent."""
+
+    def __init__(self, post_id: int, buffer_size: int):
+        self.post_id = post_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.evicted = False
+        self._pending: Optional[asyncio.Future] = None
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[dict[str, Any]]:
+        """Wait for the next event; None on timeout or once evicted and drained."""
+        if self.evicted and self.queue.empty():
+            return None
+        # keep an unfinished get() across timeouts so no event is lost between waits
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self.queue.get())
+        done, _ = await asyncio.wait({self._pending}, timeout=timeout)
+        if not done:
+            return None
+        event, self._pending = self._pending.result(), None
+        return event
+
+    def close(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+
+
+class CommentHub:
+    """In-process pub/sub of comment events, fanned out per post.
+
+    Publishing never waits: each subscriber has a bounded buffer, and a subscriber
+    whose buffer is full is evicted rather than slowing down the writer or making the
+    hub hold an ever-growing backlog. An idle subscriber is just an empty queue.
+    """
+
+    def __init__(self, buffer_size: int = 100):
+        self.buffer_size = buffer_size
+        self._subscribers: dict[int, set[Subscription]] = {}
+
+    def subscriber_count(self, post_id: Optional[int] = None) -> int:
+        if post_id is not None:
+            return len(self._subscribers.get(post_id, ()))
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, post_id: int) -> Subscription:
+        subscription = Subscription(post_id, self.buffer_size)
+        self._subscribers.setdefault(post_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        subs = self._subscribers.get(subscription.post_id)
+        if subs is not None:
+            subs.discard(subscription)
+            if not subs:
+                del self._subscribers[subscription.post_id]
+
+    def publish(self, post_id: int, event: str, data: dict[str, Any]) -> int:
+        """Send an event to every watcher of post_id. Returns how many received it."""
+        delivered = 0
+        for subscription in list(self._subscribers.get(post_id, ())):
+            try:
+                subscription.queue.put_nowait({"event": event, "data": data})
+                delivered += 1
+            except asyncio.QueueFull:
+                # slow consumer: it gets what's already buffered, then its stream ends
+                subscription.evicted = True
+                self.unsubscribe(subscription)
+        return delivered
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+async def comment_events(
+    hub: CommentHub, post_id: int, keepalive: float
+) -> AsyncIterator[bytes]:
+    """Subscribe to post_id and render its events as a server-sent events stream."""
+    # subscribe here rather than in the route, so the finally below always runs
+    subscription = hub.subscribe(post_id)
+    try:
+        # send something at once so headers go out before the first event
+        yield b": connected\n\n"
+        while True:
+            message = await subscription.next(timeout=keepalive)
+            if message is None:
+                if subscription.evicted:
+                    return
+                yield b": keepalive\n\n"
+                continue
+            yield format_sse(message["event"], message["data"])
+            if message["event"] == "post_deleted":
+                return
+    finally:
+        hub.unsubscribe(subscription)
+
+
+comment_hub: CommentHub = Lazy(lambda: CommentHub(config.STREAM_BUFFER_SIZE))
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from typing import Optional
+
+import databases
+import sqlalchemy
+
+from socials_api.api.models.database import comment_db, post_db
+from socials_api.config import config
+from socials_api.core.changes import compact_changes
+from socials_api.core.sharding import shards
+
+logger = logging.getLogger(__name__)
+
+
+class TombstonePurger:
+    """Background task that hard deletes soft-deleted posts and comments in small batches,
+    and compacts superseded change-log entries the same way.
+
+    Each batch is its own short transaction, and the task yields to the event loop
+    between batches, so purging a huge thread never holds the SQLite write lock for
+    longer than one batch.
+    """
+
+    def __init__(
+        self,
+        database: databases.Database,
+        batch_size: int = 500,
+        interval: float = 5.0,
+    ):
+        self.database = database
+        self.batch_size = batch_size
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the purge loop. Unpurged rows stay tombstoned for the next run."""
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def purge_once(self) -> int:
+        """Delete one batch of tombstoned rows. Returns how many rows were deleted."""
+        # deleted comments, then live comments of deleted posts, then deleted posts
+        # that have no comments left pointing at them
+        candidates = (
+            sqlalchemy.select(comment_db.c.id)
+            .where(comment_db.c.deleted_at.is_not(None))
+            .limit(self.batch_size),
+            sqlalchemy.select(comment_db.c.id)
+            .join_from(comment_db, post_db)
+            .where(post_db.c.deleted_at.is_not(None))
+            .limit(self.batch_size),
+        )
+        for q in candidates:
+            ids = [row.id for row in await self.database.fetch_all(q)]
+            if ids:
+                await self.database.execute(
+                    comment_db.delete().where(comment_db.c.id.in_(ids))
+                )
+                return len(ids)
+
+        orphaned = ~sqlalchemy.exists().where(comment_db.c.post_id == post_db.c.id)
+        q = (
+            sqlalchemy.select(post_db.c.id)
+            .where(post_db.c.deleted_at.is_not(None), orphaned)
+            .limit(self.batch_size)
+        )
+        ids = [row.id for row in await self.database.fetch_all(q)]
+        if ids:
+            await self.database.execute(post_db.delete().where(post_db.c.id.in_(ids)))
+            return len(ids)
+
+        return await compact_changes(self.database, self.batch_size)
+
+    async def purge(self) -> int:
+        """Purge batches until nothing tombstoned is left. Returns rows deleted."""
+        total = 0
+        while deleted := await self.purge_once():
+            total += deleted
+            # let other requests (and writers) in between batches
+            await asyncio.sleep(0)
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                deleted = await self.purge()
+                if deleted:
+                    logger.info("Purged %d deleted rows.", deleted)
+            except Exception:
+                logger.exception("Failed to purge deleted rows.")
+            await asyncio.sleep(self.interval)
+
+
+def shard_purgers() -> list[TombstonePurger]:
+    """One purger per shard; just `db` when unsharded."""
+    return [
+        TombstonePurger(
+            database, batch_size=config.PURGE_BATCH_SIZE, interval=config.PURGE_INTERVAL
+        )
+        for database in shards.databases
+    ]
@@ -0,0 +1,166 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from socials_api.config import config
+
+
+class TokenBucketLimiter:
+    """In-memory token buckets, one per key, with O(1) work per request.
+
+    Each bucket holds up to `burst` tokens and refills at `rate` tokens per second.
+    Buckets live in an LRU; a bucket idle long enough to have refilled completely is
+    indistinguishable from a new one, so idle buckets are dropped from the cold end,
+    and the LRU never holds more than `max_keys` buckets.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_keys: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        # key -> [tokens, last refill time]
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self._full_after = burst / rate if rate > 0 else math.inf
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """Take `cost` tokens from key's bucket.
+
+        Returns 0 when allowed, otherwise the seconds until enough tokens refill.
+        """
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        self._evict(now)
+
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (cost - bucket[0]) / self.rate
+
+    def _evict(self, now: float) -> None:
+        # at most a couple of pops per call in the steady state
+        while self._buckets:
+            _, last = next(iter(self._buckets.values()))
+            if len(self._buckets) > self.max_keys or now - last >= self._full_after:
+                self._buckets.popitem(last=False)
+            else:
+                break
+
+
+def route_key(method: str, path: str) -> str:
+    """Collapse numeric path segments so `/post/1` and `/post/2` share a bucket."""
+    segments = ["{id}" if part.isdigit() else part for part in path.split("/")]
+    return f"{method} {'/'.join(segments)}"
+
+
+class AdmissionControlMiddleware:
+    """Shed load before it reaches the database.
+
+    Requests over their client's per-route token bucket get `429`; requests arriving
+    while `max_concurrency` requests are already in flight get `503`. Both carry a
+    Retry-After header. Event streams hold no db connection once open, so they don't
+    count towards `max_concurrency`.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: Optional[TokenBucketLimiter] = None,
+        max_concurrency: int = 0,
+        costs: Optional[dict[str, float]] = None,
+        trust_forwarded: bool = False,
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.max_concurrency = max_concurrency
+        self.costs = costs or {}
+        self.trust_forwarded = trust_forwarded
+        self.in_flight = 0
+
+    def client_id(self, scope: Scope) -> str:
+        if self.trust_forwarded:
+            forwarded = Headers(scope=scope).get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.limiter is not None:
+            route = route_key(scope["method"], scope["path"])
+            retry_after = self.limiter.acquire(
+                f"{self.client_id(scope)} {route}", self.costs.get(route, 1.0)
+            )
+            if retry_after:
+                response = JSONResponse(
+                    {"detail": "Too many requests."},
+                    status_code=429,
+                    headers={"Retry-After": str(math.ceil(min(retry_after, 3600)))},
+                )
+                await response(scope, receive, send)
+                return
+
+        if self.max_concurrency and self.in_flight >= self.max_concurrency:
+            response = JSONResponse(
+                {"detail": "Server is busy, try again later."},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        if scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+
+def admission_control_middleware(app: ASGIApp) -> ASGIApp:
+    """Wrap app in `AdmissionControlMiddleware` configured from `GlobalConfig`."""
+    limiter = None
+    if config.RATE_LIMIT_ENABLED:
+        limiter = TokenBucketLimiter(
+            rate=config.RATE_LIMIT_RATE,
+            burst=config.RATE_LIMIT_BURST,
+            max_keys=config.RATE_LIMIT_MAX_KEYS,
+        )
+    if limiter is None and not config.MAX_CONCURRENT_REQUESTS:
+        return app
+    return AdmissionControlMiddleware(
+        app,
+        limiter=limiter,
+        max_concurrency=config.MAX_CONCURRENT_REQUESTS,
+        costs=config.RATE_LIMIT_COSTS,
+        trust_forwarded=config.RATE_LIMIT_TRUST_FORWARDED,
+    )
@@ -0,0 +1,177 @@
+"""Materialized post documents: each post with its comments, pre-rendered as JSON.
+
+With `READ_MODEL` on, every write to a post or its comments updates the post's
+document in the write's own transaction, and `GET /post/{id}/full` and
+`GET /comment/{post_id}` return the stored bytes after one primary-key lookup,
+without querying the comments or serializing anything.
+
+A document lives in its post's shard. One that's missing (the post was written
+while the read model was off, or bulk imported) is built on first read.
+"""
+
+import time
+from typing import Any, NamedTuple, Optional
+
+import databases
+import sqlalchemy
+from sqlalchemy import bindparam
+from sqlalchemy.dialects import sqlite
+
+from socials_api.api.models.database import document_db
+from socials_api.api.models.queries import COMMENTS_BY_POST, POST_BY_ID
+from socials_api.core.prepared import Prepared
+from socials_api.core.serialization import dumps
+
+
+class Document(NamedTuple):
+    # `UserPostWithComments` JSON
+    document: bytes
+    # `list[UserCommentOut]` JSON
+    comments: bytes
+
+
+DOCUMENT_BY_POST = Prepared(
+    sqlalchemy.select(document_db.c.document, document_db.c.comments).where(
+        document_db.c.post_id == bindparam("post_id")
+    )
+)
+
+_upsert = sqlite.insert(document_db).values(
+    post_id=bindparam("post_id"),
+    document=bindparam("document"),
+    comments=bindparam("comments"),
+    updated_at=bindparam("updated_at"),
+)
+UPSERT_DOCUMENT = Prepared(
+    _upsert.on_conflict_do_update(
+        index_elements=[document_db.c.post_id],
+        set_={
+            "document": _upsert.excluded.document,
+            "comments": _upsert.excluded.comments,
+            "updated_at": _upsert.excluded.updated_at,
+        },
+    )
+)
+
+DELETE_DOCUMENT = Prepared(
+    document_db.delete().where(document_db.c.post_id == bindparam("post_id"))
+)
+
+
+def render(post: Any, comments: list) -> Document:
+    """Encode a post and its comments (in id order), rows or dicts, as a `Document`."""
+    return Document(
+        document=dumps(
+            {
+                "post": {"id": post["id"], "body": post["body"]},
+                "comments": [
+                    {"id": c["id"], "comment": c["comment"]} for c in comments
+                ],
+            }
+        ),
+        comments=dumps(
+            [
+                {
+                    "id": c["id"],
+                    "comment": c["comment"],
+                    "post_id": c["post_id"],
+                    "parent_id": c["parent_id"],
+                }
+                for c in comments
+            ]
+        ),
+    )
+
+
+def _append(array: bytes, item: bytes, suffix: bytes = b"") -> bytes:
+    """Splice item onto the end of the JSON array that ends `array + suffix`."""
+    head = array[: len(array) - len(suffix) - 1]
+    separator = b"" if head.endswith(b"[") else b","
+    return head + separator + item + b"]" + suffix
+
+
+async def store_document(
+    database: databases.Database, post_id: int, document: Document
+) -> None:
+    await UPSERT_DOCUMENT.execute(
+        database,
+        post_id=post_id,
+        document=document.document,
+        comments=document.comments,
+        updated_at=time.time(),
+    )
+
+
+async def refresh_document(
+    database: databases.Database, post_id: int
+) -> Optional[Document]:
+    """Rebuild a post's document from its rows, or drop it if the post is gone.
+
+    Call it in the transaction of the write, after the write (so the transaction
+    already holds the write lock when the rows are read).
+    """
+    post = await POST_BY_ID.fetch_one(database, id=post_id)
+    if post is None:
+        await drop_document(database, post_id)
+        return None
+    document = render(post, await COMMENTS_BY_POST.fetch_all(database, post_id=post_id))
+    await store_document(database, post_id, document)
+    return document
+
+
+async def append_comment(database: databases.Database, comment: dict[str, Any]) -> None:
+    """Add a new comment to the end of its post's document, if there is one.
+
+    Cheaper than `refresh_document` on long threads: the stored bytes are patched
+    rather than the thread re-read and re-encoded. Call it like `refresh_document`.
+    """
+    row = await DOCUMENT_BY_POST.fetch_one(database, post_id=comment["post_id"])
+    if row is None:
+        return  # built on first read
+    item = {"id": comment["id"], "comment": comment["comment"]}
+    document = Document(
+        # the document is {"post": ..., "comments": [...]}: the array closes it
+        document=_append(row.document, dumps(item), suffix=b"}"),
+        comments=_append(
+            row.comments,
+            dumps(
+                {
+                    **item,
+                    "post_id": comment["post_id"],
+                    "parent_id": comment["parent_id"],
+                }
+            ),
+        ),
+    )
+    await store_document(database, comment["post_id"], document)
+
+
+async def drop_document(database: databases.Database, post_id: int) -> None:
+    await DELETE_DOCUMENT.execute(database, post_id=post_id)
+
+
+async def get_document(
+    database: databases.Database, post_id: int
+) -> Optional[Document]:
+    """The post's document, building it if missing; None if there's no such post.
+
+    Reads of posts that don't exist write nothing: only building a document takes
+    a transaction, and with it the write lock.
+    """
+    row = await DOCUMENT_BY_POST.fetch_one(database, post_id=post_id)
+    if row is not None:
+        return Document(row.document, row.comments)
+    if await POST_BY_ID.fetch_one(database, id=post_id) is None:
+        return None
+    async with database.transaction():
+        return await refresh_document(database, post_id)
+
+
+async def clear_documents(database: databases.Database) -> None:
+    """Drop every document.
+
+    Writes made while the read model is off don't update documents, so the app
+    clears them on startup unless `READ_MODEL` is on.
+    """
+    if await database.fetch_one(sqlalchemy.select(document_db.c.post_id).limit(1)):
+        await database.execute(document_db.delete())
@@ -0,0 +1,159 @@
+import asyncio
+import heapq
+import itertools
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import databases
+import sqlalchemy
+from sqlalchemy import Insert, Select, Table, bindparam
+
+from socials_api.api.models.database import InstrumentedDatabase, db, get_engine
+from socials_api.api.models.migrations import migrate
+from socials_api.config import config
+from socials_api.core.ids import IdGenerator, default_worker_id
+from socials_api.core.lazy import Lazy
+from socials_api.core.prepared import prepared
+
+T = TypeVar("T")
+
+
+class Shards:
+    """Posts and comments partitioned by id across several databases.
+
+    Shard `i` of `n` holds the ids `i + 1, i + 1 + n, i + 1 + 2n, ...`, so the shard
+    of any post or comment follows from its id alone, and every shard can allocate
+    ids without asking the others. A comment takes an id from its post's shard,
+    which keeps a post and its comments in one file (and one transaction).
+
+    With a single database this is the plain unsharded layout: ids are allocated
+    by SQLite as before. With an `IdGenerator`, ids are time-ordered snowflakes
+    picked in the process instead, from the same id class of the shard.
+    """
+
+    def __init__(
+        self, databases: list[databases.Database], ids: Optional[IdGenerator] = None
+    ):
+        if not databases:
+            raise ValueError("Shards need at least one database.")
+        self.databases = databases
+        self.ids = ids
+        # new posts are spread over the shards in turn
+        self._next = itertools.cycle(range(len(databases)))
+
+    @property
+    def count(self) -> int:
+        return len(self.databases)
+
+    def index_for(self, id: int) -> int:
+        return (id - 1) % self.count
+
+    def for_id(self, id: int) -> databases.Database:
+        """The database holding the post or comment with this id."""
+        return self.databases[self.index_for(id)]
+
+    def next_index(self) -> int:
+        """Shard to put the next new post in."""
+        return next(self._next)
+
+    async def insert(self, index: int, table: Table, values: dict[str, Any]) -> int:
+        """Insert a row into shard `index` with an id from the shard's id class.
+
+        Without an id generator the id comes from a subquery of the same statement,
+        so concurrent inserts into a shard are serialized by its write lock like an
+        autoincrement. Returns the new id.
+        """
+        database = self.databases[index]
+        if self.ids is not None:
+            values = {
+                **values,
+                "id": self.ids.next_id(residue=index, modulus=self.count),
+            }
+        elif self.count > 1:
+            statement = prepared(
+                ("insert_next_id", table.name, *values),
+                lambda: _insert_next_id(table, values),
+            )
+            return await statement.execute(
+                database, **values, first=index + 1 - self.count, count=self.count
+            )
+        statement = prepared(
+            ("insert", table.name, *values), lambda: _insert(table, values)
+        )
+        return await statement.execute(database, **values)
+
+    async def gather(
+        self, func: Callable[[databases.Database], Awaitable[T]]
+    ) -> list[T]:
+        """Run func against every shard concurrently; results in shard order."""
+        return await asyncio.gather(*(func(database) for database in self.databases))
+
+    async def fetch_merged(
+        self, q: Select, id_column: sqlalchemy.Column, limit: Optional[int] = None
+    ) -> list:
+        """Scatter q to every shard and merge the rows in id order.
+
+        q must not be ordered or limited already; each shard returns at most `limit`
+        rows, which is all the merge can need.
+        """
+        q = q.order_by(id_column).limit(limit)
+        results = await self.gather(lambda database: database.fetch_all(q))
+        if self.count == 1:
+            return results[0]
+        merged = heapq.merge(*results, key=lambda row: row._mapping[id_column.name])
+        return list(itertools.islice(merged, limit))
+
+    async def connect(self) -> None:
+        await self.gather(lambda database: database.connect())
+
+    async def disconnect(self) -> None:
+        await self.gather(lambda database: database.disconnect())
+
+
+def _insert(table: Table, values: dict[str, Any]) -> Insert:
+    return table.insert().values({column: bindparam(column) for column in values})
+
+
+def _insert_next_id(table: Table, values: dict[str, Any]) -> Insert:
+    next_id = sqlalchemy.select(
+        sqlalchemy.func.coalesce(sqlalchemy.func.max(table.c.id), bindparam("first"))
+        + bindparam("count")
+    ).scalar_subquery()
+    return _insert(table, values).values(id=next_id)
+
+
+def shard_engines() -> list[sqlalchemy.Engine]:
+    """Sync engines for every shard, e.g. to migrate them."""
+    if not config.SHARD_URLS:
+        return [get_engine()]
+    return [
+        sqlalchemy.create_engine(url, connect_args={"check_same_thread": False})
+        for url in config.SHARD_URLS
+    ]
+
+
+def migrate_shards() -> None:
+    """Apply pending migrations to every shard."""
+    for engine in shard_engines():
+        migrate(engine)
+
+
+def _build_shards() -> Shards:
+    ids = None
+    if config.ID_GENERATOR == "snowflake":
+        ids = IdGenerator(default_worker_id(config.WORKER_ID))
+    if not config.SHARD_URLS:
+        return Shards([db], ids)
+    if config.COMMENT_WRITE_BEHIND:
+        # the queue writes to a single database
+        raise ValueError("COMMENT_WRITE_BEHIND can't be used with SHARD_URLS")
+    return Shards(
+        [
+            InstrumentedDatabase(url, force_rollback=config.DB_FORCE_ROLLBACK)
+            for url in config.SHARD_URLS
+        ],
+        ids,
+    )
+
+
+# built on first use; without SHARD_URLS it wraps the single `db`
+shards: Shards = Lazy(_build_shards)
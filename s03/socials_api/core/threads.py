@@ -0,0 +1,163 @@
+"""Reply threads stored as materialized paths.
+
+A comment's `path` is the ids of its thread from the root down to itself, each as
+a fixed-width hex segment: `000000000000000a.0000000000000013.` is comment 0x13,
+a reply to top-level comment 0xa. Sorting by path lists a post's comments
+depth-first with siblings in id order, and a comment's subtree is the range of
+paths from its own up to `subtree_end` of it. Both come from the
+`(post_id, path)` index, so a page of threads is one range query.
+"""
+
+from typing import Any, Optional
+
+import databases
+import sqlalchemy
+from sqlalchemy import Select, bindparam
+
+from socials_api.api.models.database import comment_db, select_comments
+from socials_api.core.prepared import Prepared
+from socials_api.core.sharding import Shards
+
+# `printf` format of one path segment (16 hex digits cover any 64-bit id)
+SEGMENT = "%016x."
+
+SET_PATH = Prepared(
+    comment_db.update()
+    .where(comment_db.c.id == bindparam("id"))
+    .values(path=bindparam("path"))
+)
+
+# a comment and all its replies (see `subtree`)
+SOFT_DELETE_SUBTREE = Prepared(
+    comment_db.update()
+    .where(
+        comment_db.c.post_id == bindparam("post_id"),
+        comment_db.c.path >= bindparam("path"),
+        comment_db.c.path < bindparam("end"),
+        comment_db.c.deleted_at.is_(None),
+    )
+    .values(deleted_at=bindparam("deleted_at"))
+)
+
+
+def segment(id: int) -> str:
+    return SEGMENT % id
+
+
+def subtree_end(path: str) -> str:
+    """Upper bound of the paths under `path`: "/" sorts right after the "." ending
+    its last segment and before any hex digit of a following sibling."""
+    return path[:-1] + "/"
+
+
+def comment_values(comment: str, post_id: int, parent: Optional[Any]) -> dict:
+    """Column values for a new comment, or a reply to the `parent` comment row.
+
+    `path` only holds the parent's path here; `insert_comment` adds the comment's
+    own segment once its id is known.
+    """
+    return {
+        "comment": comment,
+        "post_id": post_id,
+        "parent_id": parent.id if parent is not None else None,
+        "depth": parent.depth + 1 if parent is not None else 0,
+        "path": parent.path if parent is not None else "",
+    }
+
+
+async def insert_comment(shards: Shards, index: int, values: dict[str, Any]) -> int:
+    """Insert a comment built by `comment_values` into shard `index`; returns its id.
+
+    Call it in a transaction, so the row is never seen without its full path.
+    """
+    comment_id = await shards.insert(index, comment_db, values)
+    await SET_PATH.execute(
+        shards.databases[index],
+        id=comment_id,
+        path=values["path"] + segment(comment_id),
+    )
+    return comment_id
+
+
+def subtree(post_id: int, path: str) -> tuple[sqlalchemy.ColumnElement[bool], ...]:
+    """`where` criteria matching the comment at `path` and all its replies."""
+    return (
+        comment_db.c.post_id == post_id,
+        comment_db.c.path >= path,
+        comment_db.c.path < subtree_end(path),
+    )
+
+
+def select_threads(
+    post_id: int, after_id: int = 0, limit: Optional[int] = None, max_depth: int = 0
+) -> Select:
+    """One page of a post's threads in path order: the top-level comments after
+    `after_id` (at most `limit`) with their replies down to `max_depth`."""
+    after = subtree_end(segment(after_id)) if after_id else ""
+    q = (
+        select_comments()
+        .order_by(comment_db.c.path)
+        .where(
+            comment_db.c.post_id == post_id,
+            comment_db.c.path > after,
+            comment_db.c.depth <= max_depth,
+        )
+    )
+    if limit is not None:
+        # the page ends where the first top-level comment of the next one starts
+        next_root = (
+            sqlalchemy.select(comment_db.c.path)
+            .where(
+                comment_db.c.post_id == post_id,
+                comment_db.c.path > after,
+                comment_db.c.depth == 0,
+                comment_db.c.deleted_at.is_(None),
+            )
+            .order_by(comment_db.c.path)
+            .offset(limit)
+            .limit(1)
+            .scalar_subquery()
+        )
+        # "~" sorts after every path: no next page
+        q = q.where(comment_db.c.path < sqlalchemy.func.coalesce(next_root, "~"))
+    return q
+
+
+def build_tree(rows: list) -> list[dict[str, Any]]:
+    """Nest comment rows, in path order, into `UserCommentNode` dicts.
+
+    One pass: a reply always comes after its parent. Replies whose parent isn't in
+    the rows (deleted, or past the depth limit) are left out.
+    """
+    roots: list[dict[str, Any]] = []
+    nodes: dict[int, dict[str, Any]] = {}
+    for row in rows:
+        row = row._mapping
+        node = {
+            "id": row["id"],
+            "comment": row["comment"],
+            "post_id": row["post_id"],
+            "parent_id": row["parent_id"],
+            "depth": row["depth"],
+            "replies": [],
+        }
+        if row["parent_id"] is None:
+            roots.append(node)
+        elif row["parent_id"] in nodes:
+            nodes[row["parent_id"]]["replies"].append(node)
+        else:
+            continue
+        nodes[row["id"]] = node
+    return roots
+
+
+async def fetch_threads(
+    database: databases.Database,
+    post_id: int,
+    after_id: int = 0,
+    limit: Optional[int] = None,
+    max_depth: int = 0,
+) -> list[dict[str, Any]]:
+    """`select_threads` nested by `build_tree`."""
+    rows = await database.fetch_all(select_threads(post_id, after_id, limit, max_depth))
+    return build_tree(rows)
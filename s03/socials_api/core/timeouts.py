@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import sqlite3
+from typing import Optional
+
+import databases
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from socials_api.api.models.database import request_connections
+from socials_api.config import config
+from socials_api.core.rate_limit import route_key
+
+logger = logging.getLogger(__name__)
+
+
+def sqlite_connection(
+    connection: databases.core.Connection,
+) -> Optional[sqlite3.Connection]:
+    """The sqlite3 connection under a `databases` connection, while it's open.
+
+    `databases` opens an aiosqlite connection per task (there is no pool to borrow
+    from), or shares one global connection under force_rollback; its internals
+    aren't public, so a backend without these attributes gives `None`.
+    """
+    backend = getattr(connection, "_connection", None)
+    aiosqlite_connection = getattr(backend, "_connection", None)
+    raw = getattr(aiosqlite_connection, "_conn", None)
+    return raw if isinstance(raw, sqlite3.Connection) else None
+
+
+class RequestTimeoutMiddleware:
+    """Answer `504` to requests that haven't started their response within their
+    route's time budget.
+
+    On expiry the running SQLite statements of the handler, and of any task it
+    started (e.g. `Shards.gather`), are interrupted: a statement runs in aiosqlite's
+    thread, so cancelling the task alone would leave it holding the connection
+    until it finished. The connections come from `request_connections`, which only
+    an `InstrumentedDatabase` fills in. Then the handler task is cancelled, which
+    rolls back any transaction it had open. The budget only covers the time to the
+    response head: streams and exports run as long as they need once started.
+
+    `budgets` maps `route_key`s to seconds, overriding `default`; 0 is no budget.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        default: float = 0,
+        budgets: Optional[dict[str, float]] = None,
+    ):
+        self.app = app
+        self.default = default
+        self.budgets = budgets or {}
+        self.timeouts = 0
+
+    def budget(self, scope: Scope) -> float:
+        return self.budgets.get(route_key(scope["method"], scope["path"]), self.default)
+
+    def interrupt(
+        self, task: asyncio.Task, connections: set[databases.core.Connection]
+    ) -> None:
+        """Abort the running statements on `connections` and cancel `task`."""
+        for connection in connections:
+            raw = sqlite_connection(connection)
+            if raw is not None:
+                raw.interrupt()
+        task.cancel()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        budget = self.budget(scope) if scope["type"] == "http" else 0
+        if not budget:
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        connections: set[databases.core.Connection] = set()
+        token = request_connections.set(connections)
+        expired = False
+
+        def expire() -> None:
+            nonlocal expired
+            expired = True
+            self.interrupt(task, connections)
+
+        timer = asyncio.get_running_loop().call_later(budget, expire)
+
+        async def send_in_time(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                timer.cancel()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_in_time)
+            return
+        except (asyncio.CancelledError, Exception):
+            # the interrupted statement can surface as an OperationalError (e.g. from
+            # a transaction's rollback) instead of the cancellation
+            if not expired:
+                raise
+            if hasattr(task, "uncancel"):  # Python 3.11+
+                task.uncancel()
+        finally:
+            timer.cancel()
+            request_connections.reset(token)
+
+        self.timeouts += 1
+        logger.warning(
+            "%s %s timed out after %gs.", scope["method"], scope["path"], budget
+        )
+        response = JSONResponse({"detail": "Request took too long."}, status_code=504)
+        await response(scope, receive, send)
+
+
+def request_timeout_middleware(app: ASGIApp) -> ASGIApp:
+    """Wrap app in `RequestTimeoutMiddleware` unless no route has a budget."""
+    if not config.REQUEST_TIMEOUT and not any(config.REQUEST_TIMEOUTS.values()):
+        return app
+    return RequestTimeoutMiddleware(
+        app,
+        default=config.REQUEST_TIMEOUT,
+        budgets=config.REQUEST_TIMEOUTS,
+    )
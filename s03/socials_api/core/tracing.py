@@ -0,0 +1,294 @@
+"""OpenTelemetry tracing of requests, route phases, db statements and serialization.
+
+A traced request gets a server span from `TracingMiddleware`, and under it:
+
+- `validate`: FastAPI parsing and validating the request, up to the endpoint call
+- the endpoint itself (named after its function), holding a `db <operation>` span
+  per statement run through an `InstrumentedDatabase`, and a `serialize` span for
+  responses built by `fast_json_response`
+- `serialize`: response model validation and encoding once the endpoint returns
+
+Whatever the request span covers beyond those is middleware and routing. Spans go
+through a `BatchSpanProcessor`, so they are encoded and exported by a background
+thread, to an OTLP/HTTP collector or to a file of OTLP JSON lines. Requests are
+sampled at `TRACING_SAMPLE_RATE` unless their `traceparent` header decides. An
+unsampled request costs one span start; the helpers here only check a context
+variable.
+"""
+
+import base64
+import contextlib
+import functools
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, ContextManager, Optional, Sequence
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from socials_api.config import config
+from socials_api.core.lazy import Lazy
+
+# opentelemetry is an optional extra; without it tracing stays off
+try:
+    from google.protobuf import json_format
+    from opentelemetry import propagate
+    from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        SpanExporter,
+        SpanExportResult,
+        SpanProcessor,
+    )
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    from opentelemetry.trace import SpanKind, Status, StatusCode, Tracer
+except ImportError:  # pragma: no cover - depends on installed extras
+    TracerProvider = None
+    SpanExporter = object
+
+logger = logging.getLogger(__name__)
+
+# the tracer of the request being traced; unset for unsampled requests and
+# background tasks, which then make no spans at all
+_tracer: ContextVar[Optional["Tracer"]] = ContextVar("tracer", default=None)
+_no_span = contextlib.nullcontext()
+
+
+def span(name: str, **attributes: Any) -> ContextManager:
+    """A child span of the current one in a traced request; otherwise a no-op."""
+    tracer = _tracer.get()
+    if tracer is None:
+        return _no_span
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+def db_span(operation: str, query: Any, current: bool = True) -> ContextManager:
+    """Span of one statement; `query` is SQL or a SQLAlchemy statement.
+
+    Pass `current=False` for a span held open across `yield`s, which mustn't
+    become the current span: the generator may be resumed in another context.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        return _no_span
+    start = tracer.start_as_current_span if current else tracer.start_span
+    return start(
+        f"db {operation}",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system.name": "sqlite",
+            "db.operation.name": operation,
+            # statements built per call are compiled here a second time; only
+            # sampled requests pay for it
+            "db.query.text": query if isinstance(query, str) else str(query),
+        },
+    )
+
+
+class _EndpointTiming:
+    __slots__ = ("start", "end")
+
+    def __init__(self):
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+
+
+_endpoint_timing: ContextVar[Optional[_EndpointTiming]] = ContextVar(
+    "endpoint_timing", default=None
+)
+
+
+def _traced_endpoint(endpoint: Callable) -> Callable:
+    name = endpoint.__name__
+
+    # `wraps` keeps the signature FastAPI reads parameters and the response model from
+    @functools.wraps(endpoint)
+    async def traced(*args, **kwargs):
+        timing = _endpoint_timing.get()
+        if timing is None:
+            return await endpoint(*args, **kwargs)
+        timing.start = time.time_ns()
+        try:
+            with span(name):
+                return await endpoint(*args, **kwargs)
+        finally:
+            timing.end = time.time_ns()
+
+    return traced
+
+
+class TracedRoute(APIRoute):
+    """`APIRoute` that splits a traced request into validation, endpoint and
+    serialization spans. Set it as a router's `route_class`; untraced requests go
+    straight through."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        super().__init__(path, _traced_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def traced_handler(request: Request):
+            tracer = _tracer.get()
+            if tracer is None:
+                return await handler(request)
+            timing = _EndpointTiming()
+            token = _endpoint_timing.set(timing)
+            start = time.time_ns()
+            try:
+                return await handler(request)
+            finally:
+                _endpoint_timing.reset(token)
+                end = time.time_ns()
+                # the endpoint's span exists already; these bracket it, after the fact
+                phases = [("validate", start, timing.start or end)]
+                if timing.end is not None:
+                    phases.append(("serialize", timing.end, end))
+                for name, phase_start, phase_end in phases:
+                    tracer.start_span(name, start_time=phase_start).end(
+                        end_time=phase_end
+                    )
+
+        return traced_handler
+
+
+class TracingMiddleware:
+    """Open a server span per request, continuing the caller's trace when the
+    request carries a `traceparent` header."""
+
+    def __init__(self, app: ASGIApp, tracer: "Tracer"):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in scope["headers"]
+        }
+        method = scope["method"]
+        with self.tracer.start_as_current_span(
+            method,
+            context=propagate.extract(headers),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as request_span:
+            if not request_span.is_recording():
+                await self.app(scope, receive, send)
+                return
+
+            status = 500  # if the app fails before responding
+
+            async def send_traced(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                await send(message)
+
+            token = _tracer.set(self.tracer)
+            try:
+                await self.app(scope, receive, send_traced)
+            finally:
+                _tracer.reset(token)
+                route = getattr(scope.get("route"), "path", None)
+                if route is not None:
+                    request_span.update_name(f"{method} {route}")
+                    request_span.set_attribute("http.route", route)
+                request_span.set_attribute("http.response.status_code", status)
+                if status >= 500:
+                    request_span.set_status(Status(StatusCode.ERROR))
+
+
+def _hex_ids(spans: list[dict]) -> None:
+    # protobuf's JSON mapping writes bytes as base64; OTLP JSON wants ids in hex
+    for span in spans:
+        for key in ("traceId", "spanId", "parentSpanId"):
+            if span.get(key):
+                span[key] = base64.b64decode(span[key]).hex()
+        _hex_ids(span.get("links", []))
+
+
+class OTLPJsonFileExporter(SpanExporter):
+    """Append each batch of spans to `path` as one OTLP JSON
+    `ExportTraceServiceRequest` per line, the format the OpenTelemetry collector's
+    file exporter writes and its otlpjsonfile receiver reads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence["ReadableSpan"]) -> "SpanExportResult":
+        request = json_format.MessageToDict(encode_spans(spans))
+        for resource_spans in request.get("resourceSpans", []):
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                _hex_ids(scope_spans.get("spans", []))
+        line = json.dumps(request, separators=(",", ":"))
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+class Tracing:
+    """A tracer provider sampling `sample_rate` of new traces and handing finished
+    spans to `processor` (a `BatchSpanProcessor` over `exporter` by default)."""
+
+    def __init__(
+        self,
+        exporter: Optional["SpanExporter"] = None,
+        sample_rate: float = 1.0,
+        service_name: str = "socials_api",
+        processor: Optional["SpanProcessor"] = None,
+    ):
+        self.provider = TracerProvider(
+            resource=Resource.create({"service.name": service_name}),
+            sampler=ParentBased(TraceIdRatioBased(sample_rate)),
+        )
+        self.provider.add_span_processor(processor or BatchSpanProcessor(exporter))
+        self.tracer = self.provider.get_tracer(__name__)
+
+    def shutdown(self) -> None:
+        """Export the spans still buffered and stop the exporter thread."""
+        self.provider.shutdown()
+
+
+def tracing_middleware(app: ASGIApp) -> ASGIApp:
+    """Wrap app in `TracingMiddleware` when `TRACING_ENABLED` is on."""
+    if not config.TRACING_ENABLED:
+        return app
+    if TracerProvider is None:
+        logger.warning("TRACING_ENABLED is set but opentelemetry isn't installed.")
+        return app
+    return TracingMiddleware(app, tracing.tracer)
+
+
+def _build_tracing() -> Tracing:
+    exporter: SpanExporter
+    if config.TRACING_EXPORTER == "file":
+        exporter = OTLPJsonFileExporter(config.TRACING_FILE)
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        exporter = OTLPSpanExporter(endpoint=config.TRACING_OTLP_ENDPOINT)
+    return Tracing(
+        exporter,
+        sample_rate=config.TRACING_SAMPLE_RATE,
+        service_name=config.TRACING_SERVICE_NAME,
+    )
+
+
+# built on first use, by the middleware factory
+tracing: Tracing = Lazy(_build_tracing)
@@ -0,0 +1,18 @@
+import databases
+
+from socials_api.api.models.database import change_db, select_comments, select_posts
+
+
+async def warm_up(database: databases.Database) -> None:
+    """Run one cheap read per hot query path.
+
+    The first query on a fresh worker pays for opening the connection and reading the
+    schema and index roots from disk; doing it here, in the lifespan, keeps that off
+    the first real requests.
+    """
+    for q in (
+        select_posts().limit(1),
+        select_comments().limit(1),
+        change_db.select().order_by(change_db.c.seq.desc()).limit(1),
+    ):
+        await database.fetch_all(q)
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Optional
+
+import databases
+
+from socials_api.api.models.database import comment_db, db
+from socials_api.api.models.queries import (
+    EXPIRE_RESERVATIONS,
+    INSERT_RESERVATION,
+    TOUCH_POST,
+)
+from socials_api.config import config
+from socials_api.core.changes import record_change
+from socials_api.core.lazy import Lazy
+from socials_api.core.read_model import append_comment
+from socials_api.core.sharding import shards
+from socials_api.core.threads import comment_values, insert_comment
+
+logger = logging.getLogger(__name__)
+
+
+class CommentQueueFull(Exception):
+    """Raised when a comment is submitted while the write-behind queue is full."""
+
+
+class CommentWriteQueue:
+    """Bounded in-process queue that flushes accepted comments in batched transactions.
+
+    `submit` never touches the database; a single background task started with
+    `start` pulls comments off the queue and inserts them in one transaction per
+    batch, so bursts of writers turn into a few large writes instead of many small
+    ones contending for the SQLite write lock.
+
+    Accepted comments are never silently dropped: a failing batch is retried
+    `max_retries` times with exponential backoff, then written one comment per
+    transaction, and comments that still fail are appended to `dead_letter_file`.
+    Each comment's reservation id is stored with its comment id (see
+    `reservation_db`) for `reservation_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        database: databases.Database,
+        maxsize: int = 1000,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        max_retries: int = 3,
+        retry_backoff: float = 0.1,
+        dead_letter_file: str = "comment_dead_letters.ndjson",
+        reservation_ttl: float = 86400.0,
+    ):
+        self.database = database
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_file = dead_letter_file
+        self.reservation_ttl = reservation_ttl
+        self.dead_lettered = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, comment: str, post_id: int, parent: Optional[Any] = None) -> str:
+        """Queue a comment (a reply, if given the `parent` comment row) for insertion
+        and return its reservation id."""
+        if self._closing:
+            raise CommentQueueFull("Comment queue is shutting down.")
+        reservation_id = uuid.uuid4().hex
+        try:
+            self._queue.put_nowait(
+                (reservation_id, comment_values(comment, post_id, parent))
+            )
+        except asyncio.QueueFull:
+            raise CommentQueueFull("Comment queue is full.")
+        return reservation_id
+
+    async def start(self) -> None:
+        """Start the background flusher."""
+        if self.running:
+            return
+        self._closing = False
+        if self._queue.empty():
+            # asyncio queues bind to the loop they first wait on; each lifespan gets its own
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop accepting comments, flush everything still queued, then stop the flusher."""
+        self._closing = True
+        if self.running:
+            await self._queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        # flusher was never started (or died): flush leftovers inline
+        while not self._queue.empty():
+            await self._flush(self._take_batch([]))
+
+    def _take_batch(self, batch: list[tuple[str, dict]]) -> list[tuple[str, dict]]:
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # give a burst a moment to pile up, unless a full batch is already waiting
+            if self._queue.qsize() < self.batch_size - 1 and not self._closing:
+                await asyncio.sleep(self.flush_interval)
+            await self._flush(self._take_batch(batch))
+
+    async def _flush(self, batch: list[tuple[str, dict]]) -> None:
+        try:
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                try:
+                    await self._write(batch)
+                    return
+                except Exception:
+                    logger.exception(
+                        "Failed to flush %d queued comments (attempt %d).",
+                        len(batch),
+                        attempt + 1,
+                    )
+            # write what can be written: one bad comment shouldn't sink its batch
+            failed = batch
+            if len(batch) > 1:
+                failed = []
+                for item in batch:
+                    try:
+                        await self._write([item])
+                    except Exception:
+                        failed.append(item)
+            if failed:
+                try:
+                    await asyncio.to_thread(self._dead_letter, failed)
+                except Exception:
+                    # last resort: the comments are in the log line
+                    logger.exception("Failed to dead-letter comments: %r", failed)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _write(self, batch: list[tuple[str, dict]]) -> None:
+        now = time.time()
+        # one commit per batch is what saves the time; rows go in one by one so
+        # each comment's id can be written to the change log
+        async with self.database.transaction():
+            for reservation_id, values in batch:
+                # write-behind is unsharded, so everything goes to shard 0
+                comment_id = await insert_comment(shards, 0, values)
+                await INSERT_RESERVATION.execute(
+                    self.database,
+                    reservation_id=reservation_id,
+                    comment_id=comment_id,
+                    created_at=now,
+                )
+                await record_change(self.database, comment_db, comment_id, "insert")
+                if config.READ_MODEL:
+                    await append_comment(self.database, {**values, "id": comment_id})
+            for post_id in {values["post_id"] for _, values in batch}:
+                await TOUCH_POST.execute(self.database, id=post_id, modified_at=now)
+            await EXPIRE_RESERVATIONS.execute(
+                self.database, before=now - self.reservation_ttl
+            )
+
+    def _dead_letter(self, items: list[tuple[str, dict]]) -> None:
+        """Append comments that couldn't be written to the dead-letter file, one
+        NDJSON line each, to be replayed by hand. Runs in a thread."""
+        logger.error("Writing %d comments to %s.", len(items), self.dead_letter_file)
+        with open(self.dead_letter_file, "a", encoding="utf-8") as file:
+            for reservation_id, values in items:
+                line = {"reservation_id": reservation_id, "failed_at": time.time()}
+                file.write(json.dumps({**line, **values}) + "\n")
+        self.dead_lettered += len(items)
+
+
+# built on first use so importing the routes doesn't resolve config
+comment_queue: CommentWriteQueue = Lazy(
+    lambda: CommentWriteQueue(
+        db,
+        maxsize=config.COMMENT_QUEUE_MAXSIZE,
+        batch_size=config.COMMENT_QUEUE_BATCH_SIZE,
+        flush_interval=config.COMMENT_QUEUE_FLUSH_INTERVAL,
+        max_retries=config.COMMENT_QUEUE_MAX_RETRIES,
+        retry_backoff=config.COMMENT_QUEUE_RETRY_BACKOFF,
+        dead_letter_file=config.COMMENT_QUEUE_DEAD_LETTER_FILE,
+        reservation_ttl=config.COMMENT_RESERVATION_TTL,
+    )
+)
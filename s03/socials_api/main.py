@@ -1,21 +1,88 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from socials_api.api.models.database import db
+from socials_api.api.routes.changes import router as changes
+from socials_api.api.routes.diagnostics import router as diagnostics
+from socials_api.api.routes.export import router as export
+from socials_api.api.routes.health import router as health
 from socials_api.api.routes.user_comments import router as user_comments
 from socials_api.api.routes.user_posts import router as user_posts
+from socials_api.config import config
+from socials_api.core.access_log import access_log, access_log_middleware
+from socials_api.core.compression import compression_middleware
+from socials_api.core.health import circuit_breaker_middleware, health_checker
+from socials_api.core.http_cache import cache_headers_middleware
+from socials_api.core.loop_monitor import loop_monitor
+from socials_api.core.offload import offloader
+from socials_api.core.profiling import request_profiler_middleware
+from socials_api.core.purge import shard_purgers
+from socials_api.core.rate_limit import admission_control_middleware
+from socials_api.core.read_model import clear_documents
+from socials_api.core.sharding import migrate_shards, shards
+from socials_api.core.timeouts import request_timeout_middleware
+from socials_api.core.tracing import tracing, tracing_middleware
+from socials_api.core.warmup import warm_up
+from socials_api.core.write_behind import comment_queue
 
 
 # connect to database before and after request operations
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await db.connect()
+    if config.ACCESS_LOG_ENABLED:
+        access_log.start()
+    if config.LOOP_MONITOR_ENABLED:
+        await loop_monitor.start()
+    if config.DB_MIGRATE_ON_STARTUP:
+        # migrations run through the sync engine, so keep them off the event loop
+        await asyncio.to_thread(migrate_shards)
+    await shards.connect()
+    if config.HEALTH_CHECK_ENABLED:
+        await health_checker.start()
+    if not config.READ_MODEL:
+        # documents would go stale while writes skip them
+        await shards.gather(clear_documents)
+    if config.WARM_UP_ON_STARTUP:
+        await shards.gather(warm_up)
+    if config.COMMENT_WRITE_BEHIND:
+        await comment_queue.start()
+    purgers = shard_purgers() if config.PURGE_ENABLED else []
+    for purger in purgers:
+        await purger.start()
+    await offloader.start()
     yield
-    await db.disconnect()
+    # no reconnects while shutting down
+    await health_checker.stop()
+    offloader.stop()
+    for purger in purgers:
+        await purger.stop()
+    # flush queued comments while the db is still connected
+    await comment_queue.stop()
+    await shards.disconnect()
+    await loop_monitor.stop()
+    if tracing.resolved:
+        # export the spans still buffered
+        tracing.shutdown()
+    # last, so it has the lines of requests served while shutting down
+    access_log.stop()
 
 
 app = FastAPI(lifespan=lifespan)
+# innermost: cache headers go on the route's own response, never on a profile of it
+app.add_middleware(cache_headers_middleware)
+# next, so a profile covers the route and not the other middleware
+app.add_middleware(request_profiler_middleware)
+app.add_middleware(compression_middleware)
+# budgets start once a request is admitted, and include compressing the response
+app.add_middleware(request_timeout_middleware)
+app.add_middleware(admission_control_middleware)
+# fail fast on a dead database before any other work
+app.add_middleware(circuit_breaker_middleware)
+# the request span covers every other middleware
+app.add_middleware(tracing_middleware)
+# outermost, so shed and failed requests are logged too
+app.add_middleware(access_log_middleware)
 
 
 @app.get("/")
@@ -25,3 +92,7 @@ async def read_root():
 
 app.include_router(user_posts)
 app.include_router(user_comments)
+app.include_router(changes)
+app.include_router(export)
+app.include_router(diagnostics)
+app.include_router(health)
@@ -0,0 +1,78 @@
+"""Production entry point: uvicorn with worker and event-loop settings from config.
+
+Run from the `s03` directory:
+
+    python -m socials_api.serve                 # SERVER_* settings from .env
+    python -m socials_api.serve --workers 4 --port 8080
+
+The app is imported and migrations are applied here, once, before any worker starts:
+a broken import fails fast instead of in every worker, and workers don't race each
+other to migrate the same file. Each worker then connects and warms up in its
+lifespan (see `WARM_UP_ON_STARTUP`) before it accepts connections.
+"""
+
+import argparse
+import os
+from typing import Any, Optional
+
+import uvicorn
+
+from socials_api.config import config
+from socials_api.core.sharding import migrate_shards
+
+APP = "socials_api.main:app"
+
+
+def worker_count(workers: int) -> int:
+    """Resolve 0 to one worker per CPU."""
+    return workers or os.cpu_count() or 1
+
+
+def uvicorn_options(**overrides: Any) -> dict[str, Any]:
+    """uvicorn.run keyword arguments from config, with command line overrides."""
+    options = {
+        "host": config.SERVER_HOST,
+        "port": config.SERVER_PORT,
+        "workers": worker_count(config.SERVER_WORKERS),
+        "loop": config.SERVER_LOOP,
+        "http": config.SERVER_HTTP,
+        "backlog": config.SERVER_BACKLOG,
+        "timeout_keep_alive": config.SERVER_KEEPALIVE,
+        "limit_concurrency": config.SERVER_LIMIT_CONCURRENCY or None,
+    }
+    options.update(
+        {key: value for key, value in overrides.items() if value is not None}
+    )
+    options["workers"] = worker_count(options["workers"])
+    return options
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve socials_api with uvicorn.")
+    parser.add_argument("--host", help="interface to bind")
+    parser.add_argument("--port", type=int, help="port to bind")
+    parser.add_argument(
+        "--workers", type=int, help="worker processes (0 = one per CPU)"
+    )
+    args = parser.parse_args(argv)
+
+    options = uvicorn_options(host=args.host, port=args.port, workers=args.workers)
+
+    # preload: import errors surface here, once
+    from socials_api.main import app
+
+    if config.DB_MIGRATE_ON_STARTUP:
+        migrate_shards()
+        # the schema is current now; workers are fresh processes that read their
+        # config from the environment, so tell them through it
+        os.environ[f"{config.model_config['env_prefix']}DB_MIGRATE_ON_STARTUP"] = (
+            "false"
+        )
+        config.DB_MIGRATE_ON_STARTUP = False
+
+    # uvicorn needs an import string to start worker processes
+    uvicorn.run(app if options["workers"] == 1 else APP, **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ os.environ["ENV_STATE"] = "test"
 
 # comment 'noqa: E402' on import line to make Ruff not format the import line
 from socials_api.api.models.database import db  # noqa: E402
+from socials_api.api.models.migrations import migrate  # noqa: E402
 from socials_api.main import app  # noqa: E402
 
 
@@ -19,6 +20,12 @@ def anyio_backend():
     return "asyncio"
 
 
+@pytest.fixture(scope="session", autouse=True)
+def db_schema() -> None:
+    """Migrate db schema once per test session (the app does this in its lifespan)."""
+    migrate()
+
+
 @pytest.fixture  # similar to @pytest.fixture()
 def client() -> Generator:
     yield TestClient(app)
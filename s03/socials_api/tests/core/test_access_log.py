@@ -0,0 +1,89 @@
+import json
+import logging
+import queue
+
+import pytest
+from httpx import AsyncClient
+
+from socials_api.core.access_log import AccessLog, JsonFormatter, access_log
+from socials_api.tests.utils import created_post as _created_post
+
+# set fixture variables
+created_post = _created_post
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.lines.append(self.format(record))
+
+
+def drain(records: queue.Queue) -> list[dict]:
+    """The queued entries, formatted as the writer thread would."""
+    formatter = JsonFormatter()
+    lines = []
+    while not records.empty():
+        lines.append(json.loads(formatter.format(records.get_nowait())))
+    return lines
+
+
+# Test the app's access log entries
+@pytest.mark.anyio
+async def test_access_log_entries(created_post, monkeypatch, async_client: AsyncClient):
+    """Test each request queues one entry with its route template, status, bytes
+    and db query count, without any of it being written on the event loop."""
+    monkeypatch.setattr(access_log, "sample_rate", 1.0)
+    drain(access_log.queue)
+
+    response = await async_client.get(f"/post/{created_post['id']}")
+    await async_client.get("/no/such/route")
+
+    ok, missing = drain(access_log.queue)
+    assert ok["method"] == "GET"
+    assert ok["route"] == "/post/{id}"
+    assert ok["path"] == f"/post/{created_post['id']}"
+    assert ok["status"] == 200
+    assert ok["bytes"] == len(response.content)
+    assert ok["queries"] >= 1
+    assert ok["duration_ms"] > 0
+    assert "time" in ok
+    assert missing["route"] is None
+    assert missing["status"] == 404
+    assert missing["queries"] == 0
+
+
+# Test sampling
+@pytest.mark.anyio
+async def test_access_log_sampling():
+    """Test successful requests are sampled while errors and slow requests are
+    always logged."""
+    log = AccessLog(ListHandler(), sample_rate=0.1, slow_threshold=1.0)
+    log.random = lambda: 0.5
+    assert not log.wanted(200, 0.01)
+    assert log.wanted(404, 0.01)
+    assert log.wanted(500, 0.01)
+    assert log.wanted(200, 2.0)
+    log.random = lambda: 0.05
+    assert log.wanted(200, 0.01)
+
+
+# Test the writer thread and a full queue
+@pytest.mark.anyio
+async def test_access_log_writer():
+    """Test entries are written by the listener thread, flushed on stop, and dropped
+    instead of blocking once the queue is full."""
+    handler = ListHandler()
+    log = AccessLog(handler, queue_size=2)
+    log.start()
+    log.log({"status": 200})
+    log.stop()
+    assert json.loads(handler.lines[0])["status"] == 200
+
+    # no writer running: the queue fills up
+    for status in (200, 201, 202):
+        log.log({"status": status})
+    assert log.dropped == 1
+    assert [entry["status"] for entry in drain(log.queue)] == [200, 201]
@@ -0,0 +1,113 @@
+import gzip
+import json
+
+import pytest
+import sqlalchemy
+from sqlalchemy import text
+
+from socials_api.api.models.database import change_db, comment_db, post_db
+from socials_api.api.models.migrations import migrate
+from socials_api.config import config
+from socials_api.core.bulk_import import BulkImportError, import_ndjson
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Engine on a freshly migrated sqlite file."""
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+def write_dump(path, records, compress=False) -> str:
+    data = "".join(json.dumps(record) + "\n" for record in records).encode()
+    with (gzip.open if compress else open)(path, "wb") as file:
+        file.write(data)
+    return str(path)
+
+
+def rows(engine, table) -> list[tuple]:
+    with engine.connect() as conn:
+        q = table.select().order_by(*table.primary_key)
+        return [tuple(row) for row in conn.execute(q)]
+
+
+RECORDS = [
+    {"post": {"id": 5, "body": "Post 5"}, "comments": [{"id": 9, "comment": "A"}]},
+    {"post": {"id": 7, "body": "Post 7"}, "comments": []},
+    {"post": {"body": "Post without id"}, "comments": [{"comment": "B"}]},
+]
+
+
+# Test import_ndjson keeps post ids and attaches comments
+@pytest.mark.anyio
+async def test_import_ndjson(engine, tmp_path):
+    """Test a gzipped dump is imported across batches, with its change log entries."""
+    path = write_dump(tmp_path / "dump.ndjson.gz", RECORDS, compress=True)
+    stats = import_ndjson(path, engine, batch_size=2, defer_indexes=True)
+    assert (stats["posts"], stats["comments"]) == (3, 2)
+
+    assert [(id, body) for id, body, *_ in rows(engine, post_db)] == [
+        (5, "Post 5"),
+        (7, "Post 7"),
+        (8, "Post without id"),
+    ]
+    assert [(c, post_id) for _, c, post_id, *_ in rows(engine, comment_db)] == [
+        ("A", 5),
+        ("B", 8),
+    ]
+    assert len(rows(engine, change_db)) == 5
+
+    # the deferred index is back
+    with engine.connect() as conn:
+        indexes = conn.execute(text("PRAGMA index_list(comments)")).fetchall()
+    assert "ix_comments_post_id" in {index.name for index in indexes}
+
+
+# Test import_ndjson with new_ids
+@pytest.mark.anyio
+async def test_import_ndjson_new_ids(engine, tmp_path):
+    """Test importing the same dump twice with new_ids renumbers the second copy."""
+    path = write_dump(tmp_path / "dump.ndjson", RECORDS)
+    import_ndjson(path, engine)
+    import_ndjson(path, engine, new_ids=True)
+    assert [id for id, *_ in rows(engine, post_db)] == [5, 7, 8, 9, 10, 11]
+    assert [post_id for _, _, post_id, *_ in rows(engine, comment_db)] == [5, 8, 9, 11]
+
+
+# Test import_ndjson with an invalid record
+@pytest.mark.anyio
+async def test_import_ndjson_invalid(engine, tmp_path):
+    """Test a failing batch is rolled back while earlier batches stay committed."""
+    records = RECORDS[:2] + [{"post": {"id": 8}, "comments": []}]  # no body
+    path = write_dump(tmp_path / "dump.ndjson", records)
+    with pytest.raises(BulkImportError, match="lines 3-3"):
+        import_ndjson(path, engine, batch_size=2)
+    assert [id for id, *_ in rows(engine, post_db)] == [5, 7]
+
+
+# Test import_ndjson with post ids that are taken
+@pytest.mark.anyio
+async def test_import_ndjson_conflict(engine, tmp_path):
+    """Test importing a post id that exists already is reported like an invalid
+    record."""
+    path = write_dump(tmp_path / "dump.ndjson", RECORDS[:1])
+    import_ndjson(path, engine)
+    with pytest.raises(BulkImportError, match="lines 1-1"):
+        import_ndjson(path, engine)
+    assert [id for id, *_ in rows(engine, post_db)] == [5]
+
+
+# Test import_ndjson refuses sharded and snowflake setups
+@pytest.mark.anyio
+async def test_import_ndjson_unsupported(engine, tmp_path, monkeypatch):
+    """Test the import refuses to write rows the sharded app would never find."""
+    path = write_dump(tmp_path / "dump.ndjson", RECORDS)
+    monkeypatch.setattr(config, "ID_GENERATOR", "snowflake")
+    with pytest.raises(ValueError, match="ID_GENERATOR"):
+        import_ndjson(path, engine)
+    monkeypatch.setattr(config, "SHARD_URLS", ["sqlite:///shard0.db"])
+    with pytest.raises(ValueError, match="SHARD_URLS"):
+        import_ndjson(path, engine)
+    assert rows(engine, post_db) == []
@@ -0,0 +1,55 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from socials_api.core.compression import CompressionMiddleware, negotiate
+from socials_api.main import app
+from socials_api.tests.utils import created_post_factory as _created_post_factory
+
+# set fixture variables
+created_post_factory = _created_post_factory
+
+
+# Test negotiate
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("br;q=0.5, gzip", "br"),
+        ("gzip;q=0, br", "br"),
+        ("*", "zstd"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+@pytest.mark.anyio
+async def test_negotiate(accept_encoding: str, expected):
+    """Test negotiate picks our preferred encoding among those the client accepts."""
+    assert negotiate(accept_encoding, ["zstd", "br", "gzip"]) == expected
+
+
+# Test compression of large and small responses
+@pytest.mark.anyio
+async def test_compression_middleware(created_post_factory):
+    """Test large bodies are gzipped once and served from cache, small ones are not."""
+    middleware = CompressionMiddleware(app, minimum_size=200, encodings=("gzip",))
+    transport = ASGITransport(app=middleware)
+    headers = {"Accept-Encoding": "gzip"}
+
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await created_post_factory()
+        response = await client.get("/post/all", headers=headers)
+        assert "content-encoding" not in response.headers
+
+        for i in range(10):
+            await created_post_factory(f"Test Post {i + 1}")
+        for _ in range(2):
+            response = await client.get("/post/all", headers=headers)
+            assert response.headers["content-encoding"] == "gzip"
+            assert response.headers["vary"] == "Accept-Encoding"
+            assert len(response.json()) == 11
+
+        raw = await client.get("/post/all", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in raw.headers
+        assert raw.json() == response.json()
+
+    assert (middleware.cache.misses, middleware.cache.hits) == (1, 1)
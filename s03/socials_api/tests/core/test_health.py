@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from socials_api.core.health import HealthChecker
+
+
+class FakeDatabase:
+    """Stands in for a `databases.Database` that can drop, stall and come back."""
+
+    def __init__(self):
+        self.down = False
+        self.stalled = False
+        self.connects = 0
+
+    async def fetch_val(self, query: str):
+        if self.stalled:
+            await asyncio.sleep(10)
+        if self.down:
+            raise ConnectionError("connection lost")
+        return 1
+
+    async def connect(self) -> None:
+        if self.down:
+            raise ConnectionError("connection refused")
+        self.connects += 1
+
+    async def disconnect(self) -> None:
+        pass
+
+
+# Test the circuit opens after repeated failures
+@pytest.mark.anyio
+async def test_circuit_opens_and_closes():
+    """Test a database is marked down only after `failure_threshold` failed pings,
+    that a stalled ping counts as a failure, and one good ping brings it back."""
+    database = FakeDatabase()
+    checker = HealthChecker([database], timeout=0.05, failure_threshold=2)
+
+    await checker.check()
+    assert checker.healthy
+    assert checker.databases[0].latency is not None
+
+    database.stalled = True
+    await checker.check()
+    assert checker.healthy  # one failure isn't enough
+    await checker.check()
+    assert not checker.healthy
+    assert "TimeoutError" in checker.databases[0].last_error
+
+    database.stalled = False
+    await checker.check()
+    assert checker.healthy
+    assert checker.databases[0].failures == 0
+
+
+# Test reconnects back off
+@pytest.mark.anyio
+async def test_reconnect_with_backoff():
+    """Test the background task reconnects a dropped database, retrying with
+    growing, jittered delays until it's back."""
+    database = FakeDatabase()
+    checker = HealthChecker(
+        [database], interval=0.01, failure_threshold=1, backoff=0.01, max_backoff=0.04
+    )
+    delays = [checker.delay(attempt) for attempt in range(5)]
+    assert 0.005 <= delays[0] <= 0.01
+    assert all(0.02 <= delay <= 0.04 for delay in delays[2:])
+
+    database.down = True
+    await checker.start()
+    try:
+        while checker.healthy:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)  # a few failed reconnects
+        assert database.connects == 0
+        database.down = False
+        while not checker.healthy:
+            await asyncio.sleep(0.01)
+    finally:
+        await checker.stop()
+    assert database.connects >= 1
+    assert checker.databases[0].reconnects == 1
@@ -0,0 +1,90 @@
+from email.utils import formatdate
+
+import pytest
+from httpx import AsyncClient
+
+from socials_api.api.models.database import change_db, db, post_db
+from socials_api.config import config
+from socials_api.core.http_cache import not_modified
+from socials_api.tests.utils import created_comment_factory as _created_comment_factory
+from socials_api.tests.utils import created_post as _created_post
+
+# set fixture variables
+created_post = _created_post
+created_comment_factory = _created_comment_factory
+
+LONG_AGO = 1_700_000_000.0
+
+
+# Test Last-Modified and 304s on a single post
+@pytest.mark.anyio
+async def test_post_last_modified(
+    created_post, created_comment_factory, async_client: AsyncClient
+):
+    """Test a post's GETs carry the cache policy, answer 304 while unchanged and stop
+    doing so after a comment is added."""
+    post_id = created_post["id"]
+    await db.execute(
+        post_db.update().where(post_db.c.id == post_id).values(modified_at=LONG_AGO)
+    )
+
+    response = await async_client.get(f"/post/{post_id}")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == (
+        f"public, max-age={config.HTTP_CACHE_MAX_AGE}, "
+        f"stale-while-revalidate={config.HTTP_CACHE_STALE_WHILE_REVALIDATE}"
+    )
+    assert response.headers["vary"] == "Accept-Encoding"
+    last_modified = response.headers["last-modified"]
+    assert last_modified == formatdate(LONG_AGO, usegmt=True)
+
+    for path in (f"/post/{post_id}", f"/post/{post_id}/full", f"/comment/{post_id}"):
+        response = await async_client.get(
+            path, headers={"If-Modified-Since": last_modified}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["last-modified"] == last_modified
+
+    # modified this second: no date to revalidate against yet, so a full response
+    await created_comment_factory(post_id, "New comment")
+    response = await async_client.get(
+        f"/comment/{post_id}", headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 200
+    assert "last-modified" not in response.headers
+    assert response.json()[0]["comment"] == "New comment"
+
+
+# Test list endpoints follow the change log
+@pytest.mark.anyio
+async def test_list_last_modified(created_post, monkeypatch, async_client):
+    """Test list GETs take Last-Modified from the latest change, also when the
+    route returns a Response directly."""
+    monkeypatch.setattr(config, "FAST_SERIALIZATION", True)
+    await db.execute(change_db.update().values(changed_at=LONG_AGO))
+
+    response = await async_client.get("/post/all")
+    assert response.status_code == 200
+    assert response.headers["last-modified"] == formatdate(LONG_AGO, usegmt=True)
+    assert "max-age" in response.headers["cache-control"]
+
+    response = await async_client.get(
+        "/comment/all", headers={"If-Modified-Since": response.headers["last-modified"]}
+    )
+    assert response.status_code == 304
+
+    monkeypatch.setattr(config, "HTTP_CACHE_ENABLED", False)
+    response = await async_client.get("/post/all")
+    assert "cache-control" not in response.headers
+    assert "last-modified" not in response.headers
+
+
+# Test If-Modified-Since comparison
+@pytest.mark.anyio
+async def test_not_modified():
+    """Test dates compare at whole seconds and bad dates count as modified."""
+    date = formatdate(LONG_AGO, usegmt=True)
+    assert not_modified(LONG_AGO + 0.5, date)
+    assert not not_modified(LONG_AGO + 1, date)
+    assert not not_modified(LONG_AGO, "yesterday")
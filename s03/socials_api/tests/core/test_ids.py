@@ -0,0 +1,50 @@
+import pytest
+
+from socials_api.core.ids import EPOCH_MS, IdGenerator, timestamp_of
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+# Test ids increase and encode their time
+@pytest.mark.anyio
+async def test_next_id():
+    """Test ids strictly increase within a millisecond, across them and when the
+    clock goes back, and carry their creation time."""
+    clock = FakeClock(EPOCH_MS / 1000 + 100)
+    ids = IdGenerator(worker_id=7, clock=clock)
+    first, second = ids.next_id(), ids.next_id()
+    assert second == first + 1
+    assert timestamp_of(first) == pytest.approx(clock.now)
+
+    clock.now -= 1  # wall clock stepped back
+    third = ids.next_id()
+    clock.now += 2
+    fourth = ids.next_id()
+    assert second < third < fourth
+    assert timestamp_of(fourth) == pytest.approx(clock.now)
+
+
+# Test workers don't collide
+@pytest.mark.anyio
+async def test_worker_ids_differ():
+    """Test two workers at the same instant get different ids."""
+    clock = FakeClock(EPOCH_MS / 1000 + 100)
+    assert IdGenerator(1, clock).next_id() != IdGenerator(2, clock).next_id()
+    with pytest.raises(ValueError):
+        IdGenerator(1024)
+
+
+# Test ids in a shard's id class
+@pytest.mark.anyio
+async def test_next_id_residue():
+    """Test ids can be drawn from one shard's id class and still increase."""
+    ids = IdGenerator(worker_id=3)
+    drawn = [ids.next_id(residue=residue, modulus=3) for residue in (2, 0, 0, 1)]
+    assert [(id - 1) % 3 for id in drawn] == [2, 0, 0, 1]
+    assert drawn == sorted(set(drawn))
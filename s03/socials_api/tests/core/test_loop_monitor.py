@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+import pytest
+
+from socials_api.core.loop_monitor import LAG_BUCKETS_MS, LoopMonitor
+
+
+def block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+# Test record
+@pytest.mark.anyio
+async def test_record():
+    """Test lags land in the first bucket whose bound they don't exceed."""
+    monitor = LoopMonitor()
+    for lag in (0.0005, 0.001, 0.003, 10.0):
+        monitor.record(lag)
+    assert monitor.counts[:3] == [2, 0, 1]
+    assert monitor.counts[len(LAG_BUCKETS_MS)] == 1
+    snapshot = monitor.snapshot()
+    assert (snapshot["samples"], snapshot["max_ms"]) == (4, 10_000)
+    assert snapshot["histogram"][-1] == {"le_ms": None, "count": 1}
+
+
+# Test a blocking call is caught with its stack
+@pytest.mark.anyio
+async def test_blocking_call_sampled():
+    """Test a blocked loop shows up as lag and as a stack naming the culprit."""
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    await monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_the_loop(0.3)
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    snapshot = monitor.snapshot()
+    assert not snapshot["running"]
+    assert snapshot["max_ms"] >= 250
+    [stall] = snapshot["stalls"]
+    assert stall["count"] == 1
+    assert "in block_the_loop" in stall["stack"][-1]
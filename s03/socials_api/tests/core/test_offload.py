@@ -0,0 +1,65 @@
+import pytest
+from httpx import AsyncClient
+
+from socials_api.api.routes import user_posts
+from socials_api.core.offload import Offloader, posts_with_comments
+from socials_api.tests.utils import created_comment_factory as _created_comment_factory
+from socials_api.tests.utils import created_post_factory as _created_post_factory
+
+# set fixture variables
+created_post_factory = _created_post_factory
+created_comment_factory = _created_comment_factory
+
+
+# Test posts_with_comments
+@pytest.mark.anyio
+async def test_posts_with_comments():
+    """Test comments are nested under their posts, posts without any get []."""
+    posts = [(1, "Post 1"), (2, "Post 2")]
+    comments = [(1, 10, "A"), (1, 11, "B")]
+    assert posts_with_comments(posts, comments) == [
+        {
+            "post": {"body": "Post 1", "id": 1},
+            "comments": [{"id": 10, "comment": "A"}, {"id": 11, "comment": "B"}],
+        },
+        {"post": {"body": "Post 2", "id": 2}, "comments": []},
+    ]
+
+
+# Test should_offload
+@pytest.mark.anyio
+async def test_should_offload():
+    """Test only results at or over the threshold leave the event loop."""
+    assert not Offloader("off").should_offload(10**6)
+    offloader = Offloader("thread", min_rows=100)
+    assert not offloader.should_offload(99)
+    assert offloader.should_offload(100)
+
+
+# Test offloaded responses match inline ones
+@pytest.mark.parametrize("mode", ["thread", "process"])
+@pytest.mark.anyio
+async def test_offloaded_matches_inline(
+    created_post_factory,
+    created_comment_factory,
+    mode: str,
+    monkeypatch,
+    async_client: AsyncClient,
+):
+    """Test /post/all/comments returns the same payload built in a pool."""
+    for i in range(2):
+        post = await created_post_factory(f"Test Post {i + 1}")
+        await created_comment_factory(post["id"], f"Test Comment {i + 1}")
+    inline_response = await async_client.get("/post/all/comments")
+
+    offloader = Offloader(mode, workers=1, min_rows=1)
+    monkeypatch.setattr(user_posts, "offloader", offloader)
+    try:
+        await offloader.start()
+        response = await async_client.get("/post/all/comments")
+    finally:
+        offloader.stop()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == inline_response.json()
@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import bindparam
+
+from socials_api.api.models.database import db, post_db, select_posts
+from socials_api.core.prepared import Prepared, prepared
+
+
+# Test a prepared statement binds per-call and build-time values
+@pytest.mark.anyio
+async def test_prepared_statement():
+    """Test a prepared statement compiles once, keeps the values fixed when it was
+    built (the LIMIT) and takes the rest per call."""
+    await db.execute_many(post_db.insert(), [{"body": "a"}, {"body": "b"}])
+    first = Prepared(
+        select_posts().where(post_db.c.id >= bindparam("id")).order_by("id").limit(1)
+    )
+    sql = first.sql
+    assert ":id" in sql and first.sql is sql
+
+    rows = await first.fetch_all(db, id=2)
+    assert [row.body for row in rows] == ["b"]
+    row = await first.fetch_one(db, id=1)
+    assert row._mapping["body"] == "a"
+
+
+# Test prepared() caches by key
+@pytest.mark.anyio
+async def test_prepared_cache():
+    """Test prepared() builds a statement once per key."""
+    built = []
+
+    def build():
+        built.append(1)
+        return post_db.insert().values(body=bindparam("body"))
+
+    statement = prepared(("test_prepared_cache",), build)
+    assert prepared(("test_prepared_cache",), build) is statement
+    assert len(built) == 1
+
+    post_id = await statement.execute(db, body="c")
+    assert (
+        await db.fetch_one(select_posts().where(post_db.c.id == post_id))
+    ).body == "c"
@@ -0,0 +1,86 @@
+import sys
+import threading
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from socials_api.core.profiling import (
+    Profiler,
+    RequestProfilerMiddleware,
+    collapse_stack,
+    collapsed,
+    sample_stacks,
+)
+
+
+profiled_app = FastAPI()
+
+
+@profiled_app.get("/profiled")
+async def profiled_endpoint():
+    return {"ok": True}
+
+
+def spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        pass
+
+
+# Test collapse_stack
+@pytest.mark.anyio
+async def test_collapse_stack():
+    """Test a stack collapses to thread name first, then frames root to leaf."""
+    line = collapse_stack(sys._getframe(), "MainThread")
+    frames = line.split(";")
+    assert frames[0] == "MainThread"
+    assert frames[-1].startswith("test_collapse_stack (")
+
+
+# Test sample_stacks
+@pytest.mark.anyio
+async def test_sample_stacks():
+    """Test a busy thread shows up in the samples under its name."""
+    stop = threading.Event()
+    thread = threading.Thread(target=spin, args=(stop,), name="spinner")
+    thread.start()
+    try:
+        stacks = sample_stacks(0.05, interval=0.001)
+    finally:
+        stop.set()
+        thread.join()
+
+    spinning = [
+        line for line in collapsed(stacks).splitlines() if line.startswith("spinner;")
+    ]
+    assert spinning
+    stack, count = spinning[0].rsplit(" ", 1)
+    assert any(frame.startswith("spin (") for frame in stack.split(";"))
+    assert int(count) > 0
+
+
+# Test ?profile=1
+@pytest.mark.anyio
+async def test_request_profile(async_client: AsyncClient):
+    """Test ?profile=1 replaces the response with a profile of the request."""
+    # the first request builds the app's middleware stack; keep it out of the report
+    await async_client.get("/post/all")
+    response = await async_client.get("/post/all", params={"profile": "1"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "get_all_posts" in response.text
+
+
+# Test the report keeps the route's own functions
+@pytest.mark.skipif(Profiler is not None, reason="pyinstrument reports instead")
+@pytest.mark.anyio
+async def test_request_profile_route_functions():
+    """Test the route's functions are reported even when the top functions by
+    cumulative time (here just one) are all framework and middleware."""
+    profiler = RequestProfilerMiddleware(profiled_app, limit=1)
+    transport = ASGITransport(app=profiler)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/profiled", params={"profile": "1"})
+    top, route = response.text.split("restriction <1>", 1)[1].split("Ordered by", 1)
+    assert "profiled_endpoint" not in top
+    assert "(profiled_endpoint)" in route
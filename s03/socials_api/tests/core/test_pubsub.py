@@ -0,0 +1,85 @@
+import random
+
+import pytest
+from httpx import AsyncClient
+
+from socials_api.core.pubsub import CommentHub, comment_events, comment_hub
+from socials_api.tests.utils import created_comment_factory as _created_comment_factory
+from socials_api.tests.utils import created_post as _created_post
+
+# set fixture variables
+created_post = _created_post
+created_comment_factory = _created_comment_factory
+
+
+# Test CommentHub slow consumer eviction
+@pytest.mark.anyio
+async def test_comment_hub_evicts_slow_consumer():
+    """Test a full subscriber is evicted but still gets its buffered events."""
+    hub = CommentHub(buffer_size=2)
+    slow = hub.subscribe(1)
+    other_post = hub.subscribe(2)
+
+    assert [hub.publish(1, "created", {"id": i}) for i in range(3)] == [1, 1, 0]
+    assert slow.evicted and hub.subscriber_count(1) == 0
+    assert hub.subscriber_count(2) == 1
+    assert other_post.queue.empty()
+
+    assert (await slow.next())["data"] == {"id": 0}
+    assert (await slow.next())["data"] == {"id": 1}
+    assert await slow.next() is None
+
+
+# Test comment_events stream
+@pytest.mark.anyio
+async def test_comment_events():
+    """Test events render as SSE, idle streams get keepalives, post deletion ends it."""
+    hub = CommentHub()
+    stream = comment_events(hub, 1, keepalive=0.01)
+
+    assert await anext(stream) == b": connected\n\n"
+    assert hub.subscriber_count(1) == 1
+    assert await anext(stream) == b": keepalive\n\n"
+
+    hub.publish(1, "created", {"id": 1, "comment": "Test Comment", "post_id": 1})
+    assert await anext(stream) == (
+        b'event: created\ndata: {"id":1,"comment":"Test Comment","post_id":1}\n\n'
+    )
+
+    hub.publish(1, "post_deleted", {"post_id": 1})
+    assert await anext(stream) == b'event: post_deleted\ndata: {"post_id":1}\n\n'
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+    assert hub.subscriber_count() == 0
+
+
+# Test routes publish comment events
+@pytest.mark.anyio
+async def test_routes_publish_comment_events(
+    created_post, created_comment_factory, async_client: AsyncClient
+):
+    """Test creating, modifying and deleting comments publishes to the post's watchers."""
+    post_id = created_post["id"]
+    subscription = comment_hub.subscribe(post_id)
+    try:
+        comment = (await created_comment_factory(post_id, "Test Comment")).json()
+        await async_client.put(
+            f"/comment/{comment['id']}", params={"comment_body": "UPDATED"}
+        )
+        await async_client.delete(f"/comment/{comment['id']}")
+        await async_client.delete(f"/post/{post_id}")
+
+        events = [(await subscription.next(timeout=1))["event"] for _ in range(4)]
+        assert events == ["created", "updated", "deleted", "post_deleted"]
+    finally:
+        comment_hub.unsubscribe(subscription)
+
+
+# Test stream_comments_by_post_id with nonexistent post id
+@pytest.mark.anyio
+async def test_stream_comments_with_nonexistent_post_id(async_client: AsyncClient):
+    """Test stream_comments_by_post_id answers 404 for unknown posts."""
+    random_number = random.randint(10, 20)
+    response = await async_client.get(f"/comment/{random_number}/stream")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Post id not found."
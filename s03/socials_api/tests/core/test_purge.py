@@ -0,0 +1,66 @@
+import pytest
+from httpx import AsyncClient
+
+from socials_api.api.models.database import comment_db, db, post_db
+from socials_api.core.purge import TombstonePurger
+from socials_api.tests.utils import created_comment_factory as _created_comment_factory
+from socials_api.tests.utils import created_post_factory as _created_post_factory
+
+# set fixture variables
+created_post_factory = _created_post_factory
+created_comment_factory = _created_comment_factory
+
+
+async def count_rows(table) -> int:
+    """Count rows in table, soft-deleted ones included."""
+    return len(await db.fetch_all(table.select()))
+
+
+# Test purge after deleting a post with comments
+@pytest.mark.anyio
+async def test_purge_deleted_post(
+    created_post_factory, created_comment_factory, async_client: AsyncClient
+):
+    """Test a deleted post and its comments are hidden at once and purged in batches."""
+    post = await created_post_factory()
+    kept_post = await created_post_factory("Kept Post")
+    for i in range(5):
+        await created_comment_factory(post["id"], f"Test Comment {i + 1}")
+    await created_comment_factory(kept_post["id"], "Kept Comment")
+
+    response = await async_client.delete(f"/post/{post['id']}")
+    assert response.status_code == 200
+
+    # rows are still there, but no read returns them
+    assert await count_rows(post_db) == 2
+    assert await count_rows(comment_db) == 6
+    response = await async_client.get("/comment/all")
+    assert [comment["comment"] for comment in response.json()] == ["Kept Comment"]
+    response = await async_client.get(f"/comment/{post['id']}")
+    assert response.status_code == 404
+
+    purger = TombstonePurger(db, batch_size=2)
+    # 3 comment batches (2 + 2 + 1), the post, then its superseded insert change
+    assert [await purger.purge_once() for _ in range(6)] == [2, 2, 1, 1, 1, 0]
+    assert await count_rows(post_db) == 1
+    assert await count_rows(comment_db) == 1
+
+
+# Test purge after deleting single comments
+@pytest.mark.anyio
+async def test_purge_deleted_comments(
+    created_post_factory, created_comment_factory, async_client: AsyncClient
+):
+    """Test soft-deleted comments are purged while their post stays."""
+    post = await created_post_factory()
+    for i in range(3):
+        await created_comment_factory(post["id"], f"Test Comment {i + 1}")
+
+    response = await async_client.delete(f"/comment/post/{post['id']}")
+    assert response.status_code == 200
+    assert await count_rows(comment_db) == 3
+
+    # 3 comments, plus the 3 insert changes their deletes superseded
+    assert await TombstonePurger(db, batch_size=2).purge() == 6
+    assert await count_rows(comment_db) == 0
+    assert await count_rows(post_db) == 1
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.responses import PlainTextResponse
+
+from socials_api.core.rate_limit import (
+    AdmissionControlMiddleware,
+    TokenBucketLimiter,
+    route_key,
+)
+from socials_api.main import app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+# Test TokenBucketLimiter
+@pytest.mark.anyio
+async def test_token_bucket_limiter():
+    """Test burst, refusal with retry time, and refill."""
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(rate=2, burst=3, clock=clock)
+
+    assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("a") == pytest.approx(0.5)
+    assert limiter.acquire("b") == 0  # other keys have their own bucket
+
+    clock.now = 1.0  # two tokens back
+    assert limiter.acquire("a", cost=2) == 0
+    assert limiter.acquire("a") > 0
+
+
+# Test TokenBucketLimiter eviction
+@pytest.mark.anyio
+async def test_token_bucket_limiter_eviction():
+    """Test buckets are bounded by max_keys and dropped once idle and refilled."""
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(rate=1, burst=2, max_keys=3, clock=clock)
+    for key in "abcde":
+        limiter.acquire(key)
+    assert len(limiter) == 3
+
+    clock.now = 10.0
+    limiter.acquire("f")
+    assert len(limiter) == 1
+
+
+# Test route_key
+@pytest.mark.anyio
+async def test_route_key():
+    """Test numeric path segments share one route key."""
+    assert route_key("GET", "/comment/12") == "GET /comment/{id}"
+    assert route_key("GET", "/post/all/comments") == "GET /post/all/comments"
+
+
+# Test 429 from the rate limiter
+@pytest.mark.anyio
+async def test_admission_control_rate_limit():
+    """Test a client over its bucket gets 429 while the route stays usable."""
+    middleware = AdmissionControlMiddleware(
+        app, limiter=TokenBucketLimiter(rate=0.1, burst=2)
+    )
+    transport = ASGITransport(app=middleware)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/post/all")).status_code == 200
+        assert (await client.get("/post/all")).status_code == 200
+        response = await client.get("/post/all")
+        assert response.status_code == 429
+        assert response.json()["detail"] == "Too many requests."
+        assert response.headers["retry-after"] == "10"
+
+        # a different route has its own bucket
+        assert (await client.get("/comment/all")).status_code == 200
+
+
+# Test 503 from the concurrency cap
+@pytest.mark.anyio
+async def test_admission_control_concurrency_cap():
+    """Test requests beyond max_concurrency are shed with 503."""
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await PlainTextResponse("done")(scope, receive, send)
+
+    middleware = AdmissionControlMiddleware(slow_app, max_concurrency=1)
+    transport = ASGITransport(app=middleware)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = asyncio.create_task(client.get("/"))
+        await asyncio.sleep(0.01)
+        shed = await client.get("/")
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == "1"
+
+        release.set()
+        assert (await first).status_code == 200
+    assert middleware.in_flight == 0
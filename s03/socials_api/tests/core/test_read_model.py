@@ -0,0 +1,114 @@
+import pytest
+from httpx import AsyncClient
+
+from socials_api.api.models.database import db, document_db
+from socials_api.config import config
+from socials_api.core import read_model as read_model_module
+from socials_api.core.read_model import clear_documents, get_document
+from socials_api.tests.utils import created_comment_factory as _created_comment_factory
+from socials_api.tests.utils import created_post_factory as _created_post_factory
+
+# set fixture variables
+created_post_factory = _created_post_factory
+created_comment_factory = _created_comment_factory
+
+
+@pytest.fixture
+def read_model(monkeypatch):
+    """Turn on the read model for the test."""
+    monkeypatch.setattr(config, "READ_MODEL", True)
+
+
+async def full_and_comments(async_client: AsyncClient, post_id: int) -> tuple:
+    full = await async_client.get(f"/post/{post_id}/full")
+    comments = await async_client.get(f"/comment/{post_id}")
+    return full.json(), comments.json()
+
+
+# Test the read model follows every write
+@pytest.mark.anyio
+async def test_read_model_follows_writes(
+    read_model, created_post_factory, created_comment_factory, async_client
+):
+    """Test the documents served match the live rows after each kind of write."""
+    post = await created_post_factory("Post")
+    other = await created_post_factory("Other post")
+    post_id = post["id"]
+    first = (await created_comment_factory(post_id, "First")).json()
+    second = (await created_comment_factory(post_id, "Second")).json()
+    await created_comment_factory(other["id"], "Elsewhere")
+
+    full, comments = await full_and_comments(async_client, post_id)
+    assert full == {
+        "post": {"id": post_id, "body": "Post"},
+        "comments": [
+            {"id": first["id"], "comment": "First"},
+            {"id": second["id"], "comment": "Second"},
+        ],
+    }
+    assert comments == [first, second]
+
+    await async_client.put(f"/post/{post_id}", json={"body": "Edited"})
+    await async_client.put(f"/comment/{first['id']}", params={"comment_body": "1st"})
+    await async_client.delete(f"/comment/{second['id']}")
+    full, comments = await full_and_comments(async_client, post_id)
+    assert full == {
+        "post": {"id": post_id, "body": "Edited"},
+        "comments": [{"id": first["id"], "comment": "1st"}],
+    }
+    assert comments == [{**first, "comment": "1st"}]
+
+    await async_client.delete(f"/comment/post/{post_id}")
+    assert await full_and_comments(async_client, post_id) == (
+        {"post": {"id": post_id, "body": "Edited"}, "comments": []},
+        [],
+    )
+
+    await async_client.delete(f"/post/{post_id}")
+    response = await async_client.get(f"/post/{post_id}/full")
+    assert response.status_code == 404
+    assert await get_document(db, post_id) is None
+
+
+# Test reads of missing posts don't write
+@pytest.mark.anyio
+async def test_read_model_missing_post(read_model, monkeypatch, async_client):
+    """Test a 404 read neither opens a transaction nor deletes a document, so it
+    never takes the write lock."""
+
+    def no_writes(*args, **kwargs):
+        raise AssertionError("a read of a missing post wrote")
+
+    monkeypatch.setattr(db, "transaction", no_writes)
+    monkeypatch.setattr(read_model_module, "drop_document", no_writes)
+    assert (await async_client.get("/post/999999/full")).status_code == 404
+    assert (await async_client.get("/comment/999999")).status_code == 404
+
+
+# Test documents are built on first read
+@pytest.mark.anyio
+async def test_read_model_built_on_read(
+    monkeypatch, created_post_factory, created_comment_factory, async_client
+):
+    """Test posts written with the read model off get a document when first read,
+    and that the lifespan's clear_documents drops it again."""
+    post = await created_post_factory("Post")
+    comment = (await created_comment_factory(post["id"], "Comment")).json()
+    assert await db.fetch_all(document_db.select()) == []
+
+    # same response either way
+    off = await full_and_comments(async_client, post["id"])
+    monkeypatch.setattr(config, "READ_MODEL", True)
+    on = await full_and_comments(async_client, post["id"])
+    assert (
+        on
+        == off
+        == (
+            {"post": post, "comments": [{"id": comment["id"], "comment": "Comment"}]},
+            [comment],
+        )
+    )
+    assert len(await db.fetch_all(document_db.select())) == 1
+
+    await clear_documents(db)
+    assert await db.fetch_all(document_db.select()) == []
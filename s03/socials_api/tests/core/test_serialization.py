@@ -0,0 +1,44 @@
+import pytest
+from httpx import AsyncClient
+
+from socials_api.config import config
+from socials_api.core.serialization import dumps
+from socials_api.tests.utils import created_comment_factory as _created_comment_factory
+from socials_api.tests.utils import created_post_factory as _created_post_factory
+
+# set fixture variables
+created_post_factory = _created_post_factory
+created_comment_factory = _created_comment_factory
+
+
+# Test dumps
+@pytest.mark.anyio
+async def test_dumps():
+    """Test dumps encodes plain python data to compact JSON bytes."""
+    assert dumps([{"id": 1, "body": "Test Post"}]) == b'[{"id":1,"body":"Test Post"}]'
+
+
+# Test fast path matches the validated path on every list endpoint
+@pytest.mark.parametrize("url", ["/post/all", "/comment/all", "/post/all/comments"])
+@pytest.mark.anyio
+async def test_fast_serialization_matches_default(
+    created_post_factory,
+    created_comment_factory,
+    url: str,
+    monkeypatch,
+    async_client: AsyncClient,
+):
+    """Test list endpoints return the same payload with FAST_SERIALIZATION on."""
+    for i in range(2):
+        post = await created_post_factory(f"Test Post {i + 1}")
+        await created_comment_factory(post["id"], f"Test Comment {i + 1}")
+
+    monkeypatch.setattr(config, "FAST_SERIALIZATION", False)
+    default_response = await async_client.get(url)
+
+    monkeypatch.setattr(config, "FAST_SERIALIZATION", True)
+    fast_response = await async_client.get(url)
+
+    assert fast_response.status_code == 200
+    assert fast_response.headers["content-type"] == "application/json"
+    assert fast_response.json() == default_response.json()
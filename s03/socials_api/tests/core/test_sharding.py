@@ -0,0 +1,121 @@
+import databases
+import pytest
+import sqlalchemy
+from httpx import AsyncClient
+
+from socials_api.api.models.database import comment_db, post_db
+from socials_api.api.models.migrations import migrate
+from socials_api.api.routes import user_comments, user_posts
+from socials_api.core.ids import IdGenerator
+from socials_api.core.sharding import Shards
+
+
+@pytest.fixture
+async def sharded(tmp_path, monkeypatch):
+    """Three migrated sqlite shards, used by the post and comment routes."""
+    urls = [f"sqlite:///{tmp_path / f'shard{i}.db'}" for i in range(3)]
+    for url in urls:
+        engine = sqlalchemy.create_engine(url)
+        migrate(engine)
+        engine.dispose()
+
+    shards = Shards([databases.Database(url) for url in urls])
+    await shards.connect()
+    monkeypatch.setattr(user_posts, "shards", shards)
+    monkeypatch.setattr(user_comments, "shards", shards)
+    yield shards
+    await shards.disconnect()
+
+
+async def ids_in(database: databases.Database, table) -> list[int]:
+    return [row.id for row in await database.fetch_all(table.select())]
+
+
+# Test Shards routing
+@pytest.mark.anyio
+async def test_index_for():
+    """Test ids map to shards by residue, and one shard takes every id."""
+    shards = Shards([None, None, None])
+    assert [shards.index_for(id) for id in range(1, 8)] == [0, 1, 2, 0, 1, 2, 0]
+    assert Shards([None]).index_for(42) == 0
+
+
+# Test posts and comments are spread over shards
+@pytest.mark.anyio
+async def test_sharded_writes(sharded, async_client: AsyncClient):
+    """Test new posts go round the shards and comments follow their post."""
+    for i in range(4):
+        response = await async_client.post("/post", json={"body": f"Post {i + 1}"})
+        assert response.status_code == 201
+    assert [await ids_in(db, post_db) for db in sharded.databases] == [[1, 4], [2], [3]]
+
+    for post_id in (2, 2, 4):
+        response = await async_client.post(
+            "/comment", json={"post_id": post_id, "comment": "Comment"}
+        )
+        assert response.status_code == 201
+    # comment ids come from the post's shard, so they route like post ids
+    assert [await ids_in(db, comment_db) for db in sharded.databases] == [
+        [1],
+        [2, 5],
+        [],
+    ]
+
+    response = await async_client.get("/post/4")
+    assert response.json() == {"id": 4, "body": "Post 4"}
+    response = await async_client.get("/comment/2")
+    assert [comment["id"] for comment in response.json()] == [2, 5]
+    response = await async_client.put("/comment/5", params={"comment_body": "Edited"})
+    assert response.json() == {
+        "id": 5,
+        "comment": "Edited",
+        "post_id": 2,
+        "parent_id": None,
+    }
+
+
+# Test scatter-gather list endpoints
+@pytest.mark.anyio
+async def test_sharded_reads(sharded, async_client: AsyncClient):
+    """Test list endpoints merge every shard in id order, page by page."""
+    for i in range(5):
+        await async_client.post("/post", json={"body": f"Post {i + 1}"})
+    await async_client.post("/comment", json={"post_id": 3, "comment": "Comment"})
+
+    response = await async_client.get("/post/all")
+    assert [post["id"] for post in response.json()] == [1, 2, 3, 4, 5]
+
+    response = await async_client.get("/post/all", params={"after_id": 1, "limit": 3})
+    assert [post["id"] for post in response.json()] == [2, 3, 4]
+
+    response = await async_client.get("/post/all/comments")
+    result = response.json()
+    assert [item["post"]["id"] for item in result] == [1, 2, 3, 4, 5]
+    assert result[2]["comments"] == [{"id": 3, "comment": "Comment"}]
+
+    response = await async_client.get("/comment/all")
+    assert [comment["post_id"] for comment in response.json()] == [3]
+
+
+# Test snowflake ids across shards
+@pytest.mark.anyio
+async def test_sharded_snowflake_ids(sharded, async_client: AsyncClient):
+    """Test generated ids land in the right shard and sort by creation."""
+    sharded.ids = IdGenerator(worker_id=5)
+    post_ids = []
+    for i in range(4):
+        response = await async_client.post("/post", json={"body": f"Post {i + 1}"})
+        post_ids.append(response.json()["id"])
+    assert post_ids == sorted(post_ids)
+    assert post_ids[0] > 2**40
+
+    response = await async_client.post(
+        "/comment", json={"post_id": post_ids[1], "comment": "Comment"}
+    )
+    comment_id = response.json()["id"]
+    assert sharded.index_for(comment_id) == sharded.index_for(post_ids[1])
+
+    response = await async_client.get("/post/all")
+    assert [post["id"] for post in response.json()] == post_ids
+    response = await async_client.get(f"/post/{post_ids[3]}")
+    assert response.json()["body"] == "Post 4"
@@ -0,0 +1,107 @@
+import pytest
+from httpx import AsyncClient
+
+from socials_api.api.models.database import comment_db, db
+from socials_api.core.threads import segment, select_threads, subtree_end
+from socials_api.tests.utils import created_post_factory as _created_post_factory
+
+# set fixture variables
+created_post_factory = _created_post_factory
+
+
+async def reply(
+    async_client: AsyncClient, post_id: int, body: str, parent_id=None
+) -> dict:
+    response = await async_client.post(
+        "/comment", json={"post_id": post_id, "comment": body, "parent_id": parent_id}
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def shape(nodes: list[dict]) -> list:
+    """Threads as nested (comment, [replies]) pairs."""
+    return [(node["comment"], shape(node["replies"])) for node in nodes]
+
+
+# Test paths order comments depth-first
+@pytest.mark.anyio
+async def test_paths():
+    """Test segments sort by id and subtree bounds contain exactly the replies."""
+    parent = segment(10)
+    child = parent + segment(11)
+    assert segment(9) < parent < child < subtree_end(parent) < segment(11)
+    assert segment(2**63 - 1) == "7fffffffffffffff."
+
+
+# Test a post's threads
+@pytest.mark.anyio
+async def test_comment_threads(created_post_factory, async_client: AsyncClient):
+    """Test replies nest under their parents, with depth limits and pages of
+    top-level comments, in one query per page."""
+    post_id = (await created_post_factory())["id"]
+    first = await reply(async_client, post_id, "first")
+    answer = await reply(async_client, post_id, "answer", first["id"])
+    await reply(async_client, post_id, "deeper", answer["id"])
+    await reply(async_client, post_id, "second answer", first["id"])
+    second = await reply(async_client, post_id, "second")
+    assert answer["parent_id"] == first["id"]
+
+    response = await async_client.get(f"/comment/{post_id}/threads")
+    assert response.status_code == 200
+    assert shape(response.json()) == [
+        ("first", [("answer", [("deeper", [])]), ("second answer", [])]),
+        ("second", []),
+    ]
+    assert response.json()[0]["replies"][0]["replies"][0]["depth"] == 2
+
+    response = await async_client.get(
+        f"/comment/{post_id}/threads", params={"max_depth": 0}
+    )
+    assert shape(response.json()) == [("first", []), ("second", [])]
+
+    response = await async_client.get(
+        f"/comment/{post_id}/threads", params={"limit": 1}
+    )
+    assert [node["comment"] for node in response.json()] == ["first"]
+    assert len(response.json()[0]["replies"]) == 2
+    response = await async_client.get(
+        f"/comment/{post_id}/threads", params={"limit": 1, "after_id": first["id"]}
+    )
+    assert shape(response.json()) == [("second", [])]
+    assert second["id"] == response.json()[0]["id"]
+
+    # the flat listing has every reply too
+    response = await async_client.get(f"/comment/{post_id}")
+    assert len(response.json()) == 5
+
+    # one statement, no recursion
+    assert "WITH RECURSIVE" not in str(select_threads(post_id, limit=1, max_depth=5))
+
+
+# Test replies are checked and deleted with their parent
+@pytest.mark.anyio
+async def test_reply_rules(created_post_factory, async_client: AsyncClient):
+    """Test replies must be to a comment on the same post, and deleting a comment
+    deletes its replies."""
+    post_id = (await created_post_factory())["id"]
+    other_id = (await created_post_factory())["id"]
+    parent = await reply(async_client, post_id, "parent")
+    child = await reply(async_client, post_id, "child", parent["id"])
+    sibling = await reply(async_client, post_id, "sibling")
+
+    response = await async_client.post(
+        "/comment",
+        json={"post_id": other_id, "comment": "wrong post", "parent_id": parent["id"]},
+    )
+    assert response.status_code == 400
+
+    response = await async_client.delete(f"/comment/{parent['id']}")
+    assert response.status_code == 200
+    deleted = await db.fetch_all(
+        comment_db.select().where(comment_db.c.deleted_at.is_not(None))
+    )
+    assert {row.id for row in deleted} == {parent["id"], child["id"]}
+
+    response = await async_client.get(f"/comment/{post_id}/threads")
+    assert [node["id"] for node in response.json()] == [sibling["id"]]
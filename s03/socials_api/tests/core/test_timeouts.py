@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from socials_api.api.models.database import InstrumentedDatabase, db
+from socials_api.core.sharding import Shards
+from socials_api.core.timeouts import RequestTimeoutMiddleware
+
+# counts to a billion: minutes of work unless it's interrupted
+LONG_QUERY = """
+WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 1000000000)
+SELECT count(*) FROM n
+"""
+
+slow_app = FastAPI()
+# set by the test that queries them
+slow_shards = Shards([db])
+
+
+@slow_app.get("/query")
+async def long_query():
+    return {"count": await db.fetch_val(LONG_QUERY)}
+
+
+@slow_app.get("/shards/query")
+async def long_shard_queries():
+    # each query runs in a task of its own, on a connection of its own
+    return {
+        "counts": await slow_shards.gather(lambda shard: shard.fetch_val(LONG_QUERY))
+    }
+
+
+@slow_app.get("/sleep/{seconds}")
+async def sleep(seconds: float):
+    await asyncio.sleep(seconds)
+    return {"slept": seconds}
+
+
+def timed_client(**kwargs) -> AsyncClient:
+    middleware = RequestTimeoutMiddleware(slow_app, **kwargs)
+    return AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test")
+
+
+# Test a long statement is interrupted
+@pytest.mark.anyio
+async def test_request_timeout_interrupts_query():
+    """Test a request over its budget gets 504 and its SQLite statement is
+    interrupted, leaving the connection free for the next query."""
+    async with timed_client(default=0.2) as client:
+        start = time.perf_counter()
+        response = await client.get("/query")
+        assert response.status_code == 504
+        assert response.json()["detail"] == "Request took too long."
+        assert time.perf_counter() - start < 5
+
+    # the statement would still hold the connection if it were only cancelled
+    assert await asyncio.wait_for(db.fetch_val("SELECT 1"), timeout=2) == 1
+
+
+# Test the statements of gathered tasks are interrupted
+@pytest.mark.anyio
+async def test_request_timeout_interrupts_gathered_queries(tmp_path, monkeypatch):
+    """Test a timed out scatter-gather interrupts the statement of every shard,
+    each on its own task's connection (no force_rollback to share one)."""
+    databases = [
+        InstrumentedDatabase(f"sqlite:///{tmp_path / f'shard{i}.db'}") for i in range(2)
+    ]
+    monkeypatch.setattr(slow_shards, "databases", databases)
+    await slow_shards.connect()
+    try:
+        async with timed_client(default=0.2) as client:
+            start = time.perf_counter()
+            response = await client.get("/shards/query")
+            assert response.status_code == 504
+            # a cancelled task waits for its statement before closing its connection
+            assert time.perf_counter() - start < 5
+
+        for database in databases:
+            assert await asyncio.wait_for(database.fetch_val("SELECT 1"), 2) == 1
+    finally:
+        await slow_shards.disconnect()
+
+
+# Test per-route budgets
+@pytest.mark.anyio
+async def test_request_timeout_budgets():
+    """Test route budgets override the default, and 0 turns the limit off."""
+    async with timed_client(
+        default=0.1, budgets={"GET /sleep/{id}": 0.0, "GET /sleep/0.3": 1.0}
+    ) as client:
+        assert (await client.get("/sleep/0")).status_code == 200
+        assert (await client.get("/sleep/0.3")).status_code == 200
+        assert (await client.get("/sleep/0.2")).status_code == 504
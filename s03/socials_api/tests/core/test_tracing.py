@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+# opentelemetry comes with the optional `tracing` extra
+pytest.importorskip("opentelemetry.sdk")
+
+from httpx import ASGITransport, AsyncClient
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from socials_api.core.tracing import (
+    OTLPJsonFileExporter,
+    Tracing,
+    TracingMiddleware,
+)
+from socials_api.main import app
+from socials_api.tests.utils import created_post as _created_post
+
+# set fixture variables
+created_post = _created_post
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+def traced_client(sample_rate: float) -> tuple[AsyncClient, InMemorySpanExporter]:
+    exporter = InMemorySpanExporter()
+    tracing = Tracing(sample_rate=sample_rate, processor=SimpleSpanProcessor(exporter))
+    transport = ASGITransport(app=TracingMiddleware(app, tracing.tracer))
+    return AsyncClient(transport=transport, base_url="http://test"), exporter
+
+
+# Test the spans of a request
+@pytest.mark.anyio
+async def test_request_spans(created_post):
+    """Test a traced request has a server span with the route, and under it the
+    validation, endpoint and serialization phases, with the endpoint's db
+    statements nested in the endpoint span."""
+    client, exporter = traced_client(sample_rate=1.0)
+    async with client:
+        response = await client.delete(f"/post/{created_post['id']}")
+    assert response.status_code == 200
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    request = spans["DELETE /post/{id}"]
+    assert request.attributes["http.route"] == "/post/{id}"
+    assert request.attributes["http.response.status_code"] == 200
+    assert {"validate", "delete_post_by_id", "serialize"} <= spans.keys()
+    for name in ("validate", "delete_post_by_id", "serialize"):
+        assert spans[name].parent.span_id == request.context.span_id
+    assert spans["validate"].end_time <= spans["delete_post_by_id"].start_time
+    assert spans["delete_post_by_id"].end_time <= spans["serialize"].start_time
+
+    endpoint = spans["delete_post_by_id"]
+    statements = [s for s in exporter.get_finished_spans() if s.name.startswith("db ")]
+    assert len(statements) >= 3  # select, soft delete, change log
+    assert all(s.parent.span_id == endpoint.context.span_id for s in statements)
+    assert all(s.attributes["db.system.name"] == "sqlite" for s in statements)
+    assert "UPDATE posts" in " ".join(s.attributes["db.query.text"] for s in statements)
+    assert len({s.context.trace_id for s in exporter.get_finished_spans()}) == 1
+
+
+# Test sampling
+@pytest.mark.anyio
+async def test_request_sampling():
+    """Test unsampled requests make no spans, unless the caller's trace is sampled,
+    which the request then continues."""
+    client, exporter = traced_client(sample_rate=0.0)
+    async with client:
+        await client.get("/post/all")
+        assert exporter.get_finished_spans() == ()
+
+        await client.get(
+            "/post/all", headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"}
+        )
+    spans = exporter.get_finished_spans()
+    assert "GET /post/all" in [span.name for span in spans]
+    assert {format(span.context.trace_id, "032x") for span in spans} == {TRACE_ID}
+
+
+# Test the OTLP JSON file exporter
+@pytest.mark.anyio
+async def test_otlp_json_file_exporter(tmp_path):
+    """Test spans are written as OTLP JSON export requests, one per line, with
+    hex ids."""
+    path = tmp_path / "traces.jsonl"
+    tracing = Tracing(processor=SimpleSpanProcessor(OTLPJsonFileExporter(str(path))))
+    with (
+        tracing.tracer.start_as_current_span("outer"),
+        tracing.tracer.start_as_current_span("inner"),
+    ):
+        pass
+    tracing.shutdown()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    spans = [
+        span
+        for line in lines
+        for resource_spans in line["resourceSpans"]
+        for scope_spans in resource_spans["scopeSpans"]
+        for span in scope_spans["spans"]
+    ]
+    inner, outer = spans
+    assert (inner["name"], outer["name"]) == ("inner", "outer")
+    assert inner["parentSpanId"] == outer["spanId"]
+    assert len(inner["traceId"]) == 32
+    int(inner["traceId"], 16)
+    service = lines[0]["resourceSpans"][0]["resource"]["attributes"]
+    assert {"key": "service.name", "value": {"stringValue": "socials_api"}} in service
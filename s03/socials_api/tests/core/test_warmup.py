@@ -0,0 +1,20 @@
+import pytest
+
+from socials_api.api.models.database import db
+from socials_api.core.warmup import warm_up
+from socials_api.tests.utils import created_comment_factory as _created_comment_factory
+from socials_api.tests.utils import created_post_factory as _created_post_factory
+
+# set fixture variables
+created_post_factory = _created_post_factory
+created_comment_factory = _created_comment_factory
+
+
+# Test warm_up on an empty and a populated db
+@pytest.mark.anyio
+async def test_warm_up(created_post_factory, created_comment_factory):
+    """Test warm_up runs its reads whether or not there are rows."""
+    await warm_up(db)
+    post = await created_post_factory()
+    await created_comment_factory(post["id"])
+    await warm_up(db)
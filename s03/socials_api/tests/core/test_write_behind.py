@@ -0,0 +1,135 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from socials_api.api.models.database import comment_db, db
+from socials_api.api.routes import user_comments
+from socials_api.config import config
+from socials_api.core import write_behind as write_behind_module
+from socials_api.core.write_behind import CommentQueueFull, CommentWriteQueue
+from socials_api.tests.utils import created_post as _created_post
+
+# set fixture variables
+created_post = _created_post
+
+
+@pytest.fixture
+def write_behind(monkeypatch):
+    """Turn on write-behind mode with a small, fresh queue for the test."""
+    queue = CommentWriteQueue(db, maxsize=2, batch_size=10, flush_interval=0)
+    monkeypatch.setattr(config, "COMMENT_WRITE_BEHIND", True)
+    monkeypatch.setattr(user_comments, "comment_queue", queue)
+    return queue
+
+
+# Test post_comments in write-behind mode
+@pytest.mark.anyio
+async def test_post_comments_write_behind(
+    created_post, write_behind: CommentWriteQueue, async_client: AsyncClient
+):
+    """Test queued comments are accepted with 202 and flushed on stop."""
+    await write_behind.start()
+    post_id = created_post["id"]
+
+    response = await async_client.post(
+        "/comment", json={"post_id": post_id, "comment": "Test Comment"}
+    )
+    assert response.status_code == 202
+    assert response.json()["reservation_id"]
+    assert {"comment": "Test Comment", "post_id": post_id}.items() <= (
+        response.json().items()
+    )
+
+    reservation_id = response.json()["reservation_id"]
+    await write_behind.stop()
+    q = comment_db.select().where(comment_db.c.post_id == post_id)
+    comments = await db.fetch_all(q)
+    assert [comment.comment for comment in comments] == ["Test Comment"]
+
+    # the reservation resolves to the stored comment
+    response = await async_client.get(f"/comment/reservation/{reservation_id}")
+    assert response.status_code == 200
+    assert response.json()["comment_id"] == comments[0].id
+    response = await async_client.get("/comment/reservation/unknown")
+    assert response.status_code == 404
+
+
+# Test post_comments backpressure when the queue is full
+@pytest.mark.anyio
+async def test_post_comments_write_behind_queue_full(
+    created_post, write_behind: CommentWriteQueue, async_client: AsyncClient
+):
+    """Test a full queue answers 503 and queued comments still flush on stop."""
+    post_id = created_post["id"]
+    # flusher not started, so the queue fills up after maxsize comments
+    for _ in range(2):
+        response = await async_client.post(
+            "/comment", json={"post_id": post_id, "comment": "Test Comment"}
+        )
+        assert response.status_code == 202
+
+    response = await async_client.post(
+        "/comment", json={"post_id": post_id, "comment": "Test Comment"}
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+    await write_behind.stop()
+    q = comment_db.select().where(comment_db.c.post_id == post_id)
+    assert len(await db.fetch_all(q)) == 2
+
+    # a stopped queue rejects new comments
+    with pytest.raises(CommentQueueFull):
+        write_behind.submit("Test Comment", post_id)
+
+
+# Test failed batches are retried, then split and dead-lettered
+@pytest.mark.anyio
+async def test_write_behind_failures(created_post, monkeypatch, tmp_path):
+    """Test a transient failure is retried, and a comment that keeps failing goes to
+    the dead-letter file without taking the rest of its batch with it."""
+    dead_letters = tmp_path / "dead.ndjson"
+    queue = CommentWriteQueue(
+        db,
+        batch_size=10,
+        max_retries=1,
+        retry_backoff=0,
+        dead_letter_file=str(dead_letters),
+    )
+    insert_comment = write_behind_module.insert_comment
+    calls = []
+
+    async def flaky_insert(shards, index, values):
+        calls.append(values["comment"])
+        if values["comment"] == "bad" or len(calls) == 1:
+            raise RuntimeError("disk I/O error")
+        return await insert_comment(shards, index, values)
+
+    monkeypatch.setattr(write_behind_module, "insert_comment", flaky_insert)
+    post_id = created_post["id"]
+
+    # fails once, then goes through on the retry
+    queue.submit("transient", post_id)
+    await queue.stop()
+    assert calls == ["transient", "transient"]
+
+    queue = CommentWriteQueue(
+        db,
+        batch_size=10,
+        max_retries=1,
+        retry_backoff=0,
+        dead_letter_file=str(dead_letters),
+    )
+    queue.submit("good", post_id)
+    bad_reservation = queue.submit("bad", post_id)
+    queue.submit("also good", post_id)
+    await queue.stop()
+
+    q = comment_db.select().where(comment_db.c.post_id == post_id)
+    stored = [comment.comment for comment in await db.fetch_all(q)]
+    assert stored == ["transient", "good", "also good"]
+    (line,) = dead_letters.read_text().splitlines()
+    assert json.loads(line)["reservation_id"] == bad_reservation
+    assert json.loads(line)["comment"] == "bad"
+    assert queue.dead_lettered == 1
@@ -0,0 +1,65 @@
+import sqlite3
+import time
+
+import pytest
+import sqlalchemy
+from sqlalchemy import text
+
+from socials_api.api.models.migrations import MIGRATIONS, current_version, migrate
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Engine on a fresh, empty sqlite file."""
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+# Test migrate on an empty db
+@pytest.mark.anyio
+async def test_migrate(engine):
+    """Test migrate applies every migration once and records the version."""
+    assert migrate(engine) == sorted(MIGRATIONS)
+    assert migrate(engine) == []  # already up to date
+
+    with engine.begin() as conn:
+        assert current_version(conn) == max(MIGRATIONS)
+        indexes = conn.execute(text("PRAGMA index_list(comments)")).fetchall()
+    assert "ix_comments_post_id" in {index.name for index in indexes}
+
+
+# Test migrate with a target version
+@pytest.mark.anyio
+async def test_migrate_with_target(engine):
+    """Test migrate stops at target and resumes from there."""
+    assert migrate(engine, target=1) == [1]
+    assert migrate(engine) == sorted(MIGRATIONS)[1:]
+
+
+# Test migrate on a large, already populated db
+@pytest.mark.anyio
+async def test_migrate_seeded_million_rows(engine, tmp_path):
+    """Test pending migrations apply to a db with a million comments in bounded time."""
+    migrate(engine, target=1)
+
+    conn = sqlite3.connect(tmp_path / "migrations.db")
+    with conn:
+        conn.executemany(
+            "INSERT INTO posts (id, body) VALUES (?, ?)",
+            ((i, f"Post {i}") for i in range(1, 1001)),
+        )
+        conn.executemany(
+            "INSERT INTO comments (comment, post_id) VALUES (?, ?)",
+            ((f"Comment {i}", i % 1000 + 1) for i in range(1_000_000)),
+        )
+    conn.close()
+
+    start = time.perf_counter()
+    applied = migrate(engine)
+    elapsed = time.perf_counter() - start
+
+    assert applied == sorted(MIGRATIONS)[1:]
+    assert elapsed < 30
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM comments")).scalar() == 1_000_000
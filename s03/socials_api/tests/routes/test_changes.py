@@ -0,0 +1,85 @@
+import pytest
+from httpx import AsyncClient
+
+from socials_api.api.models.database import db
+from socials_api.core.changes import compact_changes
+from socials_api.tests.utils import created_comment_factory as _created_comment_factory
+from socials_api.tests.utils import created_post as _created_post
+
+# set fixture variables
+created_post = _created_post
+created_comment_factory = _created_comment_factory
+
+
+def ops(page: dict) -> list[tuple[str, str]]:
+    return [(change["table_name"], change["op"]) for change in page["changes"]]
+
+
+# Test get_changes
+@pytest.mark.anyio
+async def test_get_changes(
+    created_post, created_comment_factory, async_client: AsyncClient
+):
+    """Test every write shows up in the change feed, in order, and paging by since."""
+    post_id = created_post["id"]
+    comment = (await created_comment_factory(post_id)).json()
+    await async_client.put(f"/post/{post_id}", json={"body": "Updated Post"})
+    await async_client.put(
+        f"/comment/{comment['id']}", params={"comment_body": "Updated Comment"}
+    )
+    await async_client.delete(f"/comment/{comment['id']}")
+    await async_client.delete(f"/post/{post_id}")
+
+    response = await async_client.get("/changes")
+    assert response.status_code == 200
+    page = response.json()
+    assert ops(page) == [
+        ("posts", "insert"),
+        ("comments", "insert"),
+        ("posts", "update"),
+        ("comments", "update"),
+        ("comments", "delete"),
+        ("posts", "delete"),
+    ]
+    seqs = [change["seq"] for change in page["changes"]]
+    assert seqs == sorted(seqs) and page["next_since"] == seqs[-1]
+
+    # pull only what's new since the 4th change
+    response = await async_client.get("/changes", params={"since": seqs[3], "limit": 1})
+    assert ops(response.json()) == [("comments", "delete")]
+    assert response.json()["next_since"] == seqs[4]
+
+    # nothing new: next_since stays put
+    response = await async_client.get("/changes", params={"since": seqs[-1]})
+    assert response.json() == {"changes": [], "next_since": seqs[-1]}
+
+
+# Test delete_comments_by_post_id logs every comment
+@pytest.mark.anyio
+async def test_get_changes_after_deleting_post_comments(
+    created_post, created_comment_factory, async_client: AsyncClient
+):
+    """Test deleting all comments on a post logs one delete per comment."""
+    post_id = created_post["id"]
+    for i in range(3):
+        await created_comment_factory(post_id, f"Test Comment {i + 1}")
+    await async_client.delete(f"/comment/post/{post_id}")
+
+    page = (await async_client.get("/changes")).json()
+    assert ops(page)[-3:] == [("comments", "delete")] * 3
+
+
+# Test compact_changes
+@pytest.mark.anyio
+async def test_compact_changes(created_post, async_client: AsyncClient):
+    """Test compaction keeps only the latest entry per row."""
+    post_id = created_post["id"]
+    for i in range(3):
+        await async_client.put(f"/post/{post_id}", json={"body": f"Update {i + 1}"})
+
+    assert await compact_changes(db, batch_size=2) == 2
+    assert await compact_changes(db, batch_size=2) == 1
+    assert await compact_changes(db, batch_size=2) == 0
+
+    page = (await async_client.get("/changes")).json()
+    assert ops(page) == [("posts", "update")]
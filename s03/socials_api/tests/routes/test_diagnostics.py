@@ -0,0 +1,49 @@
+import pytest
+from httpx import AsyncClient
+
+from socials_api.config import config
+
+
+# Test Get Loop Stats
+@pytest.mark.anyio
+async def test_get_loop_stats(monkeypatch, async_client: AsyncClient):
+    """Test loop stats need the admin token and are served with the full
+    histogram."""
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    response = await async_client.get("/diagnostics/loop")
+    assert response.status_code == 403
+
+    response = await async_client.get(
+        "/diagnostics/loop", headers={"X-Admin-Token": "secret"}
+    )
+    assert response.status_code == 200
+    stats = response.json()
+    assert len(stats["histogram"]) == 12
+    assert stats["histogram"][-1]["le_ms"] is None
+
+
+# Test Profile the Worker
+@pytest.mark.anyio
+async def test_profile_worker(monkeypatch, async_client: AsyncClient):
+    """Test the profiler is hidden when disabled and needs the admin token."""
+    monkeypatch.setattr(config, "PROFILER_ENABLED", False)
+    response = await async_client.get("/diagnostics/profile")
+    assert response.status_code == 404
+
+    monkeypatch.setattr(config, "PROFILER_ENABLED", True)
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    response = await async_client.get(
+        "/diagnostics/profile", headers={"X-Admin-Token": "wrong"}
+    )
+    assert response.status_code == 403
+
+    response = await async_client.get(
+        "/diagnostics/profile",
+        params={"seconds": 0.05},
+        headers={"X-Admin-Token": "secret"},
+    )
+    assert response.status_code == 200
+    # every line is "<frames> <count>", event loop thread included
+    lines = response.text.splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(line.startswith("MainThread;") for line in lines)
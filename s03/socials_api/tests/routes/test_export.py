@@ -0,0 +1,164 @@
+import csv
+import gzip
+import io
+import json
+
+import databases
+import pytest
+import sqlalchemy
+from httpx import AsyncClient
+
+from socials_api.api.models.migrations import migrate
+from socials_api.api.routes import user_comments, user_posts
+from socials_api.config import config
+from socials_api.core import export
+from socials_api.core.sharding import Shards
+from socials_api.tests.utils import created_comment_factory as _created_comment_factory
+from socials_api.tests.utils import created_post_factory as _created_post_factory
+
+# set fixture variables
+created_post_factory = _created_post_factory
+created_comment_factory = _created_comment_factory
+
+
+@pytest.fixture
+async def created_posts(created_post_factory, created_comment_factory) -> list[dict]:
+    """Three posts: two comments on the first, none on the others."""
+    posts = [await created_post_factory(f"Test Post {i + 1}") for i in range(3)]
+    for i in range(2):
+        await created_comment_factory(posts[0]["id"], f"Test Comment {i + 1}")
+    return posts
+
+
+# Test export_posts_with_comments as NDJSON
+@pytest.mark.anyio
+async def test_export_ndjson(created_posts, async_client: AsyncClient):
+    """Test the NDJSON export matches /post/all/comments, one post per line."""
+    response = await async_client.get("/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    expected = (await async_client.get("/post/all/comments")).json()
+    assert lines == expected
+
+    # resume after the first post
+    response = await async_client.get(
+        "/export", params={"after_id": created_posts[0]["id"]}
+    )
+    assert [json.loads(line) for line in response.text.splitlines()] == expected[1:]
+
+
+# Test export_posts_with_comments as gzipped CSV
+@pytest.mark.anyio
+async def test_export_csv_gzip(created_posts, async_client: AsyncClient):
+    """Test the gzipped CSV export has one row per comment (or per bare post)."""
+    response = await async_client.get("/export", params={"format": "csv", "gzip": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+
+    rows = list(csv.reader(io.StringIO(gzip.decompress(response.content).decode())))
+    assert rows[0] == list(export.CSV_HEADER)
+    post_ids = [str(post["id"]) for post in created_posts]
+    assert [(row[0], row[3]) for row in rows[1:]] == [
+        (post_ids[0], "Test Comment 1"),
+        (post_ids[0], "Test Comment 2"),
+        (post_ids[1], ""),
+        (post_ids[2], ""),
+    ]
+
+
+# Test a thread bigger than a chunk
+@pytest.mark.anyio
+async def test_export_large_thread(created_posts, monkeypatch, async_client):
+    """Test chunks are bounded by rows, not posts: a post's comments go on across
+    chunks and its NDJSON line still comes out whole."""
+    chunks = []
+    original_iter_row_chunks = export.iter_row_chunks
+
+    async def recorded(*args, **kwargs):
+        async for chunk in original_iter_row_chunks(*args, **kwargs):
+            chunks.append(len(chunk))
+            yield chunk
+
+    monkeypatch.setattr(export, "iter_row_chunks", recorded)
+    for format in ("ndjson", "csv"):
+        monkeypatch.setattr(config, "EXPORT_CHUNK_SIZE", 1000)
+        whole = (await async_client.get("/export", params={"format": format})).text
+        monkeypatch.setattr(config, "EXPORT_CHUNK_SIZE", 1)
+        chunks.clear()
+        assert (
+            await async_client.get("/export", params={"format": format})
+        ).text == whole
+        assert chunks == [1, 1, 1, 1]  # two comments, two bare posts
+
+
+# Test export_to_file with resume
+@pytest.mark.anyio
+async def test_export_to_file_resume(created_posts, tmp_path, monkeypatch):
+    """Test a cut-off gzip export resumes into one valid file without duplicates,
+    from the end of the last complete post."""
+    path = str(tmp_path / "posts.ndjson.gz")
+    original_export_stream = export.export_stream
+
+    async def crash_after_first_post(*args, **kwargs):
+        async for data, last_id in original_export_stream(*args, **kwargs):
+            yield data, last_id
+            if last_id is not None:
+                raise RuntimeError("crash")
+
+    monkeypatch.setattr(export, "export_stream", crash_after_first_post)
+    with pytest.raises(RuntimeError):
+        await export.export_to_file(path, compress=True, chunk_size=1)
+    with open(f"{path}.progress") as progress:
+        assert progress.read().split()[:2] == ["0", str(created_posts[0]["id"])]
+
+    monkeypatch.setattr(export, "export_stream", original_export_stream)
+    last_id = await export.export_to_file(
+        path, compress=True, resume=True, chunk_size=1
+    )
+    assert last_id == created_posts[-1]["id"]
+
+    with gzip.open(path) as dump:
+        ids = [json.loads(line)["post"]["id"] for line in dump]
+    assert ids == [post["id"] for post in created_posts]
+
+
+@pytest.fixture
+async def sharded(tmp_path, monkeypatch):
+    """Two migrated sqlite shards, used by the routes and the export."""
+    urls = [f"sqlite:///{tmp_path / f'shard{i}.db'}" for i in range(2)]
+    for url in urls:
+        engine = sqlalchemy.create_engine(url)
+        migrate(engine)
+        engine.dispose()
+
+    shards = Shards([databases.Database(url) for url in urls])
+    await shards.connect()
+    for module in (user_posts, user_comments, export):
+        monkeypatch.setattr(module, "shards", shards)
+    yield shards
+    await shards.disconnect()
+
+
+# Test export_to_file over several shards
+@pytest.mark.anyio
+async def test_export_to_file_shards(sharded, tmp_path, async_client: AsyncClient):
+    """Test the file export holds every shard, each in post id order, with one
+    CSV header."""
+    for i in range(3):
+        await async_client.post("/post", json={"body": f"Post {i + 1}"})
+    await async_client.post("/comment", json={"post_id": 2, "comment": "Comment"})
+
+    path = str(tmp_path / "posts.csv")
+    assert await export.export_to_file(path, format="csv", chunk_size=1) == 2
+    with open(path) as dump:
+        rows = list(csv.reader(dump))
+    assert rows[0] == list(export.CSV_HEADER)
+    assert [(row[0], row[3]) for row in rows[1:]] == [
+        ("1", ""),
+        ("3", ""),
+        ("2", "Comment"),
+    ]
+    with open(f"{path}.progress") as progress:
+        assert progress.read().split()[:2] == ["1", "2"]
@@ -0,0 +1,40 @@
+import pytest
+from httpx import AsyncClient
+
+from socials_api.core.health import health_checker
+
+
+# Test liveness
+@pytest.mark.anyio
+async def test_live(async_client: AsyncClient):
+    """Test the liveness probe answers without touching the database."""
+    response = await async_client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+# Test readiness and the circuit breaker
+@pytest.mark.anyio
+async def test_ready_and_circuit_breaker(monkeypatch, async_client: AsyncClient):
+    """Test readiness reports each database's latency, and that while a database is
+    down other requests fail fast with 503 but the health routes still answer."""
+    response = await async_client.get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["databases"][0]["healthy"] is True
+    assert body["databases"][0]["latency_ms"] >= 0
+
+    health = health_checker.databases[0]
+    monkeypatch.setattr(health, "healthy", False)
+    # as if the reconnect task had it: /health/ready doesn't ping it then
+    monkeypatch.setitem(health_checker._reconnecting, 0, None)
+
+    response = await async_client.get("/post/all")
+    assert response.status_code == 503
+    assert response.headers["retry-after"]
+
+    response = await async_client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+    assert (await async_client.get("/health/live")).status_code == 200
@@ -64,7 +64,12 @@ async def test_get_all_comments(
     response = await async_client.get("/comment/all")
     assert response.status_code == 200
     assert [
-        {"id": comment_id, "comment": comment_body, "post_id": post_id}
+        {
+            "id": comment_id,
+            "comment": comment_body,
+            "post_id": post_id,
+            "parent_id": None,
+        }
     ] == response.json()
 
 
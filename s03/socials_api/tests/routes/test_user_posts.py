@@ -3,7 +3,7 @@ import random
 import pytest
 from httpx import AsyncClient, Response
 
-from socials_api.api.models.database import comment_db, db, post_db
+from socials_api.api.models.database import comment_db, db, post_db, select_posts
 from socials_api.tests.utils import created_comment_factory as _created_comment_factory
 from socials_api.tests.utils import created_post as _created_post
 from socials_api.tests.utils import created_post_factory as _created_post_factory
@@ -85,9 +85,11 @@ async def test_get_all_posts_with_comments(
     # clean up comments data
     comment_1 = comments[0].json()
     comment_1.pop("post_id")
+    comment_1.pop("parent_id")
 
     comment_2 = comments[1].json()
     comment_2.pop("post_id")
+    comment_2.pop("parent_id")
 
     # call get method
     response = await async_client.get("/post/all/comments")
@@ -218,7 +220,7 @@ async def test_delete_post_by_id(
         delete_post_response = await async_client.delete(f"/post/{post_id}")
 
         # assert post is deleted
-        q = post_db.select().where(post_db.c.id == post.id)
+        q = select_posts().where(post_db.c.id == post.id)
         deleted_post = await db.fetch_one(q)
         assert not deleted_post
 
@@ -235,7 +237,7 @@ async def test_delete_post_by_id(
         delete_post_response = await async_client.delete(f"/post/{post.id}")
 
         # assert post is deleted
-        q = post_db.select().where(post_db.c.id == post.id)
+        q = select_posts().where(post_db.c.id == post.id)
         deleted_post = await db.fetch_one(q)
         assert not deleted_post
 
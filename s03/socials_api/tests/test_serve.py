@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from socials_api import serve
+from socials_api.config import config
+
+
+@pytest.fixture
+def uvicorn_calls(monkeypatch) -> list:
+    """Record uvicorn.run calls instead of serving, and skip migrations."""
+    calls = []
+    monkeypatch.setattr(serve.uvicorn, "run", lambda app, **kw: calls.append((app, kw)))
+    monkeypatch.setattr(serve, "migrate_shards", lambda: None)
+    monkeypatch.setattr(config, "DB_MIGRATE_ON_STARTUP", True)
+    # set, then delete: monkeypatch restores the variable after main() writes it
+    monkeypatch.setenv("TEST_DB_MIGRATE_ON_STARTUP", "true")
+    monkeypatch.delenv("TEST_DB_MIGRATE_ON_STARTUP")
+    return calls
+
+
+# Test uvicorn_options
+@pytest.mark.anyio
+async def test_uvicorn_options(monkeypatch):
+    """Test options come from config, 0 means no cap / one worker per CPU."""
+    monkeypatch.setattr(config, "SERVER_WORKERS", 0)
+    options = serve.uvicorn_options()
+    assert options["workers"] == (os.cpu_count() or 1)
+    assert options["limit_concurrency"] is None
+    assert options["timeout_keep_alive"] == config.SERVER_KEEPALIVE
+
+    options = serve.uvicorn_options(port=9000, workers=3, host=None)
+    assert (options["port"], options["workers"]) == (9000, 3)
+    assert options["host"] == config.SERVER_HOST
+
+
+# Test main with one worker
+@pytest.mark.anyio
+async def test_main_single_worker(uvicorn_calls):
+    """Test a single worker is served the preloaded app object, migrations done."""
+    from socials_api.main import app
+
+    serve.main(["--workers", "1"])
+    assert uvicorn_calls[0][0] is app
+    assert config.DB_MIGRATE_ON_STARTUP is False
+
+
+# Test main with several workers
+@pytest.mark.anyio
+async def test_main_workers(uvicorn_calls):
+    """Test workers get the import string and are told not to migrate again."""
+    serve.main(["--workers", "2"])
+    app, options = uvicorn_calls[0]
+    assert (app, options["workers"]) == (serve.APP, 2)
+    assert os.environ["TEST_DB_MIGRATE_ON_STARTUP"] == "false"